@@ -0,0 +1,52 @@
+"""added agent_result_cache table for the stored generic_agent results
+
+Revision ID: 3f9d2b7c61a5
+Revises: e61b0f4c8a37
+Create Date: 2025-08-12 10:41:17.652903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9d2b7c61a5'
+down_revision: Union[str, None] = 'e61b0f4c8a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('agent_result_cache',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('cache_key', sa.String(), nullable=False),
+    sa.Column('agent_uuid', sa.String(), nullable=False),
+    sa.Column('agent_name', sa.String(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('llm_metadata', sa.JSON(), nullable=True),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_accessed_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('agent_result_cache', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_agent_result_cache_cache_key'), ['cache_key'], unique=True)
+        batch_op.create_index(batch_op.f('ix_agent_result_cache_agent_uuid'), ['agent_uuid'], unique=False)
+        batch_op.create_index(batch_op.f('ix_agent_result_cache_last_accessed_at'), ['last_accessed_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_agent_result_cache_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('agent_result_cache', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_agent_result_cache_expires_at'))
+        batch_op.drop_index(batch_op.f('ix_agent_result_cache_last_accessed_at'))
+        batch_op.drop_index(batch_op.f('ix_agent_result_cache_agent_uuid'))
+        batch_op.drop_index(batch_op.f('ix_agent_result_cache_cache_key'))
+
+    op.drop_table('agent_result_cache')
@@ -0,0 +1,40 @@
+"""added session_questions table for the main questions of a live interview
+
+Revision ID: 5d7a2c91e4f0
+Revises: 9c3e51a7d2b4
+Create Date: 2025-08-06 09:41:52.207184
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d7a2c91e4f0'
+down_revision: Union[str, None] = '9c3e51a7d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # questions already saved in sessions.session_questions stay there, reads merge them after the new rows
+    op.create_table('session_questions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('question', sa.String(), nullable=False),
+    sa.Column('question_type', sa.String(), nullable=True),
+    sa.Column('used_resume', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'seq', name='uq_session_questions_session_id_seq')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('session_questions')
@@ -0,0 +1,68 @@
+"""added hourly llm usage rollup columns to platform_metrics and user_metrics
+
+Revision ID: 8a4e6c1d93f2
+Revises: 3f9d2b7c61a5
+Create Date: 2025-08-14 11:06:52.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a4e6c1d93f2'
+down_revision: Union[str, None] = '3f9d2b7c61a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_TABLES = ('platform_metrics', 'user_metrics')
+
+
+def _rollup_columns():
+    return [
+        sa.Column('hour_start', sa.DateTime(), nullable=True),
+        sa.Column('org_id', sa.Integer(), nullable=True),
+        sa.Column('agent_name', sa.String(), nullable=True),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('calls', sa.Integer(), nullable=True),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+        sa.Column('candidates_tokens', sa.Integer(), nullable=True),
+        sa.Column('cached_tokens', sa.Integer(), nullable=True),
+        sa.Column('total_tokens', sa.Integer(), nullable=True),
+        sa.Column('cost_usd', sa.Float(), nullable=True),
+        sa.Column('latency_ms_total', sa.Float(), nullable=True),
+        sa.Column('latency_ms_max', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ROLLUP_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for column in _rollup_columns():
+                batch_op.add_column(column)
+            batch_op.create_index(batch_op.f(f'ix_{table}_hour_start'), ['hour_start'], unique=False)
+            batch_op.create_index(batch_op.f(f'ix_{table}_org_id'), ['org_id'], unique=False)
+
+    with op.batch_alter_table('platform_metrics', schema=None) as batch_op:
+        batch_op.create_index('ix_platform_metrics_hour_start_org_id_agent_name_model', ['hour_start', 'org_id', 'agent_name', 'model'], unique=False)
+    with op.batch_alter_table('user_metrics', schema=None) as batch_op:
+        batch_op.create_index('ix_user_metrics_user_id_hour_start_agent_name_model', ['user_id', 'hour_start', 'agent_name', 'model'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('user_metrics', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_metrics_user_id_hour_start_agent_name_model')
+    with op.batch_alter_table('platform_metrics', schema=None) as batch_op:
+        batch_op.drop_index('ix_platform_metrics_hour_start_org_id_agent_name_model')
+
+    for table in ROLLUP_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_org_id'))
+            batch_op.drop_index(batch_op.f(f'ix_{table}_hour_start'))
+            for column in reversed(_rollup_columns()):
+                batch_op.drop_column(column.name)
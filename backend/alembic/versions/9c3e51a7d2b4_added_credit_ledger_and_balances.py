@@ -0,0 +1,78 @@
+"""added credit ledger and materialized credit balances
+
+Revision ID: 9c3e51a7d2b4
+Revises: 2f018b7d09fd
+Create Date: 2025-08-04 11:02:17.418532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models.credit_ledger import CREDIT_LEDGER_BALANCE_TRIGGER
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e51a7d2b4'
+down_revision: Union[str, None] = '2f018b7d09fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('credit_ledger',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=True),
+    sa.Column('entry_type', sa.String(), nullable=False),
+    sa.Column('credits', sa.Integer(), nullable=False),
+    sa.Column('reference', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reference')
+    )
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_credit_ledger_user_id'), ['user_id'], unique=False)
+
+    op.create_table('credit_balances',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    op.execute(CREDIT_LEDGER_BALANCE_TRIGGER)
+
+    # backfill :: completed stripe top ups become TOPUP entries and the rest of users.credits the OPENING entry,
+    # so every balance starts equal to users.credits and the reconciliation finds no missing top up
+    op.execute("""
+        INSERT INTO credit_ledger (user_id, entry_type, credits, reference, created_at)
+        SELECT user_id, 'TOPUP', CAST(COALESCE(json_extract(payment_details, '$.credits'), 0) AS INTEGER),
+               'stripe:' || json_extract(payment_details, '$.payment_id'), created_at
+        FROM user_payments
+        WHERE json_extract(payment_details, '$.status') = 'COMPLETED'
+          AND json_extract(payment_details, '$.payment_id') IS NOT NULL
+          AND user_id IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO credit_ledger (user_id, entry_type, credits, reference, created_at)
+        SELECT users.id, 'OPENING',
+               COALESCE(users.credits, 0) - COALESCE((SELECT SUM(credits) FROM credit_ledger WHERE credit_ledger.user_id = users.id), 0),
+               'opening:' || users.id, CURRENT_TIMESTAMP
+        FROM users
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS credit_ledger_apply_balance")
+    op.drop_table('credit_balances')
+    with op.batch_alter_table('credit_ledger', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_credit_ledger_user_id'))
+
+    op.drop_table('credit_ledger')
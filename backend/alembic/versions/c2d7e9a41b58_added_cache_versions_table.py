@@ -0,0 +1,39 @@
+"""added cache_versions table for the cross worker version counters of the in-process caches
+
+Revision ID: c2d7e9a41b58
+Revises: 8a4e6c1d93f2
+Create Date: 2025-08-19 09:12:44.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2d7e9a41b58'
+down_revision: Union[str, None] = '8a4e6c1d93f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_versions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('cache_versions', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cache_versions_name'), ['name'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('cache_versions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cache_versions_name'))
+
+    op.drop_table('cache_versions')
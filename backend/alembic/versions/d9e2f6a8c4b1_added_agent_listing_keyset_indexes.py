@@ -0,0 +1,32 @@
+"""added (org_id, created_at, id) and (org_id, job_id, created_at, id) indexes to agents for the keyset paged listings
+
+Revision ID: d9e2f6a8c4b1
+Revises: f4b8c3d5e7a9
+Create Date: 2025-08-22 11:04:37.215930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9e2f6a8c4b1'
+down_revision: Union[str, None] = 'f4b8c3d5e7a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('agents', schema=None) as batch_op:
+        batch_op.create_index('ix_agents_org_id_created_at_id', ['org_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_agents_org_id_job_id_created_at_id', ['org_id', 'job_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('agents', schema=None) as batch_op:
+        batch_op.drop_index('ix_agents_org_id_job_id_created_at_id')
+        batch_op.drop_index('ix_agents_org_id_created_at_id')
@@ -0,0 +1,52 @@
+"""added turn_timings table for the latency breakdown of live interview turns
+
+Revision ID: e61b0f4c8a37
+Revises: 5d7a2c91e4f0
+Create Date: 2025-08-07 15:12:40.381926
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e61b0f4c8a37'
+down_revision: Union[str, None] = '5d7a2c91e4f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('turn_timings',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=True),
+    sa.Column('turn', sa.Integer(), nullable=True),
+    sa.Column('endpoint', sa.String(), nullable=False),
+    sa.Column('agent_version', sa.String(), nullable=True),
+    sa.Column('bootstrap_ms', sa.Float(), nullable=True),
+    sa.Column('prompt_ms', sa.Float(), nullable=True),
+    sa.Column('ttft_ms', sa.Float(), nullable=True),
+    sa.Column('tools_ms', sa.Float(), nullable=True),
+    sa.Column('tool_calls', sa.Integer(), nullable=True),
+    sa.Column('stream_ms', sa.Float(), nullable=True),
+    sa.Column('persist_ms', sa.Float(), nullable=True),
+    sa.Column('total_ms', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('turn_timings', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_turn_timings_session_id'), ['session_id'], unique=False)
+        batch_op.create_index('ix_turn_timings_endpoint_agent_version_created_at', ['endpoint', 'agent_version', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('turn_timings', schema=None) as batch_op:
+        batch_op.drop_index('ix_turn_timings_endpoint_agent_version_created_at')
+        batch_op.drop_index(batch_op.f('ix_turn_timings_session_id'))
+
+    op.drop_table('turn_timings')
@@ -0,0 +1,62 @@
+"""added base_name, version, job_id and kind columns to agents, backfilled from the versioned names
+
+Revision ID: f4b8c3d5e7a9
+Revises: c2d7e9a41b58
+Create Date: 2025-08-21 15:27:09.804512
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8c3d5e7a9'
+down_revision: Union[str, None] = 'c2d7e9a41b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# same split as models.agents.split_agent_name at the time of this migration
+AGENT_NAME_SEPARATOR = "~@~"
+ORG_AGENT_NAME = re.compile(r"^(?P<org>.+?)_(?:(?P<job_id>\d+)_)?(?P<kind>interview_agent|interview_analysis_agent)$")
+
+
+def split_agent_name(name):
+    base_name, _, version = name.partition(AGENT_NAME_SEPARATOR)
+    org_agent = ORG_AGENT_NAME.match(base_name)
+    if not org_agent:
+        return base_name, version, None, base_name
+    return base_name, version, org_agent.group("job_id"), org_agent.group("kind")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('agents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('base_name', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('job_id', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('kind', sa.String(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_agents_base_name'), ['base_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_agents_job_id'), ['job_id'], unique=False)
+        batch_op.create_index('ix_agents_org_id_base_name_is_active', ['org_id', 'base_name', 'is_active'], unique=False)
+
+    # backfill from the existing names
+    agents = sa.table('agents', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('base_name', sa.String), sa.column('version', sa.String), sa.column('job_id', sa.String), sa.column('kind', sa.String))
+    connection = op.get_bind()
+    for agent_id, name in connection.execute(sa.select(agents.c.id, agents.c.name)).all():
+        base_name, version, job_id, kind = split_agent_name(name)
+        connection.execute(agents.update().where(agents.c.id == agent_id).values(base_name=base_name, version=version, job_id=job_id, kind=kind))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('agents', schema=None) as batch_op:
+        batch_op.drop_index('ix_agents_org_id_base_name_is_active')
+        batch_op.drop_index(batch_op.f('ix_agents_job_id'))
+        batch_op.drop_index(batch_op.f('ix_agents_base_name'))
+        batch_op.drop_column('kind')
+        batch_op.drop_column('job_id')
+        batch_op.drop_column('version')
+        batch_op.drop_column('base_name')
@@ -43,8 +43,79 @@ class Config:
         self.TEAMTAILOR_API_VERSION = os.getenv("TEAMTAILOR_API_VERSION") 
         self.TEAM_TAILER_API_KEY = os.getenv("TEAM_TAILER_API_KEY")
         
-        # vapi api key 
+        # vapi api key
         self.VAPI_PRIVATE_KEY = os.getenv("VAPI_PRIVATE_KEY")
 
+        # live call state cache, entries are refreshed on every turn so the ttl only expires idle calls
+        self.CALL_STATE_CACHE_TTL_SECONDS = int(os.getenv("CALL_STATE_CACHE_TTL_SECONDS", 60 * 60))
+        self.CALL_STATE_CACHE_MAX_CALLS = int(os.getenv("CALL_STATE_CACHE_MAX_CALLS", 1024))
+
+        # session exchanges are buffered and written in batches, on a full batch or every flush interval
+        self.EXCHANGE_WRITER_BATCH_SIZE = int(os.getenv("EXCHANGE_WRITER_BATCH_SIZE", 50))
+        self.EXCHANGE_WRITER_FLUSH_INTERVAL_SECONDS = float(os.getenv("EXCHANGE_WRITER_FLUSH_INTERVAL_SECONDS", 2))
+        # number of flushes a session exchange that cannot be written is tried in before it is dropped
+        self.EXCHANGE_WRITER_MAX_ATTEMPTS = int(os.getenv("EXCHANGE_WRITER_MAX_ATTEMPTS", 3))
+
+        # turn timings are buffered and written in batches the same way, on a full batch or every flush interval
+        self.TURN_TIMING_WRITER_BATCH_SIZE = int(os.getenv("TURN_TIMING_WRITER_BATCH_SIZE", 100))
+        self.TURN_TIMING_WRITER_FLUSH_INTERVAL_SECONDS = float(os.getenv("TURN_TIMING_WRITER_FLUSH_INTERVAL_SECONDS", 5))
+
+        # gemini explicit caching of the interview system instructions, caches are released when the session ends
+        self.GEMINI_CONTEXT_CACHE_ENABLED = os.getenv("GEMINI_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+        self.GEMINI_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SECONDS", 60 * 60))
+
+        # hold back streamed interviewer text until a sentence ends before sending it to vapi
+        self.SSE_COALESCE_SENTENCES = os.getenv("SSE_COALESCE_SENTENCES", "false").lower() == "true"
+
+        # memoized candidate context (session contexts + structured resume) per session, shared by the tool and analysis
+        self.CANDIDATE_CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CANDIDATE_CONTEXT_CACHE_TTL_SECONDS", 60 * 60))
+        self.CANDIDATE_CONTEXT_CACHE_MAX_SESSIONS = int(os.getenv("CANDIDATE_CONTEXT_CACHE_MAX_SESSIONS", 1024))
+
+        # llm provider behind the gemini helpers :: "google", or "fake" for benchmarks and tests (local, deterministic, no network)
+        self.LLM_PROVIDER = os.getenv("LLM_PROVIDER", "google").lower()
+        # one gemini client per process, its http connections are kept alive between calls and warmed up on startup
+        self.GEMINI_HTTP_TIMEOUT_SECONDS = float(os.getenv("GEMINI_HTTP_TIMEOUT_SECONDS", 120))
+        self.GEMINI_HTTP_MAX_CONNECTIONS = int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", 100))
+        self.GEMINI_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GEMINI_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+        self.GEMINI_HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("GEMINI_HTTP_KEEPALIVE_EXPIRY_SECONDS", 60))
+        self.GEMINI_WARM_UP_ON_STARTUP = os.getenv("GEMINI_WARM_UP_ON_STARTUP", "true").lower() == "true"
+        # deadline, retries and hedging of the non streaming agent calls (question gen, resume structuring, analysis),
+        # agents can override them with "call_policy" in their config (see utils.llm_call_policy)
+        self.LLM_CALL_DEADLINE_SECONDS = float(os.getenv("LLM_CALL_DEADLINE_SECONDS", 90))
+        self.LLM_CALL_MAX_ATTEMPTS = int(os.getenv("LLM_CALL_MAX_ATTEMPTS", 3))
+        self.LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", 0.5))
+        self.LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", 8))
+        self.LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+        self.LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", 0.95))
+        self.LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+        # hedges allowed per call over time, and how many can be spent in a burst
+        self.LLM_HEDGE_BUDGET_RATIO = float(os.getenv("LLM_HEDGE_BUDGET_RATIO", 0.1))
+        self.LLM_HEDGE_BUDGET_BURST = float(os.getenv("LLM_HEDGE_BUDGET_BURST", 5))
+        # admission of every gemini request through per model rpm / tpm buckets by priority class (see utils.llm_scheduler),
+        # LLM_RATE_LIMITS overrides the defaults per model as json :: {"gemini-2.0-flash": {"rpm": 2000, "tpm": 4000000}}
+        self.LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+        self.LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS")
+        self.LLM_DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", 2000))
+        self.LLM_DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", 4000000))
+        self.LLM_SCHEDULER_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_SCHEDULER_OUTPUT_TOKENS_ESTIMATE", 512))
+        # hourly llm usage rollups into platform_metrics / user_metrics (see utils.llm_usage_recorder), LLM_PRICING overrides
+        # the usd per million token prices per model as json :: {"gemini-2.0-flash": {"input": 0.1, "cached": 0.025, "output": 0.4}}
+        self.LLM_USAGE_FLUSH_INTERVAL_SECONDS = float(os.getenv("LLM_USAGE_FLUSH_INTERVAL_SECONDS", 60))
+        self.LLM_PRICING = os.getenv("LLM_PRICING")
+        # stored generic_agent results (see utils.agent_result_cache), agents can opt in or out with "result_cache" in their config
+        self.AGENT_RESULT_CACHE_ENABLED = os.getenv("AGENT_RESULT_CACHE_ENABLED", "false").lower() == "true"
+        self.AGENT_RESULT_CACHE_TTL_SECONDS = int(os.getenv("AGENT_RESULT_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+        self.AGENT_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_RESULT_CACHE_MAX_ENTRIES", 10000))
+        self.AGENT_RESULT_CACHE_MAX_BYTES = int(os.getenv("AGENT_RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        # agents are served from an in-process registry (see utils.agent_registry), each worker checks the agents version
+        # counter this often and reloads when another worker changed an agent
+        self.AGENT_REGISTRY_VERSION_CHECK_SECONDS = float(os.getenv("AGENT_REGISTRY_VERSION_CHECK_SECONDS", 2))
+        # latency of the fake provider, 0 answers instantly
+        self.FAKE_LLM_FIRST_TOKEN_DELAY_SECONDS = float(os.getenv("FAKE_LLM_FIRST_TOKEN_DELAY_SECONDS", 0))
+        self.FAKE_LLM_TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", 0))
+
+        # credit ledger reconciliation against stripe top ups, also re-syncs users.credits from the ledger
+        self.CREDIT_RECONCILE_INTERVAL_SECONDS = int(os.getenv("CREDIT_RECONCILE_INTERVAL_SECONDS", 15 * 60))
+
 
 config = Config()
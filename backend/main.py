@@ -4,6 +4,7 @@ from routers.agent_management_router import agent_management_router
 from routers.user_router import user_router
 from routers.platform_router import platform_router
 from routers.ent_router import ent_router
+import asyncio
 import logging
 import sys
 # from utils.auth_helper import AuthenticationMiddleware
@@ -13,6 +14,13 @@ from utils.path_helpers import get_log_path
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.base import BaseHTTPMiddleware
 from routers.payment_router import payment_router
+from utils.exchange_writer import exchange_writer
+from utils.llm_usage_recorder import llm_usage_recorder
+from utils.turn_timing_writer import turn_timing_writer
+from utils.agent_registry import agent_registry
+from utils.llm_helper import DEFAULT_MODEL
+from utils.llm_providers import aclose_llm_providers, get_llm_provider
+from services.credit_ledger_service import CreditLedgerService
 from config import config
 
 logging.basicConfig(
@@ -101,6 +109,30 @@ app.include_router(payment_router, prefix="/api")
 app.include_router(admin_router, prefix="/api")
 app.include_router(ent_router, prefix="/api")
 
+async def reconcile_credits_periodically():
+    while True:
+        await asyncio.to_thread(CreditLedgerService.reconcile)
+        await asyncio.sleep(config.CREDIT_RECONCILE_INTERVAL_SECONDS)
+
+@app.on_event("startup")
+async def start_background_jobs():
+    app.state.credit_reconciler = asyncio.create_task(reconcile_credits_periodically())
+    # agents are served from memory, loaded once here instead of on the first request
+    await asyncio.to_thread(agent_registry.load)
+    if config.GEMINI_WARM_UP_ON_STARTUP:
+        # the llm connections are opened in the background so startup does not wait on the network
+        app.state.llm_warm_up = asyncio.create_task(get_llm_provider().awarm_up(DEFAULT_MODEL))
+
+@app.on_event("shutdown")
+async def flush_buffered_writes():
+    app.state.credit_reconciler.cancel()
+    # write whatever session exchanges, llm usage and turn timings are still buffered before the worker exits
+    await asyncio.to_thread(exchange_writer.stop)
+    await asyncio.to_thread(llm_usage_recorder.stop)
+    await asyncio.to_thread(turn_timing_writer.stop)
+    # then close the pooled llm connections
+    await aclose_llm_providers()
+
 @app.get("/health")
 async def health_check():
     return {"system" : "Backend" , "status": "Running", "environment" : config.ENVIRONMENT }
\ No newline at end of file
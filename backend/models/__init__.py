@@ -8,6 +8,11 @@ from models.users import User, userRoleEnum
 from models.sessions import Session
 from models.payments import Payments
 from models.organisations import Organisation
+from models.credit_ledger import CreditLedgerEntry, CreditBalance, CreditEntryTypeEnum
+from models.session_questions import SessionQuestion
+from models.turn_timings import TurnTiming
+from models.agent_result_cache import AgentResultCacheEntry
+from models.cache_versions import CacheVersion
 
 __all__ = [
     "Agent",
@@ -19,5 +24,10 @@ __all__ = [
     "User", "userRoleEnum",
     "Session",
     "Payments",
-    "Organisation"
+    "Organisation",
+    "CreditLedgerEntry", "CreditBalance", "CreditEntryTypeEnum",
+    "SessionQuestion",
+    "TurnTiming",
+    "AgentResultCacheEntry",
+    "CacheVersion"
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, String, Integer, JSON, DateTime
+from models.base import Base
+
+from utils.datetime_helper import StandardDT
+
+
+class AgentResultCacheEntry(Base):
+    """stored result of a generic_agent call, keyed by the agent version, its prompt and the canonical context"""
+    __tablename__ = 'agent_result_cache'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    cache_key = Column(String, nullable=False, unique=True, index=True) # sha256 of agent uuid, prompt hash and context hash
+    agent_uuid = Column(String, nullable=False, index=True)
+    agent_name = Column(String) # full versioned agent name (name~@~version)
+    result = Column(JSON)
+    llm_metadata = Column(JSON) # llm metadata of the call that produced the result
+    size_bytes = Column(Integer, nullable=False, default=0) # serialized size of the result, for the size cap
+    hits = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=StandardDT.get_iso_dt)
+    last_accessed_at = Column(DateTime, default=StandardDT.get_iso_dt, index=True) # lru order of the eviction
+    expires_at = Column(DateTime, nullable=False, index=True)
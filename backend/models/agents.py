@@ -1,12 +1,32 @@
-from sqlalchemy import Column, String, Boolean, Integer, JSON, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+import re
+from typing import Optional, Tuple
+from sqlalchemy import Column, String, Boolean, Integer, JSON, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship, validates
 from models.base import Base
 from utils.datetime_helper import StandardDT
 
 AGENT_NAME_SEPARATOR = "~@~"
+# organisation agents are named {org}_{job id}_{kind} (per job) or {org}_{kind}
+ORG_AGENT_NAME = re.compile(r"^(?P<org>.+?)_(?:(?P<job_id>\d+)_)?(?P<kind>interview_agent|interview_analysis_agent)$")
+
+
+def split_agent_name(name: str) -> Tuple[str, str, Optional[str], str]:
+    """(base name, version, job id, kind) of a versioned agent name, the kind of platform agents is their base name"""
+    base_name, _, version = name.partition(AGENT_NAME_SEPARATOR)
+    org_agent = ORG_AGENT_NAME.match(base_name)
+    if not org_agent:
+        return base_name, version, None, base_name
+    return base_name, version, org_agent.group("job_id"), org_agent.group("kind")
+
 
 class Agent(Base):
     __tablename__ = 'agents'
+    __table_args__ = (
+        Index('ix_agents_org_id_base_name_is_active', 'org_id', 'base_name', 'is_active'),
+        # keyset pages of the organisation / job agent listings, newest first
+        Index('ix_agents_org_id_created_at_id', 'org_id', 'created_at', 'id'),
+        Index('ix_agents_org_id_job_id_created_at_id', 'org_id', 'job_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False, unique=True, index=True)
@@ -17,5 +37,15 @@ class Agent(Base):
     created_at = Column(DateTime, default=StandardDT.get_iso_dt)
     updated_at = Column(DateTime, default=StandardDT.get_iso_dt, onupdate=StandardDT.get_iso_dt)
     org_id = Column(Integer, ForeignKey("organisations.id"))
+    # parts of name, set from it on every write so lookups are exact matches instead of prefix / substring scans
+    base_name = Column(String, index=True)
+    version = Column(String)
+    job_id = Column(String, index=True) # job of organisation job agents
+    kind = Column(String) # interview_agent / interview_analysis_agent for organisation agents, the base name otherwise
+
+    organisation = relationship("Organisation", back_populates="agents")
 
-    organisation = relationship("Organisation", back_populates="agents")
\ No newline at end of file
+    @validates("name")
+    def _split_name(self, _key, name):
+        self.base_name, self.version, self.job_id, self.kind = split_agent_name(name)
+        return name
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from models.base import Base
+
+from utils.datetime_helper import StandardDT
+
+
+class CacheVersion(Base):
+    """version counter of an in-process cache, bumped on every change so each worker knows when to reload its copy"""
+    __tablename__ = 'cache_versions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String, nullable=False, unique=True, index=True) # e.g. agents
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=StandardDT.get_iso_dt, onupdate=StandardDT.get_iso_dt)
@@ -0,0 +1,50 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, DDL, event
+from sqlalchemy.orm import relationship
+from models.base import Base
+from enum import Enum
+
+from utils.datetime_helper import StandardDT
+
+
+class CreditEntryTypeEnum(Enum):
+    OPENING = "OPENING" # balance carried over from users.credits when the user first hits the ledger
+    TOPUP = "TOPUP" # completed stripe checkout
+    USAGE = "USAGE" # minutes used by a live call
+    TERMINATION = "TERMINATION" # remaining (negative) balance written off when a call is terminated
+    ADJUSTMENT = "ADJUSTMENT" # manual or reconciliation correction
+
+
+class CreditLedgerEntry(Base):
+    """append only, never update or delete rows. the balance of a user is the sum of its entries"""
+    __tablename__ = 'credit_ledger'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
+    session_id = Column(Integer, ForeignKey('sessions.id'), nullable=True)
+    entry_type = Column(String, nullable=False)
+    credits = Column(Integer, nullable=False) # signed, top ups are positive and usage is negative
+    reference = Column(String, nullable=False, unique=True) # idempotency key, a retried write with the same reference is a no-op
+    created_at = Column(DateTime, default=StandardDT.get_iso_dt)
+    user = relationship("User")
+
+
+class CreditBalance(Base):
+    """materialized balance per user, maintained by the credit_ledger insert trigger only"""
+    __tablename__ = 'credit_balances'
+
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    balance = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=StandardDT.get_iso_dt)
+
+
+# keeps credit_balances in step with the ledger inside the same statement as the insert, so a debit is
+# a single atomic insert and the balance never drifts from the entries
+CREDIT_LEDGER_BALANCE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS credit_ledger_apply_balance AFTER INSERT ON credit_ledger
+BEGIN
+    INSERT INTO credit_balances (user_id, balance, updated_at) VALUES (NEW.user_id, NEW.credits, NEW.created_at)
+    ON CONFLICT(user_id) DO UPDATE SET balance = balance + NEW.credits, updated_at = NEW.created_at;
+END
+"""
+
+event.listen(CreditLedgerEntry.__table__, "after_create", DDL(CREDIT_LEDGER_BALANCE_TRIGGER))
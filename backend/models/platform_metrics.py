@@ -1,11 +1,27 @@
-from sqlalchemy import Column, String, Boolean, Integer, JSON, DateTime
+from sqlalchemy import Column, String, Boolean, Integer, Float, JSON, DateTime, Index
 from models.base import Base
 from utils.datetime_helper import StandardDT
 
 class PlatformMetrics(Base):
+    """hourly llm usage rollup per organisation, agent and model, written by the llm usage recorder"""
     __tablename__ = 'platform_metrics'
+    __table_args__ = (Index('ix_platform_metrics_hour_start_org_id_agent_name_model', 'hour_start', 'org_id', 'agent_name', 'model'),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     llm_metadata = Column(JSON) # complete metadata of all the llm calls made from all the agents 
     source_metadata = Column(JSON) # source of the origin of metadata if any
     created_at = Column(DateTime, default=StandardDT.get_iso_dt)
+    # hourly rollup, one row per hour, organisation (null for the platform's own users), agent and model
+    hour_start = Column(DateTime, index=True)
+    org_id = Column(Integer, index=True)
+    agent_name = Column(String) # base agent name, without the version
+    model = Column(String)
+    calls = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    candidates_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0) # part of prompt_tokens served from a cached content
+    total_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    latency_ms_total = Column(Float, default=0.0) # sum over the calls, divide by calls for the mean
+    latency_ms_max = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=StandardDT.get_iso_dt, onupdate=StandardDT.get_iso_dt)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Boolean, Integer, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.orm import relationship
+from models.base import Base
+
+from utils.datetime_helper import StandardDT
+
+
+class SessionQuestion(Base):
+    """main questions asked in a live interview, one row per question, insert only"""
+    __tablename__ = 'session_questions'
+    __table_args__ = (UniqueConstraint('session_id', 'seq', name='uq_session_questions_session_id_seq'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(Integer, ForeignKey('sessions.id'), nullable=False)
+    seq = Column(Integer, nullable=False) # 1 based order of the question within the session
+    question = Column(String, nullable=False)
+    question_type = Column(String) # 'resume' or 'hypothetical'
+    used_resume = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=StandardDT.get_iso_dt)
+    session = relationship("Session")
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, Index
+from models.base import Base
+
+from utils.datetime_helper import StandardDT
+
+
+class TurnTiming(Base):
+    """latency breakdown of one live interview turn (one chat completions request), all durations in ms"""
+    __tablename__ = 'turn_timings'
+    __table_args__ = (Index('ix_turn_timings_endpoint_agent_version_created_at', 'endpoint', 'agent_version', 'created_at'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    session_id = Column(Integer, ForeignKey('sessions.id'), index=True)
+    turn = Column(Integer) # candidate messages in the request, 1 for the first turn of the call
+    endpoint = Column(String, nullable=False) # /chat/completions, /v2/chat/completions or /v3/chat/completions
+    agent_version = Column(String) # full versioned agent name (name~@~version)
+    bootstrap_ms = Column(Float) # call state load, only the first turn of a call reads the database
+    prompt_ms = Column(Float) # system instruction build, message conversion and history compaction
+    ttft_ms = Column(Float) # gemini request until the first token, tool round trips included
+    tools_ms = Column(Float) # time spent running the tools the model called
+    tool_calls = Column(Integer)
+    stream_ms = Column(Float) # first token until the end of the stream
+    persist_ms = Column(Float) # exchange buffering and the credits write back
+    total_ms = Column(Float)
+    created_at = Column(DateTime, default=StandardDT.get_iso_dt)
@@ -1,13 +1,29 @@
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, ForeignKey, JSON
+from sqlalchemy import Column, String, Boolean, Integer, Float, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.orm import relationship
 from models.base import Base
 from utils.datetime_helper import StandardDT
 
 class UserMetrics(Base):
+    """hourly llm usage rollup per user, agent and model, written by the llm usage recorder"""
     __tablename__ = 'user_metrics'
+    __table_args__ = (Index('ix_user_metrics_user_id_hour_start_agent_name_model', 'user_id', 'hour_start', 'agent_name', 'model'),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     metrics = Column(JSON)
     created_at = Column(DateTime, default=StandardDT.get_iso_dt)
+    # hourly rollup, one row per user, hour, agent and model
+    hour_start = Column(DateTime, index=True)
+    org_id = Column(Integer, index=True)
+    agent_name = Column(String) # base agent name, without the version
+    model = Column(String)
+    calls = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)
+    candidates_tokens = Column(Integer, default=0)
+    cached_tokens = Column(Integer, default=0) # part of prompt_tokens served from a cached content
+    total_tokens = Column(Integer, default=0)
+    cost_usd = Column(Float, default=0.0)
+    latency_ms_total = Column(Float, default=0.0) # sum over the calls, divide by calls for the mean
+    latency_ms_max = Column(Float, default=0.0)
+    updated_at = Column(DateTime, default=StandardDT.get_iso_dt, onupdate=StandardDT.get_iso_dt)
     user = relationship("User", back_populates="metrics")
@@ -4,6 +4,8 @@ from models.base import get_db_session
 from models.organisations import Organisation
 from models.users import User, userRoleEnum
 from services.admin_service import AdminService
+from services.turn_timing_service import TurnTimingService
+from services.llm_usage_service import LLMUsageService
 from schemas.admin_schemas import (
     AdminLoginRequest,
     PaginatedUsersResponse, 
@@ -25,6 +27,10 @@ from datetime import datetime
 import logging
 from services.user_services import create_or_get_user, get_user_profile
 from utils.admin_auth import get_user_from_token
+from utils.exchange_writer import exchange_writer
+from utils.turn_timing_writer import turn_timing_writer
+from utils.agent_result_cache import agent_result_cache
+from utils.llm_scheduler import llm_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +91,7 @@ def get_user_by_identifier(identifier: str, db: Session = Depends(get_db)):
 @router.get("/users/{user_uuid}/sessions", response_model=List[SessionSchema])
 def get_user_sessions_and_exchanges(user_uuid: str, db: Session = Depends(get_db)):
     try:
+        exchange_writer.flush()
         user = AdminService.get_user_sessions(db=db, user_uuid=user_uuid)
         if not user:
             raise HTTPException(
@@ -135,6 +142,93 @@ def get_payments_summary(db: Session = Depends(get_db)):
             detail="Failed to retrieve payment summary"
         )
 
+# latency breakdown of the live interview turns, percentiles and histograms per endpoint and agent version (INTERNAL only)
+@router.get("/metrics/turn-latency")
+def get_turn_latency_report(
+    request: Request,
+    db: Session = Depends(get_db),
+    endpoint: Optional[str] = Query(None, description="e.g. /v3/chat/completions"),
+    agent_version: Optional[str] = Query(None, description="full versioned agent name"),
+    since_hours: int = Query(24, ge=1, le=24 * 90),
+    buckets_ms: Optional[List[int]] = Query(None, description="histogram bucket upper bounds in ms"),
+):
+    try:
+        user = get_user_from_token(request, db)
+        if user.role != "INTERNAL":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only INTERNAL users can access latency metrics")
+        turn_timing_writer.flush()
+        return TurnTimingService.get_latency_report(db, endpoint=endpoint, agent_version=agent_version, since_hours=since_hours, buckets_ms=buckets_ms)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"[admin_router.get_turn_latency_report] :: Error retrieving turn latency report: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve turn latency report"
+        )
+
+# hit / miss counters and size of the stored generic_agent results (INTERNAL only)
+@router.get("/metrics/agent-result-cache")
+def get_agent_result_cache_stats(request: Request, db: Session = Depends(get_db)):
+    try:
+        user = get_user_from_token(request, db)
+        if user.role != "INTERNAL":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only INTERNAL users can access cache metrics")
+        return agent_result_cache.stats()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"[admin_router.get_agent_result_cache_stats] :: Error retrieving agent result cache stats: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve agent result cache stats"
+        )
+
+# queue depth per model, priority class and organisation, bucket levels and queue wait times of the gemini scheduler (INTERNAL only)
+@router.get("/metrics/llm-scheduler")
+def get_llm_scheduler_stats(request: Request, db: Session = Depends(get_db)):
+    try:
+        user = get_user_from_token(request, db)
+        if user.role != "INTERNAL":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only INTERNAL users can access scheduler metrics")
+        return llm_scheduler.stats()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"[admin_router.get_llm_scheduler_stats] :: Error retrieving llm scheduler stats: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve llm scheduler stats"
+        )
+
+# llm calls, tokens, cost and latency from the hourly usage rollups, per organisation, user, agent, model, day or hour (INTERNAL only)
+@router.get("/metrics/llm-usage")
+def get_llm_usage_report(
+    request: Request,
+    db: Session = Depends(get_db),
+    org_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    agent_name: Optional[str] = Query(None, description="base agent name, without the version"),
+    model: Optional[str] = Query(None, description="e.g. gemini-2.0-flash"),
+    since_hours: int = Query(24, ge=1, le=24 * 366),
+    group_by: Optional[List[str]] = Query(None, description="any of org, user, agent, model, day, hour"),
+):
+    try:
+        user = get_user_from_token(request, db)
+        if user.role != "INTERNAL":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only INTERNAL users can access usage metrics")
+        return LLMUsageService.get_usage(db, org_id=org_id, user_id=user_id, agent_name=agent_name, model=model, since_hours=since_hours, group_by=group_by)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.exception(f"[admin_router.get_llm_usage_report] :: Error retrieving llm usage report: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve llm usage report"
+        )
+
 # 1. Create a new organisation (INTERNAL only)
 @router.post("/create/org", response_model=OrganisationResponse)
 def create_organisation(request: Request, org_data: OrganisationCreateRequest, db: Session = Depends(get_db)):
@@ -3,9 +3,11 @@ import tempfile
 import os
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
+from typing import Optional
 from models.agents import Agent
 from models.organisations import Organisation
 from models.session_exchanges import SessionExchange
+from models.session_questions import SessionQuestion
 from schemas.admin_schemas import AgentUpdateCreateRequest
 from services.admin_service import AdminService
 from services.agent_management_services import AgentManagementServices
@@ -20,6 +22,9 @@ from models.uploads import Upload
 from models.parsed_results import ParsedResult
 from utils.admin_auth import get_user_from_token
 from utils.db_helper import get_media_id_from_uuid
+from utils.candidate_context_cache import candidate_context_cache
+from utils.exchange_writer import exchange_writer
+from utils.agent_registry import agent_registry
 import uuid
 import logging
 import asyncio
@@ -59,17 +64,9 @@ def ensure_job_agents_exist(jobs: list, org_id: int):
                 interview_agent_name = f"{standardized_org_name}_{job_id}_interview_agent"
                 analysis_agent_name = f"{standardized_org_name}_{job_id}_interview_analysis_agent"
                 
-                existing_interview_agent = db.query(Agent).filter(
-                    Agent.name.like(f"{interview_agent_name}%"),
-                    Agent.org_id == org.id,
-                    Agent.is_active == True
-                ).first()
+                existing_interview_agent = agent_registry.get_active(interview_agent_name, org_id=org.id)
                 
-                existing_analysis_agent = db.query(Agent).filter(
-                    Agent.name.like(f"{analysis_agent_name}%"),
-                    Agent.org_id == org.id,
-                    Agent.is_active == True
-                ).first()
+                existing_analysis_agent = agent_registry.get_active(analysis_agent_name, org_id=org.id)
                 
                 if not existing_interview_agent:
                     default_interview_agent_prompt = f"""
@@ -462,8 +459,10 @@ def create_candidate_user_entity(username, email):
         logger.exception(f"[get_or_create_user] Exception: {str(e)}")
         raise HTTPException(status_code=500, detail="Error creating or fetching user.")
 
-def create_ent_session(user_id, session_uuid, session_context, session_metadata):
+async def create_ent_session(user_id, session_uuid, session_context, session_metadata):
     try:
+        needs_structuring = False
+        # the resume structuring agent runs once the connection is back in the pool, not inside this session
         with get_db_session() as db:
             existing_session = db.query(SessionModel).filter(SessionModel.uuid == session_uuid).first()
             if existing_session:
@@ -493,19 +492,8 @@ def create_ent_session(user_id, session_uuid, session_context, session_metadata)
                         parsed_results_data = db.query(ParsedResult).filter(ParsedResult.source_id == media_db_id).first()
                         
                         if parsed_results_data and not parsed_results_data.structured_result:
-                            resume_structuring_agent_config = {
-                                "name": "resume_structuring_agent",
-                                "context": {
-                                    "parsed_resume": parsed_results_data.raw_result
-                                }
-                            }
-                            
-                            structured_resume, llm_metadata = AgentServices.generic_agent(resume_structuring_agent_config)
-                            
-                            parsed_results_data.structured_result = structured_resume
-                            db.commit()
-                            
-                            logger.info(f"[create_ent_session] :: structured resume generated and saved for media_uuid: {media_uuid}")
+                            needs_structuring = True
+                            parsed_resume = parsed_results_data.raw_result
                         elif parsed_results_data:
                             logger.info(f"[create_ent_session] :: structured resume already exists for media_uuid: {media_uuid}")
                         else:
@@ -514,6 +502,21 @@ def create_ent_session(user_id, session_uuid, session_context, session_metadata)
                         logger.warning(f"[create_ent_session] :: media not yet parsed for media_uuid: {media_uuid}")
                 else:
                     logger.warning(f"[create_ent_session] :: media data not found for media_uuid: {media_uuid}")
+        
+        if needs_structuring:
+            resume_structuring_agent_config = {
+                "name": "resume_structuring_agent",
+                "user_id": user_id,
+                "context": {
+                    "parsed_resume": parsed_resume
+                }
+            }
+            
+            structured_resume, llm_metadata = await AgentServices.ageneric_agent(resume_structuring_agent_config)
+            
+            await asyncio.to_thread(ParserService.save_structured_result, media_db_id, media_uuid, structured_resume)
+            
+            logger.info(f"[create_ent_session] :: structured resume generated and saved for media_uuid: {media_uuid}")
                     
         return True
                     
@@ -530,23 +533,24 @@ async def ent_session_create_api(req: EntSessionCreateRequest):
         email = req.email
         jobid = req.jobid
         # todo :: accept org name or org id aswell here so that this becomes multitenant and all users session is linked to an org aswell now 
-        username, resume_download_url, candidate_id = fetch_candidate_info(email, jobid)
+        # the teamtailor calls, the resume download and parsing block, so they run on worker threads
+        username, resume_download_url, candidate_id = await asyncio.to_thread(fetch_candidate_info, email, jobid)
 
         user_id, user_uuid = create_candidate_user_entity(username, email)
 
-        tmp_file_path, resume_filename = download_candidate_resume(resume_download_url)
+        tmp_file_path, resume_filename = await asyncio.to_thread(download_candidate_resume, resume_download_url)
 
-        media_uuid = parse_candidate_resume(tmp_file_path, resume_filename, user_uuid)
+        media_uuid = await asyncio.to_thread(parse_candidate_resume, tmp_file_path, resume_filename, user_uuid)
 
         name_key = email + jobid
 
         session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
 
-        job_context = fetch_contexts(jobid, candidate_id)
+        job_context = await asyncio.to_thread(fetch_contexts, jobid, candidate_id)
         
         org_name = None
         with get_db_session() as db: 
-            org_agent = db.query(Agent).filter(Agent.name.contains(str(jobid))).first()
+            org_agent = db.query(Agent).filter(Agent.job_id == str(jobid)).first()
             org_id = org_agent.org_id if org_agent else None
             if org_id: 
                 org_data = db.query(Organisation).filter(Organisation.id == org_id).first()
@@ -569,7 +573,7 @@ async def ent_session_create_api(req: EntSessionCreateRequest):
             "analysis_agent" : f"{org_name}_{jobid}_interview_analysis_agent" if org_name else "ent_interview_analysis_agent"
             # todo :: add org name here or org id 
         }
-        is_session_created = create_ent_session(user_id, session_uuid, session_context, session_metadata)
+        is_session_created = await create_ent_session(user_id, session_uuid, session_context, session_metadata)
         
         if not is_session_created:
             logger.error(f"[ent_session_create_api] :: Session with uuid {session_uuid} already exists.")
@@ -638,7 +642,10 @@ async def reset_session_for_test_api(session_uuid : str):
     try:
         with get_db_session() as db: 
             existing_session = db.query(SessionModel).filter(SessionModel.uuid == session_uuid).first()
+            exchange_writer.discard_session(existing_session.id)
+            candidate_context_cache.invalidate_session(existing_session.id)
             del_conv_count = db.query(SessionExchange).filter(SessionExchange.session_id == existing_session.id).delete()
+            db.query(SessionQuestion).filter(SessionQuestion.session_id == existing_session.id).delete()
             db.delete(existing_session)
             db.commit()
         
@@ -678,18 +685,19 @@ class PaginatedAgentsResponse(BaseModel):
     total: int
     currentPage: int
     limit: int
+    nextCursor: Optional[str] = None
     agents: list
     
 # 4. Get all available agents of an org (INTERNAL and EXTERNAL)
 @ent_router.get("/agents/{org_name}", response_model=PaginatedAgentsResponse)
-def get_agents_of_org(request: Request, org_name: str, db: Session = Depends(get_db), page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=10)):
+def get_agents_of_org(request: Request, org_name: str, db: Session = Depends(get_db), page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=10), cursor: Optional[str] = Query(None)):
     try:
         user = get_user_from_token(request, db)
         if user.role == "USER":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="user not authorized")
         org_data = db.query(Organisation).filter(Organisation.name == org_name.lower().strip()).first()
         
-        result = AdminService.get_agents_of_org(db, org_id=org_data.id, page=page, limit=limit)
+        result = AdminService.get_agents_of_org(db, org_id=org_data.id, page=page, limit=limit, cursor=cursor)
         return result
     except HTTPException:
         raise
@@ -698,14 +706,14 @@ def get_agents_of_org(request: Request, org_name: str, db: Session = Depends(get
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
 @ent_router.get("/agents/{org_name}/{job_id}", response_model=PaginatedAgentsResponse)
-def get_all_agents_of_job_api(request: Request, org_name: str, job_id : int, db: Session = Depends(get_db)):
+def get_all_agents_of_job_api(request: Request, org_name: str, job_id : int, db: Session = Depends(get_db), page: int = Query(1, ge=1), limit: int = Query(50, ge=1, le=100), cursor: Optional[str] = Query(None)):
     try:
         user = get_user_from_token(request, db)
         if user.role == "USER":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="user not authorized")
         org_data = db.query(Organisation).filter(Organisation.name == org_name.lower().strip()).first()
         
-        result = AdminService.get_agents_of_org(db, org_id=org_data.id, page=1, limit=10, job_id=job_id)
+        result = AdminService.get_agents_of_org(db, org_id=org_data.id, page=page, limit=limit, job_id=job_id, cursor=cursor)
         return result
     except HTTPException:
         raise
@@ -713,6 +721,27 @@ def get_all_agents_of_job_api(request: Request, org_name: str, job_id : int, db:
         logger.exception(f"[admin_router.get_agents_of_org] :: Error retrieving agents: {str(e)}")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
+# agent with its prompt, the listings above leave the prompts out (INTERNAL and EXTERNAL)
+@ent_router.get("/agents/{org_name}/agent/{agent_uuid}")
+def get_agent_of_org_api(request: Request, org_name: str, agent_uuid: str, db: Session = Depends(get_db)):
+    try:
+        user = get_user_from_token(request, db)
+        if user.role == "USER":
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="user not authorized")
+        org_data = db.query(Organisation).filter(Organisation.name == org_name.lower().strip()).first()
+        if user.role == "EXTERNAL" and user.org_id != org_data.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="EXTERNAL users can only view agents of their own organisation")
+
+        agent = AdminService.get_agent_of_org(db, org_id=org_data.id, agent_uuid=agent_uuid)
+        if not agent:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="agent not found")
+        return agent
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"[admin_router.get_agent_of_org_api] :: Error retrieving agent: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 # 5. Update/create agent version (INTERNAL and EXTERNAL)
 @ent_router.post("/org/{org_name}/agents")
 def update_or_create_agent(request: Request, org_name: str, agent_data: AgentUpdateCreateRequest, db: Session = Depends(get_db)):
@@ -7,6 +7,8 @@ from models.payments import Payments
 from sqlalchemy import func, String, cast
 from models.users import User
 from utils.datetime_helper import StandardDT
+from utils.call_state_cache import call_state_cache
+from services.credit_ledger_service import CreditLedgerService
 from config import config
 import logging 
 
@@ -214,9 +216,13 @@ async def confirm_checkout_success(request: Request , session_data: dict):
             # adding credits to the user
             user = db.query(User).filter(User.id == user_uuid).first()
             credits = payment_details.get("credits", 0)
-            user.credits = (user.credits or 0) + credits
+            # the ledger entry is keyed by the payment so the webhook and this confirmation cannot both add the credits
+            CreditLedgerService.record_topup(db, user.id, credits, payment_details.get("payment_id"))
+            CreditLedgerService.sync_user_credits(db, user.id)
 
             db.commit()
+            # live calls of the user pick up the topped up credits on their next turn
+            call_state_cache.invalidate_user(user.id)
 
             return {
                 "success": True,
@@ -276,9 +282,12 @@ async def stripe_webhook(request: Request):
 
                 # update user credits since the checkout event type is completed from the stripe side itself
                 credits = int(payment_details.get("credits", 0))
-                user_data.credits = (user_data.credits or 0) + credits
+                CreditLedgerService.record_topup(db, user_data.id, credits, payment_id)
+                CreditLedgerService.sync_user_credits(db, user_data.id)
 
                 db.commit()
+                # live calls of the user pick up the topped up credits on their next turn
+                call_state_cache.invalidate_user(user_data.id)
 
             return {"status": "success"}
 
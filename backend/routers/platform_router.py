@@ -1,11 +1,11 @@
 import asyncio
 import json
-import time
 from typing import Any, Dict, List, Optional
 import uuid
 from fastapi import APIRouter, File, Request, UploadFile, HTTPException, Form
 import logging
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTasks
 import httpx
 from pydantic import BaseModel
 from models.agents import Agent
@@ -16,12 +16,23 @@ from models.sessions import Session, SessionStatusEnum
 from models.uploads import Upload
 from models.users import User
 from services.agent_services import AgentServices
+from services.credit_ledger_service import CreditLedgerService
 from services.media_service import MediaManagementService
 from services.parser_service import ParserService
-from services.workflow_services import analyse_interview_workflow, ent_analyse_interview_workflow
+from services.session_question_service import SessionQuestionService
+from services.workflow_services import aanalyse_interview_workflow, aent_analyse_interview_workflow, astream_analyse_interview_workflow
 from utils.datetime_helper import StandardDT
-from utils.llm_helper import generate_with_gemini
+from utils.llm_helper import agenerate_with_gemini
+from utils.llm_scheduler import LLMPriority
 from utils.db_helper import get_media_id_from_uuid
+from utils.call_state_cache import call_state_cache, load_call_state, persist_call_credits, terminate_call
+from utils.exchange_writer import exchange_writer
+from utils.instruction_cache import instruction_cache
+from utils.sse_encoder import ChatCompletionChunkEncoder, DONE_EVENT, data_event
+from utils.history_compactor import compact_history
+from utils.model_router import route_turn
+from utils.turn_timer import TurnTimer, current_turn_timer
+from utils.candidate_context_cache import candidate_context_cache
 from sqlalchemy import func
 from config import config
 
@@ -106,13 +117,9 @@ async def media_upload_handler_api(request: Request, file: UploadFile = File(...
                 }
             }
             
-            structured_resume, llm_metadata1 = AgentServices.generic_agent(resume_structuring_agent_config)
+            structured_resume, llm_metadata1 = await AgentServices.ageneric_agent(resume_structuring_agent_config)
             
-            # todo :: move this into parser service or ingext media only later 
-            with get_db_session() as db: 
-                parsed_results_data = db.query(ParsedResult).filter(ParsedResult.source_id == media_db_id).first()
-                parsed_results_data.structured_result = structured_resume
-                db.commit()
+            await asyncio.to_thread(ParserService.save_structured_result, media_db_id, media_uuid, structured_resume)
         
         # if not parsed_result: 
         #     return { "message" : "failed to parse the document"}
@@ -150,131 +157,87 @@ async def context_upload_handler_api(request: Request, req: createInterviewQuest
         
         user_uuid = request.state.bearer_token or "" # todo ::  or "" is a temp solution remove later 
         
-        response_data = None
+        this_session_llm_metadatas = {}
+        this_session_contexts = {}
+        needs_structuring = False
         
+        # only reads here, the resume structuring agent runs once the connection is back in the pool
         with get_db_session() as db:
             user_data = db.query(User).filter(User.uuid == user_uuid).first()
             
-            this_session_llm_metadatas = {}
-            this_session_contexts = {}
             # in case no media is supplied 
             if not media_uuid or media_uuid == "":
-                
-                this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
-                this_session_contexts["assessment_area"] = assessment_area
-                
+                session_user_id = user_data.id
+                parsing_completed = False
                 name_key = user_uuid + StandardDT.get_iso_dt_string() # no media here so empty session uuid name key with user uuid and current time
-                
-                session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
-                
-                # create a new session and save the generated questions against it 
-                new_session = Session(
-                    user_id = user_data.id,
-                    uuid = session_uuid,
-                    # session_questions = generated_questions,
-                    session_metadata = this_session_llm_metadatas,
-                    contexts = this_session_contexts,
-                    status = SessionStatusEnum.CREATED.value
-                )
-                
-                # to return as response , the session id for the interview and the generated questions 
-                response_data = {
-                    "sessionId" : session_uuid,
-                    # "sessionQuestions" : generated_questions
-                }
-                
-                db.add(new_session)
-                db.commit()             
             else: 
         
                 media_data = db.query(Upload).filter(Upload.uuid == media_uuid).first()
                 parsing_metadata = media_data.parsing_metadata
-                
+                session_user_id = media_data.user_id
+                parsing_completed = parsing_metadata.get("parsing_status", "") == "COMPLETED"
                             
                 # if media id is present and its already been parsed 
-                if parsing_metadata.get("parsing_status", "") == "COMPLETED":
+                if parsing_completed:
                     media_db_id = get_media_id_from_uuid(media_uuid)
                     
                     # get the parsed result using the integer ID
                     parsed_results_data = db.query(ParsedResult).filter(ParsedResult.source_id == media_db_id).first()
                     
-                    structured_resume = None
-                    # this_session_llm_metadatas = {}
-                    # this_session_contexts = {}
                     if not parsed_results_data.structured_result: # note :: for v2 this wont hit 
-                        # setup the resume structuring agent config 
-                        resume_structuring_agent_config = {
-                            "name" : "resume_structuring_agent",
-                            "context" : {
-                                "parsed_resume" : parsed_results_data.raw_result
-                            }
-                        }
-
-                        this_session_contexts["selected_resume_media_uuid"] = media_uuid 
-                        
-                        structured_resume, llm_metadata1 = AgentServices.generic_agent(resume_structuring_agent_config)
-
-                        this_session_llm_metadatas["resume_structuring_agent"] = llm_metadata1
-                    
-                        # caching the structured resume result into hte parsed results data aswell
-                        parsed_results_data.structured_result = structured_resume
-                    else: 
-                        structured_resume = parsed_results_data.structured_result
-                        this_session_contexts["selected_resume_media_uuid"] = media_uuid 
-                    
-                    this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
-                    this_session_contexts["assessment_area"] = assessment_area
+                        needs_structuring = True
+                        parsed_resume = parsed_results_data.raw_result
                     
+                    this_session_contexts["selected_resume_media_uuid"] = media_uuid 
                     name_key = media_uuid + StandardDT.get_iso_dt_string()
-                    
-                    session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))               
-                    
-                    # create a new session and save the generated questions against it 
-                    new_session = Session(
-                        user_id = media_data.user_id,
-                        uuid = session_uuid,
-                        # session_questions = generated_questions,
-                        session_metadata = this_session_llm_metadatas,
-                        contexts = this_session_contexts,
-                        status = SessionStatusEnum.CREATED.value
-                    )
-                    
-                    # to return as response , the session id for the interview and the generated questions 
-                    response_data = {
-                        "sessionId" : session_uuid,
-                        # "sessionQuestions" : generated_questions
-                    }
-                    
-                    db.add(new_session)
-                    db.commit()
                 else: # note :: media was not parsed but media id was given
-                    
-                    this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
-                    this_session_contexts["assessment_area"] = assessment_area
-                    
                     name_key = user_uuid + StandardDT.get_iso_dt_string()
-                    
-                    session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))           
-                    
-                    # create a new session and save the generated questions against it 
-                    new_session = Session(
-                        user_id = media_data.user_id,
-                        uuid = session_uuid,
-                        # session_questions = generated_questions,
-                        session_metadata = this_session_llm_metadatas,
-                        contexts = this_session_contexts,
-                        status = SessionStatusEnum.CREATED.value
-                    )
-                    
-                    # to return as response , the session id for the interview and the generated questions 
-                    response_data = {
-                        "sessionId" : session_uuid,
-                        # "sessionQuestions" : generated_questions
-                    }
-                    
-                    db.add(new_session)
-                    db.commit()                
-                
+        
+        if needs_structuring:
+            # setup the resume structuring agent config 
+            resume_structuring_agent_config = {
+                "name" : "resume_structuring_agent",
+                "user_id" : session_user_id,
+                "context" : {
+                    "parsed_resume" : parsed_resume
+                }
+            }
+            
+            structured_resume, llm_metadata1 = await AgentServices.ageneric_agent(resume_structuring_agent_config)
+
+            this_session_llm_metadatas["resume_structuring_agent"] = llm_metadata1
+        
+            # caching the structured resume result into hte parsed results data aswell
+            await asyncio.to_thread(ParserService.save_structured_result, media_db_id, media_uuid, structured_resume)
+        
+        this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
+        this_session_contexts["assessment_area"] = assessment_area
+        
+        session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
+        
+        with get_db_session() as db:
+            # create a new session and save the generated questions against it 
+            new_session = Session(
+                user_id = session_user_id,
+                uuid = session_uuid,
+                # session_questions = generated_questions,
+                session_metadata = this_session_llm_metadatas,
+                contexts = this_session_contexts,
+                status = SessionStatusEnum.CREATED.value
+            )
+            db.add(new_session)
+            db.commit()
+        
+        if parsing_completed:
+            # sessions built from this resume before it was structured need a fresh candidate context
+            candidate_context_cache.invalidate_media(media_uuid)
+        
+        # to return as response , the session id for the interview and the generated questions 
+        response_data = {
+            "sessionId" : session_uuid,
+            # "sessionQuestions" : generated_questions
+        }
+        
         # return the generated questions and the created session id 
         return response_data
     
@@ -282,8 +245,33 @@ async def context_upload_handler_api(request: Request, req: createInterviewQuest
         logger.exception("[platform_router | context_upload_handler_api v2] :: caught exception")
         raise HTTPException(status_code=500)
 
+def create_question_session(user_id: int, name_key: str, generated_questions: Any, llm_metadatas: Dict[str, Any], contexts: Dict[str, Any]) -> Dict[str, Any]:
+    """creates a new session with the generated questions, returns the session id and the questions"""
+    session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
+    
+    with get_db_session() as db:
+        # create a new session and save the generated questions against it 
+        new_session = Session(
+            user_id = user_id,
+            uuid = session_uuid,
+            session_questions = generated_questions,
+            session_metadata = llm_metadatas,
+            contexts = contexts,
+            status = SessionStatusEnum.CREATED.value
+        )
+        db.add(new_session)
+        db.commit()
+    
+    # to return as response , the session id for the interview and the generated questions 
+    return {
+        "sessionId" : session_uuid,
+        "sessionQuestions" : generated_questions
+    }
+
+# with stream=true the generated questions are sent as sse events, each question as soon as the agent completed it,
+# then { type : "result", result } with the session id and all the questions and [DONE]
 @platform_router.post("/context/upload")
-async def context_upload_handler_api(request: Request, req: createInterviewQuestionsApiReq):
+async def context_upload_handler_api(request: Request, req: createInterviewQuestionsApiReq, stream: bool = False):
     try:
         media_uuid = req.mediaId
         other_context = req.otherContext
@@ -291,59 +279,27 @@ async def context_upload_handler_api(request: Request, req: createInterviewQuest
         
         user_uuid = request.state.bearer_token or "" # todo ::  or "" is a temp solution remove later 
         
-        response_data = None
+        this_session_llm_metadatas = {}
+        this_session_contexts = {}
+        structured_resume = ""
+        parsed_resume = None
+        needs_structuring = False
+        invalidate_media_uuid = None
         
+        # only reads here, the resume structuring agent runs once the connection is back in the pool
         with get_db_session() as db:
             user_data = db.query(User).filter(User.uuid == user_uuid).first()
             
-            this_session_llm_metadatas = {}
-            this_session_contexts = {}
             # in case no media is supplied 
             if not media_uuid or media_uuid == "":
-                question_gen_agent_config = {
-                    "name" : "question_gen_agent",
-                    "context" : {
-                        "candidate_resume" : "",
-                        "assessment_area" : assessment_area,
-                        "candidates_other_contexts" : other_context,
-                    }
-                } 
-                
-                this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
-                this_session_contexts["assessment_area"] = assessment_area
-                
-                generated_questions, llm_metadata2 = AgentServices.generic_agent(question_gen_agent_config)
-                
-                this_session_llm_metadatas["question_gen_agent"] = llm_metadata2
-                
+                session_user_id = user_data.id
                 name_key = user_uuid + StandardDT.get_iso_dt_string() # no media here so empty session uuid name key with user uuid and current time
-                
-                session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
-                
-                # create a new session and save the generated questions against it 
-                new_session = Session(
-                    user_id = user_data.id,
-                    uuid = session_uuid,
-                    session_questions = generated_questions,
-                    session_metadata = this_session_llm_metadatas,
-                    contexts = this_session_contexts,
-                    status = SessionStatusEnum.CREATED.value
-                )
-                
-                # to return as response , the session id for the interview and the generated questions 
-                response_data = {
-                    "sessionId" : session_uuid,
-                    "sessionQuestions" : generated_questions
-                }
-                
-                db.add(new_session)
-                db.commit()             
             else: 
         
                 media_data = db.query(Upload).filter(Upload.uuid == media_uuid).first()
                 parsing_metadata = media_data.parsing_metadata
+                session_user_id = media_data.user_id
                 
-                            
                 # if media id is present and its already been parsed 
                 if parsing_metadata.get("parsing_status", "") == "COMPLETED":
                     media_db_id = get_media_id_from_uuid(media_uuid)
@@ -351,112 +307,78 @@ async def context_upload_handler_api(request: Request, req: createInterviewQuest
                     # get the parsed result using the integer ID
                     parsed_results_data = db.query(ParsedResult).filter(ParsedResult.source_id == media_db_id).first()
                     
-                    structured_resume = None
-                    # this_session_llm_metadatas = {}
-                    # this_session_contexts = {}
+                    this_session_contexts["selected_resume_media_uuid"] = media_uuid 
                     if not parsed_results_data.structured_result:
-                        # setup the resume structuring agent config 
-                        resume_structuring_agent_config = {
-                            "name" : "resume_structuring_agent",
-                            "context" : {
-                                "parsed_resume" : parsed_results_data.raw_result
-                            }
-                        }
-
-                        this_session_contexts["selected_resume_media_uuid"] = media_uuid 
-                        
-                        structured_resume, llm_metadata1 = AgentServices.generic_agent(resume_structuring_agent_config)
-
-                        this_session_llm_metadatas["resume_structuring_agent"] = llm_metadata1
-                    
-                        # caching the structured resume result into hte parsed results data aswell
-                        parsed_results_data.structured_result = structured_resume
+                        needs_structuring = True
+                        parsed_resume = parsed_results_data.raw_result
                     else: 
                         structured_resume = parsed_results_data.structured_result
-                        this_session_contexts["selected_resume_media_uuid"] = media_uuid 
-                    
-                    # setup the question gen agent config 
-                    question_gen_agent_config = {
-                        "name" : "question_gen_agent",
-                        "context" : {
-                            "candidate_resume" : structured_resume,
-                            "assessment_area" : assessment_area,
-                            "candidates_other_contexts" : other_context,
-                        }
-                    }
-                    
-                    this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
-                    this_session_contexts["assessment_area"] = assessment_area
-                    
-                    generated_questions, llm_metadata2 = AgentServices.generic_agent(question_gen_agent_config)
-                    
-                    this_session_llm_metadatas["question_gen_agent"] = llm_metadata2
                     
                     name_key = media_uuid + StandardDT.get_iso_dt_string()
-                    
-                    session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
-                    
-                    # create a new session and save the generated questions against it 
-                    new_session = Session(
-                        user_id = media_data.user_id,
-                        uuid = session_uuid,
-                        session_questions = generated_questions,
-                        session_metadata = this_session_llm_metadatas,
-                        contexts = this_session_contexts,
-                        status = SessionStatusEnum.CREATED.value
-                    )
-                    
-                    # to return as response , the session id for the interview and the generated questions 
-                    response_data = {
-                        "sessionId" : session_uuid,
-                        "sessionQuestions" : generated_questions
-                    }
-                    
-                    db.add(new_session)
-                    db.commit()
+                    # sessions built from this resume before it was structured need a fresh candidate context
+                    invalidate_media_uuid = media_uuid
                 else: 
-                    # setup the question gen agent config 
-                    question_gen_agent_config = {
-                        "name" : "question_gen_agent",
-                        "context" : {
-                            "candidate_resume" : "", # since parsing was not completed, resume is left empty
-                            "assessment_area" : assessment_area,
-                            "candidates_other_contexts" : other_context,
-                        }
-                    }
-                    
-                    this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
-                    this_session_contexts["assessment_area"] = assessment_area
-                    
-                    generated_questions, llm_metadata2 = AgentServices.generic_agent(question_gen_agent_config)
-                    
-                    this_session_llm_metadatas["question_gen_agent"] = llm_metadata2
-                    
+                    # since parsing was not completed, resume is left empty
                     name_key = user_uuid + StandardDT.get_iso_dt_string()
-                    
-                    session_uuid = str(uuid.uuid5(uuid.NAMESPACE_DNS, name_key))
-                    
-                    # create a new session and save the generated questions against it 
-                    new_session = Session(
-                        user_id = media_data.user_id,
-                        uuid = session_uuid,
-                        session_questions = generated_questions,
-                        session_metadata = this_session_llm_metadatas,
-                        contexts = this_session_contexts,
-                        status = SessionStatusEnum.CREATED.value
-                    )
-                    
-                    # to return as response , the session id for the interview and the generated questions 
-                    response_data = {
-                        "sessionId" : session_uuid,
-                        "sessionQuestions" : generated_questions
-                    }
-                    
-                    db.add(new_session)
-                    db.commit()                
-                
+        
+        if needs_structuring:
+            # setup the resume structuring agent config 
+            resume_structuring_agent_config = {
+                "name" : "resume_structuring_agent",
+                "user_id" : session_user_id,
+                "context" : {
+                    "parsed_resume" : parsed_resume
+                }
+            }
+            
+            structured_resume, llm_metadata1 = await AgentServices.ageneric_agent(resume_structuring_agent_config)
+
+            this_session_llm_metadatas["resume_structuring_agent"] = llm_metadata1
+        
+            # caching the structured resume result into hte parsed results data aswell
+            await asyncio.to_thread(ParserService.save_structured_result, media_db_id, media_uuid, structured_resume)
+        
+        # setup the question gen agent config 
+        question_gen_agent_config = {
+            "name" : "question_gen_agent",
+            "user_id" : session_user_id,
+            "context" : {
+                "candidate_resume" : structured_resume,
+                "assessment_area" : assessment_area,
+                "candidates_other_contexts" : other_context,
+            }
+        }
+        
+        this_session_contexts["candidates_other_contexts"] = other_context.model_dump()
+        this_session_contexts["assessment_area"] = assessment_area
+        
+        def create_session(generated_questions, llm_metadata2):
+            this_session_llm_metadatas["question_gen_agent"] = llm_metadata2
+            response_data = create_question_session(session_user_id, name_key, generated_questions, this_session_llm_metadatas, this_session_contexts)
+            if invalidate_media_uuid:
+                candidate_context_cache.invalidate_media(invalidate_media_uuid)
+            return response_data
+        
+        if stream:
+            async def questions_stream():
+                try:
+                    async for event in AgentServices.astream_agent(question_gen_agent_config):
+                        if event["type"] != "result":
+                            yield data_event(event)
+                            continue
+                        response_data = await asyncio.to_thread(create_session, event["result"], event["llm_metadata"])
+                        yield data_event({"type" : "result", "result" : response_data})
+                    yield DONE_EVENT
+                except Exception as e:
+                    logger.exception("[platform_router | context_upload_handler_api] :: caught exception while streaming the questions")
+                    yield ChatCompletionChunkEncoder.error(str(e))
+            
+            return StreamingResponse(questions_stream(), media_type='text/event-stream')
+        
+        generated_questions, llm_metadata2 = await AgentServices.ageneric_agent(question_gen_agent_config)
+        
         # return the generated questions and the created session id 
-        return response_data
+        return create_session(generated_questions, llm_metadata2)
     
     except Exception: 
         logger.exception("[platform_router | context_upload_handler_api] :: caught exception")
@@ -482,6 +404,8 @@ async def link_callid_to_session_api(request: Request, req : dict):
                 if total_elapsed_time < 16:
                     logger.info("[platform_router | link_callid_to_session_api ent] :: last session was too short, session able to relink to new call")
                     logger.info("[platform_router | link_callid_to_session_api ent] :: deleting this session old conversation data for reset")
+                    exchange_writer.discard_session(session_data.id)
+                    candidate_context_cache.invalidate_session(session_data.id)
                     del_row_count = db.query(SessionExchange).filter(SessionExchange.session_id == session_data.id).delete()
                     logger.info("[platform_router | link_callid_to_session_api ent] :: deleted %s old exchanges of the session.", del_row_count)
                     session_data.call_id = call_id
@@ -491,6 +415,12 @@ async def link_callid_to_session_api(request: Request, req : dict):
                     response_data = "session already linked and completed, cannot link new call id"
                 
             db.commit()
+        
+        # drop any state of an older call of this session and warm the cache for the linked call
+        call_state_cache.invalidate_session(session_id)
+        call_state = await asyncio.to_thread(load_call_state, session_uuid=session_id)
+        if call_state and call_state["call_id"]:
+            call_state_cache.put(call_state["call_id"], call_state)
             
         return { "message" : response_data}
     
@@ -512,6 +442,13 @@ async def link_callid_to_session_api(request: Request, req : dict):
             
             session_data.call_id = call_id
             db.commit()
+            candidate_context_cache.invalidate_session(session_data.id)
+        
+        # warm the call state cache so the first turn of the call skips the database
+        call_state_cache.invalidate_session(session_id)
+        call_state = await asyncio.to_thread(load_call_state, call_id=call_id, session_uuid=session_id, agent_name="interviewer_agent")
+        if call_state:
+            call_state_cache.put(call_id, call_state)
                     
         return { "message" : f"linked callid {call_id} to session ({session_id})"}
     
@@ -580,10 +517,40 @@ async def terminate_session_stream():
     finally:
         yield "data: [DONE]\n\n"  # Signal the end of the stream
 
+# to get the cached live state of a call, loading it from the database on the first turn of the call
+async def get_call_state(call_id: str, agent_name: str = None):
+    call_state = call_state_cache.get(call_id)
+    if call_state is None:
+        call_state = await asyncio.to_thread(load_call_state, call_id=call_id, agent_name=agent_name)
+        if call_state:
+            call_state_cache.put(call_id, call_state)
+    return call_state
+
+RETRIEVE_CONTEXT_TOOL_NOTE = "- `retrieve_context`: Use this tool to get the user's resume or other relevant context. You MUST use this tool when the user asks a question related to their resume or personal context."
+PREFETCHED_RETRIEVE_CONTEXT_TOOL_NOTE = "- `retrieve_context`: Fallback only. The candidate context is already given in this instruction, use this tool only when something you need is missing from it."
+
+
+async def prefetch_candidate_context(call_state: Dict[str, Any]) -> Optional[str]:
+    """
+    the candidate context (resume, session contexts, job details) rendered once per call for the instruction, when the
+    agent has "prefetch_candidate_context" on in its config. it then sits in the cached prefix and the model does not
+    need a retrieve_context round trip on every turn. None when the mode is off or the context could not be built,
+    the tool is the way to the context then.
+    """
+    if not (call_state["agent_config"] or {}).get("prefetch_candidate_context"):
+        return None
+    try:
+        candidate_context = await asyncio.to_thread(candidate_context_cache.get, call_state["session_id"])
+        return json.dumps(candidate_context, default=str)
+    except Exception:
+        logger.exception("[platform_router | prefetch_candidate_context] :: could not prefetch context of session = %s, falling back to the tool", call_state["session_id"])
+        return None
+
 # interview live run agent with chat completion endpoint for vapi to connect to     
 @platform_router.post("/v3/chat/completions")
 async def stream_interview_response_api(req: ChatCompletionRequest):
     try:
+        turn_timer = TurnTimer("/v3/chat/completions")
         call_id = None
         # Check if there's a call_id field in the request or any custom fields that might contain it
         if hasattr(req, 'call') and req.call.id:
@@ -604,42 +571,57 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
         user_id = None
         session_id = None
         
+        # live call state, only the first turn of a call reads the database
+        turn_timer.start("bootstrap")
+        call_state = await get_call_state(call_id)
+        turn_timer.stop("bootstrap")
+        turn_timer.session_id = call_state["session_id"]
+        turn_timer.agent_version = call_state["agent_version"]
+        turn_timer.turn = sum(1 for msg in req.messages if msg.role == "user")
+        
+        # quickly reject the TERMINATED session
+        if call_state["status"] == SessionStatusEnum.TERMINATED.value:
+            logger.info("[chat_completions ent] :: rejecting further processing as session is already terminated")
+            return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
+        
         # used up session credits with user credits calculation block
-        with  get_db_session() as db:
-            session_data = db.query(Session).filter(Session.call_id == str(call_id)).first()
-            
-            # quickly reject the TERMINATED session
-            if session_data.status == SessionStatusEnum.TERMINATED.value:
-                logger.info("[chat_completions ent] :: rejecting further processing as session is already terminated")
-                return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
-             
-            user_data = db.query(User).filter(User.id == session_data.user_id).first()
-            session_credits = session_data.used_credits if session_data.used_credits else int(0) # todo :: setup default to 0 on session creation 
-            existing_user_credits = user_data.credits if user_data.credits else int(20)
-            
-            # updating this from <= 1 to -3 giving a 3 minutes/credits extra for the payment to go through before terminating
-            # if (existing_user_credits - elapsed_session_time) <= -3:
-            #     # then user credits have been used up so expire the session and update user credits to 0 asap
-            #     session_data.status = SessionStatusEnum.TERMINATED.value
-            #     user_data.credits = 0
-            #     session_data.used_credits = round(elapsed_session_time)
-            #     db.commit()
-            #     logger.info("[chat_completions ent] :: user credits emptied so terminated this session and ending further process")
-            #     return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
-            # else: 
-            # then user credits will be updated to :: current_user_credits - (elapsed_session_time - prev_session_credits_used)
-            user_data.credits = existing_user_credits - (round(elapsed_session_time) - session_credits)
-            # updating the session_used_credits to current elapsed_session_time to keep track 
-            session_data.used_credits = round(elapsed_session_time)
-            parsed_context = session_data.contexts if session_data.contexts else {}
-            
-            ent_agent_name = session_data.session_metadata.get("interview_agent", "ent_interview_agent") if session_data.session_metadata else str("ent_interview_agent")
-            
-            logger.info("[chat_completions ent] :: running session for agent = %s", ent_agent_name)
-            
-            interview_agent = db.query(Agent).filter(Agent.name.startswith(ent_agent_name), Agent.is_active == True).first()
-            
-            system_instruction = f"""{interview_agent.prompt}
+        session_credits = call_state["used_credits"]
+        existing_user_credits = call_state["user_credits"] if call_state["user_credits"] else int(20)
+        
+        # updating this from <= 1 to -3 giving a 3 minutes/credits extra for the payment to go through before terminating
+        # if (existing_user_credits - elapsed_session_time) <= -3:
+        #     # then user credits have been used up so expire the session and update user credits to 0 asap
+        #     session_data.status = SessionStatusEnum.TERMINATED.value
+        #     user_data.credits = 0
+        #     session_data.used_credits = round(elapsed_session_time)
+        #     db.commit()
+        #     logger.info("[chat_completions ent] :: user credits emptied so terminated this session and ending further process")
+        #     return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
+        # else: 
+        # then user credits will be updated to :: current_user_credits - (elapsed_session_time - prev_session_credits_used)
+        credits_delta = round(elapsed_session_time) - session_credits
+        call_state["user_credits"] = existing_user_credits - credits_delta
+        # updating the session_used_credits to current elapsed_session_time to keep track 
+        call_state["used_credits"] = round(elapsed_session_time)
+        call_state["status"] = SessionStatusEnum.ACTIVE.value
+        
+        logger.info("[chat_completions ent] :: running session for agent = %s", call_state["agent_name"])
+        
+        # the instruction is stable for the whole session so it is built once per call and cached on the gemini
+        # side, the elapsed time goes out with the latest candidate message instead
+        turn_timer.start("prompt")
+        if not call_state["system_instruction"]:
+            parsed_context = call_state["contexts"]
+            candidate_context = await prefetch_candidate_context(call_state)
+            if candidate_context is None:
+                retrieve_context_note = RETRIEVE_CONTEXT_TOOL_NOTE
+                context_guidance = '## Always use the "retrieve_context" to get the resume context of the user to generate every question.'
+                candidate_context_section = ""
+            else:
+                retrieve_context_note = PREFETCHED_RETRIEVE_CONTEXT_TOOL_NOTE
+                context_guidance = "## Always use the candidate context (resume) given below to generate every question."
+                candidate_context_section = f"---\ncandidate context (already retrieved for this session) = \n{candidate_context}\n---"
+            call_state["system_instruction"] = f"""{call_state["agent_prompt"]}
             ---
             context = 
             These are the job details you are currently interviewing for: 
@@ -654,26 +636,40 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
             are present then there were no preliminary questions at all. 
             
             
-            Total elapsed time in minutes for this session: {elapsed_session_time}
+            Total elapsed time in minutes for this session is given in the session clock note of the latest candidate message.
 
             You have access to the following tools:
-            - `retrieve_context`: Use this tool to get the user's resume or other relevant context. You MUST use this tool when the user asks a question related to their resume or personal context.
+            {retrieve_context_note}
             - `main_question_setter`: Use this tool to set the main interview question.
             
-            ## Always use the "retrieve_context" to get the resume context of the user to generate every question.
+            {context_guidance}
             ## When a new or fresh interview question is generated or pulled from the context always silently invoke the "main_question_setter" tool, dont miss this
 
-            The current session_id is: {session_data.id}. You must pass this session_id to the tools when you call them.
+            The current session_id is: {call_state["session_id"]}. You must pass this session_id to the tools when you call them.
             
             Do not generate code snippets. Call the tools directly when needed.
             
             ## NOTE :: Speak only what you would respond to the candidate. Dont include any thought process or tool call mentions in the response.
+            {candidate_context_section}
             """
-            # question_context = session_data.session_questions
-            session_data.status = SessionStatusEnum.ACTIVE.value
-            user_id = session_data.user_id
-            session_id = session_data.id
-            db.commit()
+        
+        system_instruction = call_state["system_instruction"]
+        # model and temperature of the agent config, routed to a model tier per turn when the agent has model routing
+        model_settings = route_turn(call_state["agent_config"], turn_timer.turn, candidate_latest_message, call_state["last_main_question_turn"])
+        logger.info("[chat_completions ent] :: turn %s routed to tier = %s model = %s", turn_timer.turn, model_settings["tier"], model_settings["model"])
+        cached_content = instruction_cache.get(call_state["session_uuid"], model_settings["model"], system_instruction, [retrieve_context, main_question_setter])
+        # question_context = session_data.session_questions
+        user_id = call_state["user_id"]
+        session_id = call_state["session_id"]
+        call_state_cache.put(call_id, call_state)
+        
+        # credits are written back once the response is sent, off the hot path of the turn
+        # the timings of the turn are stored after it, once the credits are written
+        turn_background_tasks = BackgroundTasks()
+        turn_background_tasks.add_task(
+            turn_timer.timed, "persist", persist_call_credits, session_id, call_state["call_id"], user_id, call_state["used_credits"], credits_delta, call_state["status"]
+        )
+        turn_background_tasks.add_task(turn_timer.finish)
                     
         # Convert OpenAI-style messages to Gemini format
         gemini_messages = []
@@ -686,30 +682,50 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                 gemini_messages.append({"role": "model", "parts": [{"text": content}]})
             elif role == 'function' or role == 'tool':
                 gemini_messages.append({"role": "model", "parts": [{"text": f"Function result: {content}"}]})       
+        
+        # older exchanges are replaced by a rolling summary when the agent has history compaction on
+        gemini_messages = compact_history(call_state, gemini_messages)
+        
+        session_clock_note = {"text": f"(session clock note :: total elapsed time in minutes for this session: {elapsed_session_time})"}
+        if gemini_messages and gemini_messages[-1]["role"] == "user":
+            gemini_messages[-1]["parts"].append(session_clock_note)
+        else:
+            gemini_messages.append({"role": "user", "parts": [session_clock_note]})
+                
+        turn_timer.stop("prompt")
                 
         # Set up streaming response
         async def generate():
+            sse_encoder = ChatCompletionChunkEncoder(coalesce=config.SSE_COALESCE_SENTENCES)
+            current_turn_timer.set(turn_timer)
             try:
                 available_functions = {
                     "retrieve_context": retrieve_context,
                     "main_question_setter": main_question_setter
                 }
 
-                stream = generate_with_gemini(
+                turn_timer.model_started()
+                stream = await agenerate_with_gemini(
                     prompt=gemini_messages,
-                    model="gemini-2.0-flash",
+                    model=model_settings["model"],
+                    temperature=model_settings["temperature"],
                     stream=True,
                     system_instruction=system_instruction,
                     tools=[retrieve_context, main_question_setter],
                     auto_execute_functions=True,
-                    available_functions=available_functions
+                    available_functions=available_functions,
+                    cached_content=cached_content,
+                    priority=LLMPriority.LIVE_TURN,
+                    org_id=call_state["org_id"],
+                    user_id=call_state["user_id"],
+                    agent_name=call_state["agent_name"],
                 )
                 
                 combined_chunks = ""
                 per_chunk_llm_metadata = []
                 tool_call_started = False
                 
-                for chunk in stream:
+                async for chunk in stream:
                     try:
                         if hasattr(chunk, 'usage_metadata'):
                             chunk_llm_metadata = {
@@ -749,55 +765,40 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                                                     tool_call_started = True
                                                     
                                                     # Create OpenAI-compatible format for tool calls
-                                                    openai_tool_chunk = {
-                                                        "id": "chatcmpl-" + str(hash(function_name))[:10],
-                                                        "object": "chat.completion.chunk",
-                                                        "created": int(time.time()),
-                                                        "choices": [{
-                                                            "index": 0,
-                                                            "delta": {"tool_calls": [current_tool_call]},
-                                                            "finish_reason": None
-                                                        }]
-                                                    }
-                                                    yield f"data: {json.dumps(openai_tool_chunk)}\n\n"
+                                                    yield sse_encoder.tool_call(current_tool_call)
                                             # Check if this part contains text
                                             elif hasattr(part, 'text') and part.text:
-                                                openai_chunk = {
-                                                    "id": "chatcmpl-" + str(hash(str(part.text)))[:10],
-                                                    "object": "chat.completion.chunk",
-                                                    "created": int(time.time()),
-                                                    "choices": [{
-                                                        "index": 0,
-                                                        "delta": {"content": part.text},
-                                                        "finish_reason": None
-                                                    }]
-                                                }
-                                                yield f"data: {json.dumps(openai_chunk)}\n\n"
+                                                turn_timer.first_token()
+                                                sse_event = sse_encoder.push(part.text)
+                                                if sse_event:
+                                                    yield sse_event
                                                 combined_chunks += part.text
                         # Backwards compatibility - try direct text access if needed
                         elif hasattr(chunk, 'text') and chunk.text:
-                            openai_chunk = {
-                                "id": "chatcmpl-" + str(hash(str(chunk.text)))[:10],
-                                "object": "chat.completion.chunk",
-                                "created": int(time.time()),
-                                "choices": [{
-                                    "index": 0,
-                                    "delta": {"content": chunk.text},
-                                    "finish_reason": None
-                                }]
-                            }
-                            yield f"data: {json.dumps(openai_chunk)}\n\n"
+                            turn_timer.first_token()
+                            sse_event = sse_encoder.push(chunk.text)
+                            if sse_event:
+                                yield sse_event
                             combined_chunks += chunk.text
 
                     except Exception as e:
                         logger.exception("[platform_router | chat_completions ent] | streaming :: Error processing chunk: %s", str(e))
                         continue                               
 
+                remaining_event = sse_encoder.flush()
+                if remaining_event:
+                    yield remaining_event
+                turn_timer.response_done()
+                # the model routing counts the turns since the interviewer last set a main question
+                if "main_question_setter" in turn_timer.tools_called:
+                    call_state["last_main_question_turn"] = turn_timer.turn
+
                 logger.info("[platform_router | chat_completions ent] | streaming :: Streaming completed")
 
                 # save this session exchange object for final analysis
-                with get_db_session() as db: 
-                    new_session_exchange = SessionExchange(
+                # buffered, the exchange writer commits it in a batch off the tail of the stream
+                with turn_timer.phase("persist"):
+                    exchange_writer.add(
                         user_id = user_id,
                         session_id = session_id,
                         data = {
@@ -806,33 +807,28 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                         },
                         exchange_metadata = per_chunk_llm_metadata
                     )
-                    
-                    db.add(new_session_exchange)
-                    db.commit()
                 
                 
-                yield "data: [DONE]\n\n"
+                yield DONE_EVENT
                 
             except Exception as e:
                 logger.exception("[platform_router | chat_completions ent] | streaming :: caught exception")
-                error_chunk = {
-                    "error": str(e)
-                }
-                yield f"data: {json.dumps(error_chunk)}\n\n"
+                yield sse_encoder.error(str(e))
                 
-        return StreamingResponse(generate(), media_type='text/event-stream')
+        return StreamingResponse(generate(), media_type='text/event-stream', background=turn_background_tasks, headers={"Server-Timing": turn_timer.server_timing()})
         
     except Exception as error:
         logger.exception("[platform_router | chat_completions ent] :: Error in /chat/completions")
         if req.stream:
             async def error_stream():
-                yield f"data: {json.dumps({'error': 'Streaming Error'})}\n\n"
+                yield ChatCompletionChunkEncoder.error("Streaming Error")
             return StreamingResponse(error_stream(), media_type='text/event-stream')                           
 
 
 @platform_router.post("/v2/chat/completions")
 async def stream_interview_response_api(req: ChatCompletionRequest):
     try:
+        turn_timer = TurnTimer("/v2/chat/completions")
         call_id = None
         # Check if there's a call_id field in the request or any custom fields that might contain it
         if hasattr(req, 'call') and req.call.id:
@@ -853,53 +849,79 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
         user_id = None
         session_id = None
         
+        # live call state, only the first turn of a call reads the database
+        turn_timer.start("bootstrap")
+        call_state = await get_call_state(call_id, agent_name="interviewer_agent")
+        turn_timer.stop("bootstrap")
+        turn_timer.session_id = call_state["session_id"]
+        turn_timer.agent_version = call_state["agent_version"]
+        turn_timer.turn = sum(1 for msg in req.messages if msg.role == "user")
+        
+        # quickly reject the TERMINATED session
+        if call_state["status"] == SessionStatusEnum.TERMINATED.value:
+            logger.info("[chat_completions v2] :: rejecting further processing as session is already terminated")
+            return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
+        
         # used up session credits with user credits calculation block
-        with  get_db_session() as db:
-            session_data = db.query(Session).filter(Session.call_id == str(call_id)).first()
-            
-            # quickly reject the TERMINATED session
-            if session_data.status == SessionStatusEnum.TERMINATED.value:
-                logger.info("[chat_completions v2] :: rejecting further processing as session is already terminated")
-                return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
-             
-            user_data = db.query(User).filter(User.id == session_data.user_id).first()
-            session_credits = session_data.used_credits if session_data.used_credits else int(0)
-            existing_user_credits = user_data.credits
-            
-            # updating this from <= 1 to -3 giving a 3 minutes/credits extra for the payment to go through before terminating
-            if (existing_user_credits - elapsed_session_time) <= -3:
-                # then user credits have been used up so expire the session and update user credits to 0 asap
-                session_data.status = SessionStatusEnum.TERMINATED.value
-                user_data.credits = 0
-                session_data.used_credits = round(elapsed_session_time)
-                db.commit()
-                logger.info("[chat_completions v2] :: user credits emptied so terminated this session and ending further process")
-                return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
-            else: 
-                # then user credits will be updated to :: current_user_credits - (elapsed_session_time - prev_session_credits_used)
-                user_data.credits = existing_user_credits - (round(elapsed_session_time) - session_credits)
-                # updating the session_used_credits to current elapsed_session_time to keep track 
-                session_data.used_credits = round(elapsed_session_time)
-                            
-            interview_agent = db.query(Agent).filter(Agent.name.startswith("interviewer_agent"), Agent.is_active == True).first()
-            system_instruction = f"""{interview_agent.prompt}
+        session_credits = call_state["used_credits"]
+        existing_user_credits = call_state["user_credits"]
+        
+        # updating this from <= 1 to -3 giving a 3 minutes/credits extra for the payment to go through before terminating
+        if (existing_user_credits - elapsed_session_time) <= -3:
+            # then user credits have been used up so expire the session and update user credits to 0 asap
+            await asyncio.to_thread(terminate_call, call_state, round(elapsed_session_time))
+            await instruction_cache.release(call_state["session_uuid"])
+            logger.info("[chat_completions v2] :: user credits emptied so terminated this session and ending further process")
+            return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
+        
+        # then user credits will be updated to :: current_user_credits - (elapsed_session_time - prev_session_credits_used)
+        credits_delta = round(elapsed_session_time) - session_credits
+        call_state["user_credits"] = existing_user_credits - credits_delta
+        # updating the session_used_credits to current elapsed_session_time to keep track 
+        call_state["used_credits"] = round(elapsed_session_time)
+        call_state["status"] = SessionStatusEnum.ACTIVE.value
+        
+        # the instruction has no per turn parts, so it is built once per call
+        turn_timer.start("prompt")
+        if not call_state["system_instruction"]:
+            candidate_context = await prefetch_candidate_context(call_state)
+            if candidate_context is None:
+                retrieve_context_note = RETRIEVE_CONTEXT_TOOL_NOTE
+                candidate_context_section = ""
+            else:
+                retrieve_context_note = PREFETCHED_RETRIEVE_CONTEXT_TOOL_NOTE
+                candidate_context_section = f"---\ncandidate context (already retrieved for this session) = \n{candidate_context}\n---"
+            call_state["system_instruction"] = f"""{call_state["agent_prompt"]}
 
             You have access to the following tools:
-            - `retrieve_context`: Use this tool to get the user's resume or other relevant context. You MUST use this tool when the user asks a question related to their resume or personal context.
+            {retrieve_context_note}
             - `main_question_setter`: Use this tool to set the main interview question.
             
             ## When a new or fresh interview question is generated or pulled from the context always silently invoke the "main_question_setter" tool, dont miss this
 
-            The current session_id is: {session_data.id}. You must pass this session_id to the tools when you call them.
+            The current session_id is: {call_state["session_id"]}. You must pass this session_id to the tools when you call them.
             Do not generate code snippets. Call the tools directly when needed.
             
             ## NOTE :: Speak only what you would respond to the candidate. Dont include any thought process or tool call mentions in the response.
+            {candidate_context_section}
             """
-            # question_context = session_data.session_questions
-            session_data.status = SessionStatusEnum.ACTIVE.value
-            user_id = session_data.user_id
-            session_id = session_data.id
-            db.commit()
+        system_instruction = call_state["system_instruction"]
+        # model and temperature of the agent config, routed to a model tier per turn when the agent has model routing
+        model_settings = route_turn(call_state["agent_config"], turn_timer.turn, candidate_latest_message, call_state["last_main_question_turn"])
+        logger.info("[chat_completions v2] :: turn %s routed to tier = %s model = %s", turn_timer.turn, model_settings["tier"], model_settings["model"])
+        cached_content = instruction_cache.get(call_state["session_uuid"], model_settings["model"], system_instruction, [retrieve_context, main_question_setter])
+        # question_context = session_data.session_questions
+        user_id = call_state["user_id"]
+        session_id = call_state["session_id"]
+        call_state_cache.put(call_id, call_state)
+        
+        # credits are written back once the response is sent, off the hot path of the turn
+        # the timings of the turn are stored after it, once the credits are written
+        turn_background_tasks = BackgroundTasks()
+        turn_background_tasks.add_task(
+            turn_timer.timed, "persist", persist_call_credits, session_id, call_state["call_id"], user_id, call_state["used_credits"], credits_delta, call_state["status"]
+        )
+        turn_background_tasks.add_task(turn_timer.finish)
                     
         # Convert OpenAI-style messages to Gemini format
         gemini_messages = []
@@ -912,30 +934,44 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                 gemini_messages.append({"role": "model", "parts": [{"text": content}]})
             elif role == 'function' or role == 'tool':
                 gemini_messages.append({"role": "model", "parts": [{"text": f"Function result: {content}"}]})       
+        
+        # older exchanges are replaced by a rolling summary when the agent has history compaction on
+        gemini_messages = compact_history(call_state, gemini_messages)
+                
+        turn_timer.stop("prompt")
                 
         # Set up streaming response
         async def generate():
+            sse_encoder = ChatCompletionChunkEncoder(coalesce=config.SSE_COALESCE_SENTENCES)
+            current_turn_timer.set(turn_timer)
             try:
                 available_functions = {
                     "retrieve_context": retrieve_context,
                     "main_question_setter": main_question_setter
                 }
 
-                stream = generate_with_gemini(
+                turn_timer.model_started()
+                stream = await agenerate_with_gemini(
                     prompt=gemini_messages,
-                    model="gemini-2.0-flash",
+                    model=model_settings["model"],
+                    temperature=model_settings["temperature"],
                     stream=True,
                     system_instruction=system_instruction,
                     tools=[retrieve_context, main_question_setter],
                     auto_execute_functions=True,
-                    available_functions=available_functions
+                    available_functions=available_functions,
+                    cached_content=cached_content,
+                    priority=LLMPriority.LIVE_TURN,
+                    org_id=call_state["org_id"],
+                    user_id=call_state["user_id"],
+                    agent_name=call_state["agent_name"],
                 )
                 
                 combined_chunks = ""
                 per_chunk_llm_metadata = []
                 tool_call_started = False
                 
-                for chunk in stream:
+                async for chunk in stream:
                     try:
                         if hasattr(chunk, 'usage_metadata'):
                             chunk_llm_metadata = {
@@ -975,55 +1011,40 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                                                     tool_call_started = True
                                                     
                                                     # Create OpenAI-compatible format for tool calls
-                                                    openai_tool_chunk = {
-                                                        "id": "chatcmpl-" + str(hash(function_name))[:10],
-                                                        "object": "chat.completion.chunk",
-                                                        "created": int(time.time()),
-                                                        "choices": [{
-                                                            "index": 0,
-                                                            "delta": {"tool_calls": [current_tool_call]},
-                                                            "finish_reason": None
-                                                        }]
-                                                    }
-                                                    yield f"data: {json.dumps(openai_tool_chunk)}\n\n"
+                                                    yield sse_encoder.tool_call(current_tool_call)
                                             # Check if this part contains text
                                             elif hasattr(part, 'text') and part.text:
-                                                openai_chunk = {
-                                                    "id": "chatcmpl-" + str(hash(str(part.text)))[:10],
-                                                    "object": "chat.completion.chunk",
-                                                    "created": int(time.time()),
-                                                    "choices": [{
-                                                        "index": 0,
-                                                        "delta": {"content": part.text},
-                                                        "finish_reason": None
-                                                    }]
-                                                }
-                                                yield f"data: {json.dumps(openai_chunk)}\n\n"
+                                                turn_timer.first_token()
+                                                sse_event = sse_encoder.push(part.text)
+                                                if sse_event:
+                                                    yield sse_event
                                                 combined_chunks += part.text
                         # Backwards compatibility - try direct text access if needed
                         elif hasattr(chunk, 'text') and chunk.text:
-                            openai_chunk = {
-                                "id": "chatcmpl-" + str(hash(str(chunk.text)))[:10],
-                                "object": "chat.completion.chunk",
-                                "created": int(time.time()),
-                                "choices": [{
-                                    "index": 0,
-                                    "delta": {"content": chunk.text},
-                                    "finish_reason": None
-                                }]
-                            }
-                            yield f"data: {json.dumps(openai_chunk)}\n\n"
+                            turn_timer.first_token()
+                            sse_event = sse_encoder.push(chunk.text)
+                            if sse_event:
+                                yield sse_event
                             combined_chunks += chunk.text
 
                     except Exception as e:
                         logger.exception("[platform_router | chat_completions v2] | streaming :: Error processing chunk: %s", str(e))
                         continue                               
 
+                remaining_event = sse_encoder.flush()
+                if remaining_event:
+                    yield remaining_event
+                turn_timer.response_done()
+                # the model routing counts the turns since the interviewer last set a main question
+                if "main_question_setter" in turn_timer.tools_called:
+                    call_state["last_main_question_turn"] = turn_timer.turn
+
                 logger.info("[platform_router | chat_completions v2] | streaming :: Streaming completed")
                                 
                 # save this session exchange object for final analysis 
-                with get_db_session() as db: 
-                    new_session_exchange = SessionExchange(
+                # buffered, the exchange writer commits it in a batch off the tail of the stream
+                with turn_timer.phase("persist"):
+                    exchange_writer.add(
                         user_id = user_id,
                         session_id = session_id,
                         data = {
@@ -1032,32 +1053,27 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                         },
                         exchange_metadata = per_chunk_llm_metadata
                     )
-                    
-                    db.add(new_session_exchange)
-                    db.commit()
                 
                 
-                yield "data: [DONE]\n\n"
+                yield DONE_EVENT
                 
             except Exception as e:
                 logger.exception("[platform_router | chat_completions v2] | streaming :: caught exception")
-                error_chunk = {
-                    "error": str(e)
-                }
-                yield f"data: {json.dumps(error_chunk)}\n\n"
+                yield sse_encoder.error(str(e))
                 
-        return StreamingResponse(generate(), media_type='text/event-stream')
+        return StreamingResponse(generate(), media_type='text/event-stream', background=turn_background_tasks, headers={"Server-Timing": turn_timer.server_timing()})
         
     except Exception as error:
         logger.exception("[platform_router | chat_completions v2] :: Error in /chat/completions")
         if req.stream:
             async def error_stream():
-                yield f"data: {json.dumps({'error': 'Streaming Error'})}\n\n"
+                yield ChatCompletionChunkEncoder.error("Streaming Error")
             return StreamingResponse(error_stream(), media_type='text/event-stream')                           
 
 @platform_router.post("/chat/completions")
 async def stream_interview_response_api(req: ChatCompletionRequest):
     try:
+        turn_timer = TurnTimer("/chat/completions")
         call_id = None
         # Check if there's a call_id field in the request or any custom fields that might contain it
         if hasattr(req, 'call') and req.call.id:
@@ -1078,41 +1094,55 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
         user_id = None
         session_id = None
         
+        # live call state, only the first turn of a call reads the database
+        turn_timer.start("bootstrap")
+        call_state = await get_call_state(call_id, agent_name="interviewer_agent")
+        turn_timer.stop("bootstrap")
+        turn_timer.session_id = call_state["session_id"]
+        turn_timer.agent_version = call_state["agent_version"]
+        turn_timer.turn = sum(1 for msg in req.messages if msg.role == "user")
+        
+        # quickly reject the TERMINATED session
+        if call_state["status"] == SessionStatusEnum.TERMINATED.value:
+            logger.info("[chat_completions] :: rejecting further processing as session is already terminated")
+            return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
+        
         # used up session credits with user credits calculation block
-        with  get_db_session() as db:
-            session_data = db.query(Session).filter(Session.call_id == str(call_id)).first()
-            
-            # quickly reject the TERMINATED session
-            if session_data.status == SessionStatusEnum.TERMINATED.value:
-                logger.info("[chat_completions] :: rejecting further processing as session is already terminated")
-                return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
-             
-            user_data = db.query(User).filter(User.id == session_data.user_id).first()
-            session_credits = session_data.used_credits if session_data.used_credits else int(0) # todo :: setup default to 0 on session creation 
-            existing_user_credits = user_data.credits
-            
-            # updating this from <= 1 to -3 giving a 3 minutes/credits extra for the payment to go through before terminating
-            if (existing_user_credits - elapsed_session_time) <= -3:
-                # then user credits have been used up so expire the session and update user credits to 0 asap
-                session_data.status = SessionStatusEnum.TERMINATED.value
-                user_data.credits = 0
-                session_data.used_credits = round(elapsed_session_time)
-                db.commit()
-                logger.info("[chat_completions] :: user credits emptied so terminated this session and ending further process")
-                return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
-            else: 
-                # then user credits will be updated to :: current_user_credits - (elapsed_session_time - prev_session_credits_used)
-                user_data.credits = existing_user_credits - (round(elapsed_session_time) - session_credits)
-                # updating the session_used_credits to current elapsed_session_time to keep track 
-                session_data.used_credits = round(elapsed_session_time)
-                            
-            interview_agent = db.query(Agent).filter(Agent.name.startswith("interviewer_agent"), Agent.is_active == True).first()
-            system_instruction = interview_agent.prompt
-            question_context = session_data.session_questions
-            session_data.status = SessionStatusEnum.ACTIVE.value
-            user_id = session_data.user_id
-            session_id = session_data.id
-            db.commit()
+        session_credits = call_state["used_credits"]
+        existing_user_credits = call_state["user_credits"]
+        
+        # updating this from <= 1 to -3 giving a 3 minutes/credits extra for the payment to go through before terminating
+        if (existing_user_credits - elapsed_session_time) <= -3:
+            # then user credits have been used up so expire the session and update user credits to 0 asap
+            await asyncio.to_thread(terminate_call, call_state, round(elapsed_session_time))
+            await instruction_cache.release(call_state["session_uuid"])
+            logger.info("[chat_completions] :: user credits emptied so terminated this session and ending further process")
+            return StreamingResponse(terminate_session_stream() , media_type='text/event-stream')
+        
+        # then user credits will be updated to :: current_user_credits - (elapsed_session_time - prev_session_credits_used)
+        credits_delta = round(elapsed_session_time) - session_credits
+        call_state["user_credits"] = existing_user_credits - credits_delta
+        # updating the session_used_credits to current elapsed_session_time to keep track 
+        call_state["used_credits"] = round(elapsed_session_time)
+        call_state["status"] = SessionStatusEnum.ACTIVE.value
+        
+        turn_timer.start("prompt")
+        system_instruction = call_state["agent_prompt"]
+        question_context = call_state["session_questions"]
+        # model and temperature of the agent config, routed to a model tier per turn when the agent has model routing
+        model_settings = route_turn(call_state["agent_config"], turn_timer.turn, candidate_latest_message, call_state["last_main_question_turn"])
+        logger.info("[chat_completions] :: turn %s routed to tier = %s model = %s", turn_timer.turn, model_settings["tier"], model_settings["model"])
+        user_id = call_state["user_id"]
+        session_id = call_state["session_id"]
+        call_state_cache.put(call_id, call_state)
+        
+        # credits are written back once the response is sent, off the hot path of the turn
+        # the timings of the turn are stored after it, once the credits are written
+        turn_background_tasks = BackgroundTasks()
+        turn_background_tasks.add_task(
+            turn_timer.timed, "persist", persist_call_credits, session_id, call_state["call_id"], user_id, call_state["used_credits"], credits_delta, call_state["status"]
+        )
+        turn_background_tasks.add_task(turn_timer.finish)
             
         # Convert OpenAI-style messages to Gemini format
         gemini_messages = []
@@ -1125,9 +1155,16 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                 gemini_messages.append({"role": "model", "parts": [{"text": content}]})
             elif role == 'function' or role == 'tool':
                 gemini_messages.append({"role": "model", "parts": [{"text": f"Function result: {content}"}]})       
+        
+        # older exchanges are replaced by a rolling summary when the agent has history compaction on
+        gemini_messages = compact_history(call_state, gemini_messages)
+                
+        turn_timer.stop("prompt")
                 
         # Set up streaming response
         async def generate():
+            sse_encoder = ChatCompletionChunkEncoder(coalesce=config.SSE_COALESCE_SENTENCES)
+            current_turn_timer.set(turn_timer)
             try:
                 
                 agent_context = {
@@ -1135,17 +1172,23 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                     "ongoing_interview_exchanges" : gemini_messages
                 }
                 
-                stream = generate_with_gemini(
+                turn_timer.model_started()
+                stream = await agenerate_with_gemini(
                     prompt=f"This interview context = \n {agent_context}",
-                    model="gemini-2.0-flash",
+                    model=model_settings["model"],
+                    temperature=model_settings["temperature"],
                     stream=True,
                     system_instruction=system_instruction,
+                    priority=LLMPriority.LIVE_TURN,
+                    org_id=call_state["org_id"],
+                    user_id=call_state["user_id"],
+                    agent_name=call_state["agent_name"],
                 )
                 
                 combined_chunks = ""
                 per_chunk_llm_metadata = []
                 
-                for chunk in stream:
+                async for chunk in stream:
                     try:
                         chunk_llm_metadata = {
                             "is_streaming_response" : req.stream,
@@ -1166,41 +1209,33 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                                         for part in content.parts:
                                             # Check if this part contains text
                                             if hasattr(part, 'text') and part.text:
-                                                openai_chunk = {
-                                                    "id": "chatcmpl-" + str(hash(str(part.text)))[:10],
-                                                    "object": "chat.completion.chunk",
-                                                    "created": int(time.time()),
-                                                    "choices": [{
-                                                        "index": 0,
-                                                        "delta": {"content": part.text},
-                                                        "finish_reason": None
-                                                    }]
-                                                }
-                                                yield f"data: {json.dumps(openai_chunk)}\n\n"
+                                                turn_timer.first_token()
+                                                sse_event = sse_encoder.push(part.text)
+                                                if sse_event:
+                                                    yield sse_event
                                                 combined_chunks = combined_chunks + part.text
                         # Backwards compatibility - try direct text access if needed
                         elif hasattr(chunk, 'text') and chunk.text:
-                            openai_chunk = {
-                                "id": "chatcmpl-" + str(hash(str(chunk.text)))[:10],
-                                "object": "chat.completion.chunk",
-                                "created": int(time.time()),
-                                "choices": [{
-                                    "index": 0,
-                                    "delta": {"content": chunk.text},
-                                    "finish_reason": None
-                                }]
-                            }
-                            yield f"data: {json.dumps(openai_chunk)}\n\n"
+                            turn_timer.first_token()
+                            sse_event = sse_encoder.push(chunk.text)
+                            if sse_event:
+                                yield sse_event
                     except Exception as e:
                         logger.exception("[platform_router | chat_completions] | streaming :: Error processing chunk: %s", str(e))
                         # Continue with the next chunk instead of stopping
                         continue                               
 
+                remaining_event = sse_encoder.flush()
+                if remaining_event:
+                    yield remaining_event
+                turn_timer.response_done()
+
                 logger.info("[platform_router | chat_completions] | streaming :: Streaming completed")
                                 
                 # save this session exchange object for final analysis 
-                with get_db_session() as db: 
-                    new_session_exchange = SessionExchange(
+                # buffered, the exchange writer commits it in a batch off the tail of the stream
+                with turn_timer.phase("persist"):
+                    exchange_writer.add(
                         user_id = user_id,
                         session_id = session_id,
                         data = {
@@ -1209,27 +1244,21 @@ async def stream_interview_response_api(req: ChatCompletionRequest):
                         },
                         exchange_metadata = per_chunk_llm_metadata
                     )
-                    
-                    db.add(new_session_exchange)
-                    db.commit()
                 
                 
-                yield "data: [DONE]\n\n"
+                yield DONE_EVENT
                 
             except Exception as e:
                 logger.exception("[platform_router | chat_completions] | streaming :: caught exception")
-                error_chunk = {
-                    "error": str(e)
-                }
-                yield f"data: {json.dumps(error_chunk)}\n\n"
+                yield sse_encoder.error(str(e))
                 
-        return StreamingResponse(generate(), media_type='text/event-stream')
+        return StreamingResponse(generate(), media_type='text/event-stream', background=turn_background_tasks, headers={"Server-Timing": turn_timer.server_timing()})
         
     except Exception as error:
         logger.exception("[platform_router | chat_completions] :: Error in /chat/completions")
         if req.stream:
             async def error_stream():
-                yield f"data: {json.dumps({'error': 'Streaming Error'})}\n\n"
+                yield ChatCompletionChunkEncoder.error("Streaming Error")
             return StreamingResponse(error_stream(), media_type='text/event-stream')                           
 
 
@@ -1240,8 +1269,14 @@ async def end_active_session_api(request: Request, session_uuid : str):
         with get_db_session() as db:
             session_data = db.query(Session).filter(Session.uuid == session_uuid).first()
             session_data.status = SessionStatusEnum.COMPLETED.value
+            # the call only debited the ledger, bring users.credits up to date now that it is over
+            CreditLedgerService.sync_user_credits(db, session_data.user_id)
             db.commit() 
         
+        call_state_cache.invalidate_session(session_uuid)
+        await asyncio.to_thread(exchange_writer.flush)
+        await instruction_cache.release(session_uuid)
+        
         return {"messsage" : f"session {session_uuid} successfully ended"}
     except Exception:
         logger.exception("[platform_router | end_active_sesion_api] :: caught exception")
@@ -1284,6 +1319,28 @@ async def get_note_sender_userid() -> Optional[str]:
         logger.exception("[platform_router | get_note_sender_userid] :: caught exception while fetching teamtailor users")
         return None
 
+async def ensure_session_exchanges_written(session_uuid: str) -> int:
+    """
+    writes the buffered exchanges of the session before its interview is analysed, returns the session id. raises
+    503 while some are still buffered (the caller retries) and 500 when some could not be stored, so an incomplete
+    interview is never analysed and marked ANALYSED.
+    """
+    with get_db_session() as db:
+        session_id = db.query(Session.id).filter(Session.uuid == session_uuid).scalar()
+    
+    pending, dropped = await asyncio.to_thread(exchange_writer.flush_session, session_id)
+    if dropped:
+        logger.error("[platform_router | ensure_session_exchanges_written] :: %s exchanges of session = %s could not be stored, not analysing it", dropped, session_uuid)
+        raise HTTPException(status_code=500, detail="some exchanges of the session could not be stored")
+    if pending:
+        logger.warning("[platform_router | ensure_session_exchanges_written] :: %s exchanges of session = %s are not written yet", pending, session_uuid)
+        raise HTTPException(
+            status_code=503,
+            detail="the interview is still being saved, retry shortly",
+            headers={"Retry-After": "2"},
+        )
+    return session_id
+
 # to analyse as session and generate the interview report
 @platform_router.get("/ent/session/analyse/{session_uuid}")
 async def analyse_session_data_api(request: Request, session_uuid : str):
@@ -1293,6 +1350,8 @@ async def analyse_session_data_api(request: Request, session_uuid : str):
         
         logger.info("[platform_router | analyse_session_data_api] :: analysing session data for session_uuid: %s", session_uuid)
         
+        # make sure every buffered exchange of the interview is written before reading them
+        await ensure_session_exchanges_written(session_uuid)
         with get_db_session() as db:
             selected_session = db.query(Session).filter(Session.uuid == session_uuid).first()
             all_session_exchange_data = db.query(SessionExchange).filter(SessionExchange.session_id == selected_session.id).order_by(SessionExchange.created_at).all()
@@ -1302,15 +1361,21 @@ async def analyse_session_data_api(request: Request, session_uuid : str):
             args = {
                 "context" : {
                     "interview_flow" : interview_exchanges,
-                    "interview_main_questions" : selected_session.session_questions,
+                    "interview_main_questions" : SessionQuestionService.get_session_questions(db, selected_session),
                 },
-                "name" : selected_session.session_metadata.get("analysis_agent","ent_interview_analysis_agent") if selected_session.session_metadata else "ent_interview_analysis_agent"
+                "name" : selected_session.session_metadata.get("analysis_agent","ent_interview_analysis_agent") if selected_session.session_metadata else "ent_interview_analysis_agent",
+                "user_id" : selected_session.user_id,
             }
-            
-            result = ent_analyse_interview_workflow(args) 
-            logger.info("[platform_router | analyse_session_data_api] :: analysis report created")
-            analysed_result = result #f"The overall Score for the candidate from the screening interview is {result["overall_score"]} / 100"
             candidate_id = selected_session.session_metadata.get("candidate_id") if selected_session.session_metadata else None
+            selected_session_id = selected_session.id
+        
+        # read once the session above is released, a cache miss builds the context with a session of its own
+        args["context"]["candidate_context"] = await asyncio.to_thread(candidate_context_cache.get, selected_session_id)
+        
+        # the db session is released before waiting on the analysis agent
+        result = await aent_analyse_interview_workflow(args) 
+        logger.info("[platform_router | analyse_session_data_api] :: analysis report created")
+        analysed_result = result #f"The overall Score for the candidate from the screening interview is {result["overall_score"]} / 100"
 
         if not candidate_id:
             logger.error("[platform_router | analyse_session_data_api] :: candidate_id not found in session metadata")
@@ -1365,18 +1430,45 @@ async def analyse_session_data_api(request: Request, session_uuid : str):
             selected_session = db.query(Session).filter(Session.uuid == session_uuid).first()
             selected_session.status = SessionStatusEnum.ANALYSED.value
             selected_session.summary = analysed_result
+            selected_session_id = selected_session.id
             db.commit()
+        # the session is done once analysed, its candidate context is not needed anymore
+        candidate_context_cache.invalidate_session(selected_session_id)
             
         return {"message": "analysis completed successfully."}
+    except HTTPException:
+        raise
     except Exception:
         logger.exception("[platform_router | analyse_session_data_api] :: caught exception")
         raise HTTPException(status_code=500)
  
+def save_session_analysis(session_uuid: str, result: Dict[str, Any], last_interview_values: Dict[str, Any]) -> Dict[str, Any]:
+    """stores the analysis as the session summary and marks the session analysed, returns the stored summary"""
+    analysed_result = {
+        **result,
+        "last_interview_values": last_interview_values
+    }
+    
+    with get_db_session() as db:
+        selected_session = db.query(Session).filter(Session.uuid == session_uuid).first()
+        selected_session.status = SessionStatusEnum.ANALYSED.value
+        selected_session.summary = analysed_result
+        selected_session_id = selected_session.id
+        db.commit()
+    # the session is done once analysed, its candidate context is not needed anymore
+    candidate_context_cache.invalidate_session(selected_session_id)
+    
+    return analysed_result
+
+# with stream=true the analysis is sent as sse events, each field as soon as the agent completed it (overall_score
+# first), then { type : "result", result } with the stored summary and [DONE]
 @platform_router.get("/session/analyse/{session_uuid}")
-async def analyse_session_data_api(request: Request, session_uuid : str):
+async def analyse_session_data_api(request: Request, session_uuid : str, stream: bool = False):
     try: 
         
         analysed_result = None
+        # make sure every buffered exchange of the interview is written before reading them
+        await ensure_session_exchanges_written(session_uuid)
         with get_db_session() as db:
             selected_session = db.query(Session).filter(Session.uuid == session_uuid).first()
             all_session_exchange_data = db.query(SessionExchange).filter(SessionExchange.session_id == selected_session.id).order_by(SessionExchange.created_at).all()
@@ -1387,26 +1479,45 @@ async def analyse_session_data_api(request: Request, session_uuid : str):
             
             args = {
                 "interview_flow" : interview_exchanges,
-                "interview_main_questions" : selected_session.session_questions
+                "interview_main_questions" : SessionQuestionService.get_session_questions(db, selected_session),
             }
             
-            result = analyse_interview_workflow(args) 
-            
-            analysed_result = {
-                **result,
-                "last_interview_values": {
-                    "patience": last_session_data.summary["patience"] or 0,
-                    "preparedness": last_session_data.summary["preparedness"] or 0,
-                    "confidence": last_session_data.summary["confidence"] or 0,
-                    "fluency": last_session_data.summary["fluency"] or 0
-                } if last_session_data else {}
-            }
+            last_interview_values = {
+                "patience": last_session_data.summary["patience"] or 0,
+                "preparedness": last_session_data.summary["preparedness"] or 0,
+                "confidence": last_session_data.summary["confidence"] or 0,
+                "fluency": last_session_data.summary["fluency"] or 0
+            } if last_session_data else {}
+            session_user_id = selected_session.user_id
+            selected_session_id = selected_session.id
+        
+        # read once the session above is released, a cache miss builds the context with a session of its own
+        args["candidate_context"] = await asyncio.to_thread(candidate_context_cache.get, selected_session_id)
+        
+        if stream:
+            async def analysis_stream():
+                try:
+                    async for event in astream_analyse_interview_workflow(args, user_id=session_user_id):
+                        if event["type"] != "result":
+                            yield data_event(event)
+                            continue
+                        analysed_result = await asyncio.to_thread(save_session_analysis, session_uuid, event["result"], last_interview_values)
+                        yield data_event({"type" : "result", "result" : analysed_result})
+                    yield DONE_EVENT
+                except Exception as e:
+                    logger.exception("[platform_router | analyse_session_data_api] :: caught exception while streaming the analysis")
+                    yield ChatCompletionChunkEncoder.error(str(e))
             
-            selected_session.status = SessionStatusEnum.ANALYSED.value
-            selected_session.summary = analysed_result
-            db.commit()
+            return StreamingResponse(analysis_stream(), media_type='text/event-stream')
+        
+        # the db session is released before waiting on the analysis agent
+        result = await aanalyse_interview_workflow(args, user_id=session_user_id) 
+        
+        analysed_result = save_session_analysis(session_uuid, result, last_interview_values)
             
         return analysed_result
+    except HTTPException:
+        raise
     except Exception:
         logger.exception("[platform_router | analyse_session_data_api] :: caught exception")
         raise HTTPException(status_code=500)
@@ -1421,12 +1532,13 @@ async def get_all_active_sessions_api(request: Request):
         with get_db_session() as db:
             user_data = db.query(User).filter(User.uuid == user_uuid).first()
             all_session_data = db.query(Session).filter(Session.user_id == user_data.id , Session.status != SessionStatusEnum.ANALYSED.value).all()
+            all_session_questions = SessionQuestionService.get_session_questions_for(db, all_session_data)
             
             for session_data in all_session_data:
                 response_data.append({
                     "sessionId" : session_data.uuid,
                     "sessionStatus" : session_data.status,
-                    "sessionMainQuestions" : session_data.session_questions,
+                    "sessionMainQuestions" : all_session_questions[session_data.id],
                 })
             
         return response_data
@@ -1474,7 +1586,7 @@ async def get_session_status_api(request: Request, session_id : str):
             session_used_credits = session_data.used_credits
             user_credits = user_data.credits
             session_start_time = session_data.created_at
-            session_questions = session_data.session_questions
+            session_questions = SessionQuestionService.get_session_questions(db, session_data)
             
             
         return {
@@ -1504,7 +1616,8 @@ async def get_dashboard_data_api(request: Request, current_page : int):
                     session_fetch_limit
                     ).offset(
                         (current_page - 1) * session_fetch_limit
-                        )
+                        ).all()
+            all_session_questions = SessionQuestionService.get_session_questions_for(db, all_user_sessions)
             total_sessions_count = db.query(func.count(Session.id)).filter(Session.user_id == asking_user.id).scalar()
             
             response_data["interview_sessions"] = [{
@@ -1512,7 +1625,7 @@ async def get_dashboard_data_api(request: Request, current_page : int):
                 "sessionStatus" : user_session.status,
                 "sessionCredits" : user_session.used_credits,
                 "sessionContext" : user_session.contexts,
-                "sessionMainQuestions" : user_session.session_questions, 
+                "sessionMainQuestions" : all_session_questions[user_session.id], 
                 "sessionSummary" : user_session.summary,
                 "createdAt" : user_session.created_at,
                 } for user_session in all_user_sessions] 
@@ -1530,6 +1643,7 @@ async def get_session_exchanges_api(req: Request, session_uuid : str):
         user_uuid =  req.state.bearer_token
         response_data = None
         
+        await asyncio.to_thread(exchange_writer.flush)
         with get_db_session() as db:
             asking_user = db.query(User).filter(User.uuid == user_uuid).first()
             selected_session = db.query(Session).filter(Session.uuid == session_uuid).first()
@@ -0,0 +1,136 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# times the organisation agent listings of AdminService.get_agents_of_org on a throwaway sqlite db seeded with one
+# organisation of --jobs jobs x 2 agent kinds x --versions versions (10k agents by default) with prompts of
+# --prompt-chars characters. "before" is the listing as it was, every agent of the organisation loaded with its
+# prompt and the job filtered by parsing the names in python. "after" is the listing with the job filter, the
+# count and the page in sql, without prompts, paged by offset and by the nextCursor of the previous page.
+# usage :: python scripts/bench_agent_listing.py --jobs 1250 --versions 4
+
+from sqlalchemy import create_engine, insert
+from models import base
+from models.agents import Agent, AGENT_NAME_SEPARATOR, split_agent_name
+from models.organisations import Organisation
+from models.users import User
+from services.admin_service import AdminService
+from utils.datetime_helper import StandardDT
+
+ORG_NAME = "benchorg"
+AGENT_KINDS = ["interview_agent", "interview_analysis_agent"]
+
+
+def seed_agents(db_path: str, jobs: int, versions: int, prompt_chars: int) -> int:
+    """creates the throwaway db and returns the id of the seeded organisation"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    base.Base.metadata.create_all(bind=engine)
+    base.SessionLocal.configure(bind=engine)
+    prompt = {"system": "You are a structured, friendly interviewer. " * (prompt_chars // 45 + 1)}
+    created_at = StandardDT.get_iso_dt() - timedelta(days=30)
+    with base.get_db_session() as db:
+        user = User(uuid=str(uuid.uuid4()), username="bench", email="bench@example.com", credits=100)
+        db.add(user)
+        db.flush()
+        org = Organisation(name=ORG_NAME, api_key="bench", created_by=user.id)
+        db.add(org)
+        db.flush()
+
+        rows = []
+        for version in range(1, versions + 1):
+            for job_id in range(1, jobs + 1):
+                for kind in AGENT_KINDS:
+                    name = f"{ORG_NAME}_{job_id}_{kind}{AGENT_NAME_SEPARATOR}{version}"
+                    base_name, agent_version, agent_job_id, agent_kind = split_agent_name(name)
+                    created_at += timedelta(seconds=1)
+                    rows.append({
+                        "name": name, "uuid": str(uuid.uuid4()), "prompt": prompt, "config": {}, "is_active": version == versions,
+                        "created_at": created_at, "updated_at": created_at, "org_id": org.id,
+                        "base_name": base_name, "version": agent_version, "job_id": agent_job_id, "kind": agent_kind,
+                    })
+        db.execute(insert(Agent), rows)
+        db.commit()
+        return org.id
+
+
+def legacy_get_agents_of_org(db, org_id: int, page: int = 1, limit: int = 10, job_id: int = None):
+    """the listing before the job filter and the paging moved to sql"""
+    query = db.query(Agent).filter(Agent.org_id == org_id)
+    total = query.count()
+    agents = query.order_by(Agent.created_at.desc()).offset((page - 1) * limit).limit(limit).all() if not job_id else query.order_by(Agent.created_at.desc()).all()
+    org_data = db.query(Organisation).filter(Organisation.id == org_id).first()
+    agent_list = []
+    for agent in agents:
+        if job_id and not (agent.job_id and int(job_id) == int(agent.job_id)):
+            continue
+        agent_list.append({
+            "id": agent.uuid, "name": agent.base_name, "version": agent.version or "", "prompt": agent.prompt,
+            "isActive": agent.is_active, "createdAt": agent.created_at, "updatedAt": agent.updated_at,
+            "orgId": agent.org_id, "orgName": org_data.name,
+        })
+    return {"total": total, "currentPage": page, "limit": 10, "agents": agent_list}
+
+
+def timed(fn, repeat: int):
+    """mean ms of fn over repeat runs, each in a fresh session, and its last result"""
+    elapsed = 0.0
+    result = None
+    for _ in range(repeat):
+        with base.get_db_session() as db:
+            started = time.perf_counter()
+            result = fn(db)
+            elapsed += time.perf_counter() - started
+    return elapsed / repeat * 1000, result
+
+
+def main(org_id: int, jobs: int, repeat: int):
+    job_id = jobs // 2
+    deep_page = 200
+
+    def cursor_walk(db):
+        """pages 1 to deep_page following nextCursor, only the last one is timed by the caller's mean"""
+        cursor = None
+        for _ in range(deep_page):
+            result = AdminService.get_agents_of_org(db, org_id, limit=10, cursor=cursor)
+            cursor = result["nextCursor"]
+        return result
+
+    cases = [
+        ("job listing", "before", lambda db: legacy_get_agents_of_org(db, org_id, job_id=job_id)),
+        ("job listing", "after", lambda db: AdminService.get_agents_of_org(db, org_id, limit=50, job_id=job_id)),
+        ("org page 1", "before", lambda db: legacy_get_agents_of_org(db, org_id, page=1)),
+        ("org page 1", "after", lambda db: AdminService.get_agents_of_org(db, org_id, page=1)),
+        (f"org page {deep_page}", "before", lambda db: legacy_get_agents_of_org(db, org_id, page=deep_page)),
+        (f"org page {deep_page}", "offset", lambda db: AdminService.get_agents_of_org(db, org_id, page=deep_page)),
+    ]
+
+    print(f"{'listing':>14}{'mode':>8}{'ms':>10}{'total':>8}{'agents':>8}{'bytes':>10}")
+    for listing, mode, fn in cases:
+        ms, result = timed(fn, repeat)
+        print(f"{listing:>14}{mode:>8}{ms:>10.2f}{result['total']:>8}{len(result['agents']):>8}{len(str(result)):>10}")
+
+    # the cursor walk reads deep_page pages, report the mean per page
+    ms, result = timed(cursor_walk, 1)
+    print(f"{f'org page {deep_page}':>14}{'cursor':>8}{ms / deep_page:>10.2f}{result['total']:>8}{len(result['agents']):>8}{len(str(result)):>10}  (mean per page of the walk)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the organisation agent listings before and after the sql side job filter and keyset pages.")
+    parser.add_argument("--jobs", type=int, default=1250)
+    parser.add_argument("--versions", type=int, default=4)
+    parser.add_argument("--prompt-chars", type=int, default=4000)
+    parser.add_argument("--repeat", type=int, default=5)
+    cli_args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    bench_org_id = seed_agents(os.path.join(tmp_dir.name, "bench.db"), cli_args.jobs, cli_args.versions, cli_args.prompt_chars)
+    main(bench_org_id, cli_args.jobs, cli_args.repeat)
+    tmp_dir.cleanup()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# replays an interview transcript turn by turn and reports the per turn latency (ttft and full turn) of the
+# interviewer with the resume fetched through the retrieve_context tool on every turn vs prefetched once into the
+# instruction ("prefetch_candidate_context" agent config). the stub gemini server calls retrieve_context before
+# answering, like the model told to "always use" it does, unless the instruction already carries the context.
+# the tool reads a throwaway sqlite db seeded with one session and a parsed resume.
+# usage :: python scripts/bench_context_prefetch.py --turns 12
+
+STUB_PORT = int(os.getenv("STUB_GEMINI_PORT", "8767"))
+os.environ["GOOGLE_GEMINI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/"
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from sqlalchemy import create_engine
+from models import base
+from models.parsed_results import ParsedResult
+from models.sessions import Session
+from models.uploads import Upload
+from models.users import User
+from routers.platform_router import RETRIEVE_CONTEXT_TOOL_NOTE, prefetch_candidate_context
+from scripts.stub_gemini_server import start_stub_server_in_thread
+from utils.llm_helper import agenerate_with_gemini
+from utils.tools import main_question_setter, retrieve_context
+
+PREFETCHED_CONTEXT_MARKER = "candidate context (already retrieved for this session)"
+AGENT_PROMPT = "You are a structured, friendly interviewer for a senior product manager role. " * 10
+CANDIDATE_ANSWER = (
+    "In my last role I owned the checkout funnel, we ran weekly experiments on the payment step "
+    "and shipped a one click flow that moved conversion by a few points."
+)
+RESUME = {
+    "name": "Bench Candidate",
+    "experience": [
+        {"company": f"Company {i}", "title": "Product Manager", "highlights": ["owned the checkout funnel", "ran weekly experiments"]}
+        for i in range(6)
+    ],
+    "skills": ["experimentation", "sql", "roadmapping", "stakeholder management"],
+}
+
+
+def seed_session(db_path: str) -> int:
+    """creates the throwaway db the tool reads and returns the id of the seeded session"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    base.Base.metadata.create_all(bind=engine)
+    base.SessionLocal.configure(bind=engine)
+    with base.get_db_session() as db:
+        user = User(uuid=str(uuid.uuid4()), username="bench", email="bench@example.com", credits=100)
+        db.add(user)
+        db.flush()
+        upload = Upload(file_name="resume.pdf", uuid=str(uuid.uuid4()), user_id=user.id)
+        db.add(upload)
+        db.flush()
+        db.add(ParsedResult(source_id=upload.id, structured_result=RESUME))
+        session = Session(uuid=str(uuid.uuid4()), user_id=user.id, contexts={
+            "job_title": "Senior Product Manager",
+            "job_description": "Own the payments roadmap. " * 10,
+            "selected_resume_media_uuid": upload.uuid,
+        })
+        db.add(session)
+        db.flush()
+        return session.id
+
+
+async def build_instruction(session_id: int, prefetch: bool) -> str:
+    call_state = {"session_id": session_id, "agent_config": {"prefetch_candidate_context": prefetch}}
+    candidate_context = await prefetch_candidate_context(call_state)
+    if candidate_context is None:
+        return f"""{AGENT_PROMPT}
+        {RETRIEVE_CONTEXT_TOOL_NOTE}
+        ## Always use the "retrieve_context" to get the resume context of the user to generate every question.
+        The current session_id is: {session_id}."""
+    return f"""{AGENT_PROMPT}
+        ## Always use the candidate context (resume) given below to generate every question.
+        The current session_id is: {session_id}.
+        ---
+        {PREFETCHED_CONTEXT_MARKER} =
+        {candidate_context}
+        ---"""
+
+
+async def run_turn(system_instruction: str, gemini_messages):
+    started = time.perf_counter()
+    ttft = None
+    stream = await agenerate_with_gemini(
+        prompt=gemini_messages,
+        stream=True,
+        system_instruction=system_instruction,
+        tools=[retrieve_context, main_question_setter],
+        auto_execute_functions=True,
+        available_functions={"retrieve_context": retrieve_context, "main_question_setter": main_question_setter},
+    )
+    reply = ""
+    async for chunk in stream:
+        if ttft is None and chunk.text:
+            ttft = time.perf_counter() - started
+        reply += chunk.text or ""
+    return ttft, time.perf_counter() - started, reply
+
+
+async def replay(session_id: int, turns: int, prefetch: bool):
+    setup_started = time.perf_counter()
+    system_instruction = await build_instruction(session_id, prefetch)
+    setup = time.perf_counter() - setup_started
+
+    ttfts, totals = [], []
+    gemini_messages = []
+    for _ in range(turns):
+        gemini_messages.append({"role": "user", "parts": [{"text": CANDIDATE_ANSWER}]})
+        ttft, total, reply = await run_turn(system_instruction, gemini_messages)
+        gemini_messages.append({"role": "model", "parts": [{"text": reply}]})
+        ttfts.append(ttft)
+        totals.append(total)
+    return setup, ttfts, totals
+
+
+async def main(session_id: int, turns: int):
+    print(f"{'mode':>10}{'setup ms':>10}{'avg ttft ms':>13}{'avg turn ms':>13}{'total s':>9}")
+    for mode, prefetch in (("tool", False), ("prefetch", True)):
+        setup, ttfts, totals = await replay(session_id, turns, prefetch)
+        print(
+            f"{mode:>10}{setup * 1000:>10.1f}{sum(ttfts) / turns * 1000:>13.1f}"
+            f"{sum(totals) / turns * 1000:>13.1f}{(setup + sum(totals)):>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per turn latency with the candidate context prefetched vs fetched by the tool.")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=20000.0)
+    cli_args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    bench_session_id = seed_session(os.path.join(tmp_dir.name, "bench.db"))
+    start_stub_server_in_thread(
+        STUB_PORT,
+        first_token_delay=cli_args.first_token_delay,
+        tokens_per_sec=400.0,
+        prefill_tokens_per_sec=cli_args.prefill_tokens_per_sec,
+        function_call="retrieve_context",
+        function_call_args={"session_id": bench_session_id},
+        skip_function_call_marker=PREFETCHED_CONTEXT_MARKER,
+    )
+    asyncio.run(main(bench_session_id, cli_args.turns))
+    tmp_dir.cleanup()
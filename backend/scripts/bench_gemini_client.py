@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# per call overhead of a new google genai Client on every call (the old generate_with_gemini) vs the pooled
+# process wide client of GoogleProvider, for generate_content and generate_content_stream, sync and async.
+# the stub gemini server answers instantly over https with a self signed certificate, so what is measured is
+# client construction, connection setup and the tls handshake. --gap waits between calls like the pause between
+# interview turns, httpx drops idle connections after 5s by default while the pooled client keeps them for
+# GEMINI_HTTP_KEEPALIVE_EXPIRY_SECONDS.
+# usage :: python scripts/bench_gemini_client.py --calls 50
+#          python scripts/bench_gemini_client.py --calls 10 --gap 6
+
+STUB_PORT = int(os.getenv("STUB_GEMINI_PORT", "8770"))
+os.environ["GOOGLE_GEMINI_BASE_URL"] = f"https://127.0.0.1:{STUB_PORT}/"
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+from google.genai import Client
+from scripts.stub_gemini_server import start_stub_server_in_thread
+from utils.llm_providers import GoogleProvider
+from config import config
+
+MODEL = "gemini-2.0-flash"
+PROMPT = [{"role": "user", "parts": [{"text": "I led the checkout redesign last year."}]}]
+REQUEST_CONFIG = {"temperature": 0.5, "system_instruction": "interviewer"}
+
+
+def write_self_signed_certificate(directory: str):
+    """certificate and key for 127.0.0.1, the sdk trusts it through SSL_CERT_FILE"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path, key_path = os.path.join(directory, "stub.crt"), os.path.join(directory, "stub.key")
+    with open(cert_path, "wb") as cert_file:
+        cert_file.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as key_file:
+        key_file.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def sync_call(client: Client, stream: bool):
+    if stream:
+        for _ in client.models.generate_content_stream(model=MODEL, contents=PROMPT, config=REQUEST_CONFIG):
+            pass
+    else:
+        client.models.generate_content(model=MODEL, contents=PROMPT, config=REQUEST_CONFIG)
+
+
+async def async_call(client: Client, stream: bool):
+    if stream:
+        async for _ in await client.aio.models.generate_content_stream(model=MODEL, contents=PROMPT, config=REQUEST_CONFIG):
+            pass
+    else:
+        await client.aio.models.generate_content(model=MODEL, contents=PROMPT, config=REQUEST_CONFIG)
+
+
+async def measure(mode: str, api: str, stream: bool, calls: int, gap: float, provider: GoogleProvider) -> list:
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        client = Client(api_key=config.GEMINI_API_KEY) if mode == "per call" else provider._get_client()
+        if api == "sync":
+            sync_call(client, stream)
+        else:
+            await async_call(client, stream)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(gap)
+    return latencies
+
+
+async def main(calls: int, gap: float):
+    provider = GoogleProvider()
+    await provider.awarm_up(MODEL)
+    print(f"{'api':<6}{'method':<26}{'client':<10}{'mean ms':>9}{'p50 ms':>9}{'max ms':>9}{'saved ms':>10}")
+    for api in ("sync", "async"):
+        for stream in (False, True):
+            method = "generate_content_stream" if stream else "generate_content"
+            results = {mode: await measure(mode, api, stream, calls, gap, provider) for mode in ("per call", "pooled")}
+            for mode, latencies in results.items():
+                saved = statistics.mean(results["per call"]) - statistics.mean(latencies) if mode == "pooled" else 0.0
+                print(
+                    f"{api:<6}{method:<26}{mode:<10}{statistics.mean(latencies):>9.2f}{statistics.median(latencies):>9.2f}"
+                    f"{max(latencies):>9.2f}{saved:>10.2f}"
+                )
+    await provider.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the per call overhead of a new gemini client vs the pooled client.")
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--gap", type=float, default=0.0, help="seconds between calls")
+    cli_args = parser.parse_args()
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    cert_path, key_path = write_self_signed_certificate(tmp_dir.name)
+    os.environ["SSL_CERT_FILE"] = cert_path
+    start_stub_server_in_thread(STUB_PORT, ssl_certfile=cert_path, ssl_keyfile=key_path, first_token_delay=0.0, tokens_per_sec=100000.0)
+    asyncio.run(main(cli_args.calls, cli_args.gap))
+    tmp_dir.cleanup()
@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# replays a synthetic interview turn by turn and reports prompt tokens and ttft per turn number, with the full
+# history sent every turn vs the sliding window + rolling summary of utils.history_compactor.
+# the stub gemini server counts prompt tokens from the request size and delays the first token by the prefill time.
+# usage :: python scripts/bench_history_compaction.py --turns 40 --keep-last-exchanges 6
+
+STUB_PORT = int(os.getenv("STUB_GEMINI_PORT", "8766"))
+os.environ["GOOGLE_GEMINI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/"
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from scripts.stub_gemini_server import start_stub_server_in_thread
+from utils import history_compactor
+from utils.llm_helper import agenerate_with_gemini
+
+SYSTEM_INSTRUCTION = "You are a structured, friendly interviewer for a senior product manager role. " * 25
+CANDIDATE_ANSWER = (
+    "In my last role I owned the checkout funnel, we ran weekly experiments on the payment step, "
+    "I worked with design and engineering to cut drop off, and we shipped a one click flow that "
+    "moved conversion by a few points while keeping the fraud rate flat across all of our markets. "
+) * 2
+INTERVIEWER_REPLY = (
+    "Thanks, that is helpful. How did you decide which experiments to run first, and how did you "
+    "bring engineering along when the roadmap was already full for the quarter?"
+)
+
+
+def interview_history(turn: int):
+    """the gemini history vapi sends on the given turn, the candidate just answered"""
+    messages = []
+    for _ in range(turn - 1):
+        messages.append({"role": "user", "parts": [{"text": CANDIDATE_ANSWER}]})
+        messages.append({"role": "model", "parts": [{"text": INTERVIEWER_REPLY}]})
+    messages.append({"role": "user", "parts": [{"text": CANDIDATE_ANSWER}]})
+    return messages
+
+
+async def run_turn(gemini_messages):
+    started = time.perf_counter()
+    ttft = None
+    prompt_tokens = None
+    stream = await agenerate_with_gemini(prompt=gemini_messages, stream=True, system_instruction=SYSTEM_INSTRUCTION)
+    async for chunk in stream:
+        if ttft is None and chunk.text:
+            ttft = time.perf_counter() - started
+        if chunk.usage_metadata:
+            prompt_tokens = chunk.usage_metadata.prompt_token_count
+    return prompt_tokens, ttft
+
+
+async def main(turns: int, keep_last_exchanges: int, summarize_every_exchanges: int, report_every: int):
+    call_state = {
+        "session_id": "bench",
+        "agent_config": {"history_compaction": {
+            "keep_last_exchanges": keep_last_exchanges,
+            "summarize_every_exchanges": summarize_every_exchanges,
+        }},
+    }
+    totals = {"full": 0, "compacted": 0}
+
+    print(f"{'turn':>5}{'full tokens':>13}{'full ttft ms':>14}{'compact tokens':>16}{'compact ttft ms':>17}")
+    for turn in range(1, turns + 1):
+        history = interview_history(turn)
+        full_tokens, full_ttft = await run_turn(history)
+        compacted_tokens, compacted_ttft = await run_turn(history_compactor.compact_history(call_state, history))
+        totals["full"] += full_tokens
+        totals["compacted"] += compacted_tokens
+
+        # the candidate speaks between turns, that is when the background summary gets built
+        if history_compactor._summary_tasks:
+            await asyncio.gather(*history_compactor._summary_tasks)
+
+        if turn == 1 or turn % report_every == 0:
+            print(f"{turn:>5}{full_tokens:>13}{full_ttft * 1000:>14.1f}{compacted_tokens:>16}{compacted_ttft * 1000:>17.1f}")
+
+    print(f"total prompt tokens over {turns} turns :: full = {totals['full']}, compacted = {totals['compacted']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark prompt tokens and ttft per turn with history compaction.")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--keep-last-exchanges", type=int, default=history_compactor.DEFAULT_KEEP_LAST_EXCHANGES)
+    parser.add_argument("--summarize-every-exchanges", type=int, default=history_compactor.DEFAULT_SUMMARIZE_EVERY_EXCHANGES)
+    parser.add_argument("--report-every", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=0.3)
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=20000.0)
+    cli_args = parser.parse_args()
+
+    start_stub_server_in_thread(
+        STUB_PORT,
+        first_token_delay=cli_args.first_token_delay,
+        tokens_per_sec=400.0,
+        prefill_tokens_per_sec=cli_args.prefill_tokens_per_sec,
+    )
+    asyncio.run(main(cli_args.turns, cli_args.keep_last_exchanges, cli_args.summarize_every_exchanges, cli_args.report_every))
@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# compares framing streamed interviewer text into openai chat.completion.chunk sse events the old way
+# (dict + json.dumps + hash id + time.time per chunk) against utils.sse_encoder.
+# usage :: python scripts/bench_sse_encoder.py --chunks 200000
+
+from utils.sse_encoder import ChatCompletionChunkEncoder
+
+TEXT_PARTS = [
+    "Thanks for walking me through that. ",
+    "Could you tell me about a time ",
+    "you had to prioritise between two competing ",
+    "stakeholder requests? ",
+    "How did you decide what to ship first, ",
+    "and what would you do differently now?",
+]
+
+
+def frame_old(parts):
+    """mirrors the handlers before the encoder, one dict and json.dumps per chunk"""
+    for text in parts:
+        openai_chunk = {
+            "id": "chatcmpl-" + str(hash(str(text)))[:10],
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "choices": [{
+                "index": 0,
+                "delta": {"content": text},
+                "finish_reason": None
+            }]
+        }
+        yield f"data: {json.dumps(openai_chunk)}\n\n"
+
+
+def frame_encoder(parts, coalesce=False):
+    """mirrors the handlers now, one encoder per response"""
+    sse_encoder = ChatCompletionChunkEncoder(coalesce=coalesce)
+    for text in parts:
+        sse_event = sse_encoder.push(text)
+        if sse_event:
+            yield sse_event
+    remaining_event = sse_encoder.flush()
+    if remaining_event:
+        yield remaining_event
+
+
+def chunks_per_sec(frame_fn, total_chunks: int) -> float:
+    responses = total_chunks // len(TEXT_PARTS)
+    started = time.perf_counter()
+    for _ in range(responses):
+        for _ in frame_fn(TEXT_PARTS):
+            pass
+    return responses * len(TEXT_PARTS) / (time.perf_counter() - started)
+
+
+def allocations(frame_fn, responses: int):
+    """traced allocated blocks and peak bytes per input chunk while framing, the framed events are kept alive"""
+    tracemalloc.start()
+    before_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.reset_peak()
+    events = [list(frame_fn(TEXT_PARTS)) for _ in range(responses)]
+    after_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    input_chunks = responses * len(TEXT_PARTS)
+    output_bytes = sum(len(event) for response in events for event in response)
+    return (after_blocks - before_blocks) / input_chunks, peak / input_chunks, output_bytes / input_chunks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sse chunk framing of the chat completions endpoints.")
+    parser.add_argument("--chunks", type=int, default=200000)
+    parser.add_argument("--alloc-responses", type=int, default=2000)
+    cli_args = parser.parse_args()
+
+    modes = {
+        "json.dumps (old)": frame_old,
+        "encoder": frame_encoder,
+        "encoder coalesced": lambda parts: frame_encoder(parts, coalesce=True),
+    }
+
+    print(f"{'mode':<20}{'chunks/sec':>14}{'live blocks/chunk':>19}{'peak B/chunk':>14}{'out B/chunk':>13}")
+    for name, frame_fn in modes.items():
+        rate = chunks_per_sec(frame_fn, cli_args.chunks)
+        blocks, peak, out = allocations(frame_fn, cli_args.alloc_responses)
+        print(f"{name:<20}{rate:>14,.0f}{blocks:>19.2f}{peak:>14.0f}{out:>13.0f}")
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# compares time to first token of N concurrent interview turns on a single event loop (one uvicorn worker)
+# when the gemini stream is walked with the blocking sdk iterator vs the async sdk client.
+# usage :: python scripts/bench_stream_ttft.py --concurrency 1 10 25 50
+
+STUB_PORT = int(os.getenv("STUB_GEMINI_PORT", "8765"))
+os.environ["GOOGLE_GEMINI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/"
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+from scripts.stub_gemini_server import start_stub_server_in_thread
+from utils.llm_helper import generate_with_gemini, agenerate_with_gemini
+
+PROMPT = [{"role": "user", "parts": [{"text": "I led the checkout redesign last year."}]}]
+
+
+async def sync_stream_turn(arrived_at: float):
+    """mirrors the old handler, a blocking sdk iterator walked inside the async generator"""
+    await asyncio.sleep(0) # yield once like the handler does before the stream starts
+    ttft = None
+    stream = generate_with_gemini(prompt=PROMPT, stream=True, system_instruction="interviewer")
+    for chunk in stream:
+        if ttft is None and chunk.text:
+            ttft = time.perf_counter() - arrived_at
+    return ttft
+
+
+async def async_stream_turn(arrived_at: float):
+    """mirrors the current handler, the async sdk stream walked with async for"""
+    await asyncio.sleep(0)
+    ttft = None
+    stream = await agenerate_with_gemini(prompt=PROMPT, stream=True, system_instruction="interviewer")
+    async for chunk in stream:
+        if ttft is None and chunk.text:
+            ttft = time.perf_counter() - arrived_at
+    return ttft
+
+
+async def run_level(turn_fn, concurrency: int):
+    # all calls arrive together, ttft is measured from arrival so time spent waiting on a blocked loop counts
+    arrived_at = time.perf_counter()
+    ttfts = await asyncio.gather(*[turn_fn(arrived_at) for _ in range(concurrency)])
+    ttfts = sorted(t for t in ttfts if t is not None)
+    p95_index = max(0, int(round(0.95 * len(ttfts))) - 1)
+    return statistics.median(ttfts), ttfts[p95_index], ttfts[-1]
+
+
+async def main(levels, modes):
+    print(f"{'mode':<8}{'calls':>7}{'ttft p50 ms':>14}{'ttft p95 ms':>14}{'ttft max ms':>14}")
+    for mode in modes:
+        turn_fn = sync_stream_turn if mode == "sync" else async_stream_turn
+        # warm up connection setup and imports so the first level is not penalised
+        await turn_fn(time.perf_counter())
+        for concurrency in levels:
+            p50, p95, worst = await run_level(turn_fn, concurrency)
+            print(f"{mode:<8}{concurrency:>7}{p50 * 1000:>14.1f}{p95 * 1000:>14.1f}{worst * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming ttft under concurrent interview turns.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 25, 50])
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--first-token-delay", type=float, default=0.4)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    cli_args = parser.parse_args()
+
+    start_stub_server_in_thread(STUB_PORT, first_token_delay=cli_args.first_token_delay, tokens_per_sec=cli_args.tokens_per_sec)
+    asyncio.run(main(cli_args.concurrency, cli_args.modes))
@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# replays the credit writes of live calls against a throwaway sqlite db and checks the ledger balance against the
+# users.credits arithmetic the calls used before the ledger (credits -= elapsed minutes - session used credits on
+# every turn). each case is a user, a session and the minute marks of its turns, persisted the way the chat
+# completions handlers do (persist_call_credits from the cached call state). exits with 1 when a case differs.
+#
+# cases ::
+#   - a plain call
+#   - a vapi turn retried at the same minute mark, debited once
+#   - a short session relinked to a new call through /ent/session/link, whose minutes count from 0 again
+#   - a call terminated once the credits ran out, written off to 0
+# usage :: python scripts/check_credit_ledger.py --credits 20
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+import main
+from models import base
+from models.sessions import Session
+from models.users import User
+from services.credit_ledger_service import CreditLedgerService
+from utils.call_state_cache import call_state_cache, load_call_state, persist_call_credits, terminate_call
+
+
+def seed_session(credits: int, call_id: str):
+    """a user with the given credits and a session linked to call_id, returns (user id, session uuid)"""
+    with base.get_db_session() as db:
+        user = User(uuid=str(uuid.uuid4()), username=f"ledger-{call_id}", email=f"{call_id}@example.com", credits=credits)
+        db.add(user)
+        db.flush()
+        session = Session(uuid=str(uuid.uuid4()), user_id=user.id, call_id=call_id, contexts={}, session_metadata={}, used_credits=0, status="CREATED")
+        db.add(session)
+        db.commit()
+        return user.id, session.uuid
+
+
+def run_call(call_id: str, minute_marks: list, baseline: int) -> int:
+    """
+    persists the turns of a call at the given minute marks the way the chat completions handlers do and returns the
+    users.credits of the arithmetic before the ledger, starting from baseline. a retried turn repeats the ledger
+    write of the previous turn, the baseline did not see retries as separate turns.
+    """
+    call_state = load_call_state(call_id=call_id)
+    previous_mark = None
+    for minute_mark in minute_marks:
+        if minute_mark == previous_mark:
+            persist_call_credits(call_state["session_id"], call_id, call_state["user_id"], call_state["used_credits"], credits_delta, call_state["status"])
+            continue
+        credits_delta = minute_mark - call_state["used_credits"]
+        baseline -= credits_delta
+        call_state["used_credits"] = minute_mark
+        persist_call_credits(call_state["session_id"], call_id, call_state["user_id"], call_state["used_credits"], credits_delta, call_state["status"])
+        previous_mark = minute_mark
+    call_state_cache.put(call_id, call_state)
+    return baseline
+
+
+def ledger_balance(user_id: int) -> int:
+    with base.get_db_session() as db:
+        return CreditLedgerService.get_balance(db, user_id)
+
+
+def case_plain_call(credits: int):
+    user_id, _ = seed_session(credits, "plain-call")
+    expected = run_call("plain-call", [0, 1, 2, 3, 4, 5], credits)
+    return expected, ledger_balance(user_id)
+
+
+def case_retried_turn(credits: int):
+    user_id, _ = seed_session(credits, "retried-turn")
+    expected = run_call("retried-turn", [0, 1, 2, 2, 3, 3, 4, 5], credits)
+    return expected, ledger_balance(user_id)
+
+
+def case_relinked_session(credits: int, client: TestClient):
+    user_id, session_uuid = seed_session(credits, "relink-first-call")
+    expected = run_call("relink-first-call", [0, 1, 2, 3, 4, 5], credits)
+    response = client.post("/api/platform/ent/session/link", json={"callId": "relink-second-call", "sessionId": session_uuid})
+    response.raise_for_status()
+    expected = run_call("relink-second-call", [0, 1, 2, 3, 4, 5], expected)
+    return expected, ledger_balance(user_id)
+
+
+def case_terminated_call(credits: int):
+    user_id, _ = seed_session(credits, "terminated-call")
+    run_call("terminated-call", list(range(credits)), credits)
+    terminate_call(call_state_cache.get("terminated-call"), credits + 1)
+    return 0, ledger_balance(user_id)
+
+
+def main_check(credits: int) -> bool:
+    tmp_dir = tempfile.TemporaryDirectory()
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_dir.name, 'ledger.db')}", connect_args={"check_same_thread": False})
+    base.Base.metadata.create_all(bind=engine)
+    base.SessionLocal.configure(bind=engine)
+    client = TestClient(main.app)
+
+    cases = [
+        ("plain call", lambda: case_plain_call(credits)),
+        ("retried turn", lambda: case_retried_turn(credits)),
+        ("relinked session", lambda: case_relinked_session(credits, client)),
+        ("terminated call", lambda: case_terminated_call(credits)),
+    ]
+    passed = True
+    print(f"{'case':>18}{'expected':>10}{'ledger':>8}")
+    for name, case in cases:
+        expected, balance = case()
+        passed = passed and expected == balance
+        print(f"{name:>18}{expected:>10}{balance:>8}{'' if expected == balance else '  MISMATCH'}")
+    tmp_dir.cleanup()
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the credit ledger against the users.credits arithmetic of live calls.")
+    parser.add_argument("--credits", type=int, default=20, help="opening credits of every simulated user")
+    cli_args = parser.parse_args()
+    sys.exit(0 if main_check(cli_args.credits) else 1)
@@ -17,6 +17,9 @@ from models.parsed_results import ParsedResult
 from models.platform_metrics import PlatformMetrics
 from models.user_metrics import UserMetrics
 from models.agents import Agent
+from models.credit_ledger import CreditLedgerEntry, CreditBalance
+from models.session_questions import SessionQuestion
+from models.turn_timings import TurnTiming
 # Ensure all models defined in models/__init__.py are imported if they define tables
 
 def initialize_database():
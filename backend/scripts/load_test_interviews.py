@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+# Add the project root to the Python path to allow importing modules like 'models' and 'utils'
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# offline vapi call simulator :: replays recorded or synthetic interview transcripts as vapi ChatCompletionRequest
+# posts against the live interview endpoints of the app, with N concurrent calls and inter turn gaps that follow
+# how long the candidate talks. the app runs in process on a throwaway sqlite db against the stub gemini server, or
+# with --provider fake against the in process fake llm provider (no network, measures our own overhead only).
+#
+# every random choice (transcripts, gaps, call start times) comes from --seed so two runs with the same arguments
+# replay the same calls and their numbers can be compared. endpoints are run one after the other so the db
+# commits counted on the engine belong to the endpoint under test.
+#
+# usage :: python scripts/load_test_interviews.py --calls 20 --turns 8 --endpoints /chat/completions /v3/chat/completions
+#          python scripts/load_test_interviews.py --transcript recorded_call.json --output run.json
+
+STUB_PORT = int(os.getenv("STUB_GEMINI_PORT", "8768"))
+APP_PORT = int(os.getenv("LOAD_TEST_APP_PORT", "8769"))
+os.environ["GOOGLE_GEMINI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/"
+os.environ.setdefault("GEMINI_API_KEY", "stub-key")
+
+import httpx
+import uvicorn
+from sqlalchemy import create_engine, event
+from models import base
+from models.agents import Agent
+from models.sessions import Session
+from models.users import User
+from scripts.stub_gemini_server import start_stub_server_in_thread
+from utils.fake_llm_provider import FakeProvider
+from utils.llm_providers import register_llm_provider
+from config import config
+from utils.exchange_writer import exchange_writer
+
+ENDPOINT_AGENTS = {
+    "/chat/completions": "interviewer_agent~@~1.0.0",
+    "/v2/chat/completions": "ent_interview_agent~@~1.0.0",
+    "/v3/chat/completions": "ent_interview_agent~@~1.0.0",
+}
+AGENT_PROMPT = "You are a structured, friendly interviewer for a senior product manager role. Ask one question at a time."
+GREETING = "Hello, thanks for joining. Shall we start?"
+ANSWER_PHRASES = [
+    "In my last role I owned the checkout funnel",
+    "we ran weekly experiments on the payment step",
+    "I worked closely with engineering and design",
+    "the hardest part was aligning the stakeholders",
+    "we shipped a one click flow",
+    "conversion moved by a few points",
+    "I would probably start with the customer problem",
+    "honestly I am not sure",
+    "yes",
+    "that is a good question",
+    "we measured it with a holdout group",
+    "I pushed back on the original scope",
+]
+
+
+def synthetic_transcript(rng: random.Random, turns: int) -> list:
+    """candidate messages of one synthetic call, a mix of short replies and longer answers"""
+    messages = []
+    for _ in range(turns):
+        phrase_count = 1 if rng.random() < 0.25 else rng.randint(2, 6)
+        messages.append(", ".join(rng.choice(ANSWER_PHRASES) for _ in range(phrase_count)) + ".")
+    return messages
+
+
+def load_transcripts(path: str) -> list:
+    """
+    recorded transcripts, a json list of calls where a call is either a list of candidate messages or the vapi
+    messages list ({ "role", "content" }) of a recorded call, only its user messages are replayed
+    """
+    with open(path) as transcript_file:
+        calls = json.load(transcript_file)
+    if calls and isinstance(calls[0], (str, dict)):
+        calls = [calls]
+    return [
+        [message["content"] if isinstance(message, dict) else message for message in call if not isinstance(message, dict) or message.get("role") == "user"]
+        for call in calls
+    ]
+
+
+def percentile(sorted_values: list, pct: float):
+    """nearest rank percentile of an already sorted list, None when empty"""
+    if not sorted_values:
+        return None
+    rank = max(int(-(-pct * len(sorted_values) // 100)), 1)
+    return sorted_values[rank - 1]
+
+
+class CommitCounter:
+    """counts the transactions committed on the engine, the app and its background writers included"""
+
+    def __init__(self, engine):
+        self.commits = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_commit(self, _connection):
+        with self._lock:
+            self.commits += 1
+
+
+def setup_database(db_path: str, calls: int, endpoints: list):
+    """binds the app to a throwaway sqlite db seeded with the agents, one user and a session per simulated call"""
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False, "timeout": 30})
+    base.Base.metadata.create_all(bind=engine)
+    base.SessionLocal.configure(bind=engine)
+    base.engine = engine
+    with base.get_db_session() as db:
+        for agent_name in set(ENDPOINT_AGENTS.values()):
+            db.add(Agent(name=agent_name, uuid=str(uuid.uuid4()), prompt=AGENT_PROMPT, config={}, is_active=True))
+        user = User(uuid=str(uuid.uuid4()), username="load-test", email="load-test@example.com", credits=1_000_000)
+        db.add(user)
+        db.flush()
+        for endpoint in endpoints:
+            for call_index in range(calls):
+                db.add(Session(
+                    uuid=str(uuid.uuid4()),
+                    user_id=user.id,
+                    call_id=f"load-test-{endpoint}-{call_index}",
+                    contexts={"job_title": "Senior Product Manager", "job_description": "Own the payments roadmap."},
+                    session_metadata={},
+                    used_credits=0,
+                    status="CREATED",
+                ))
+    return engine
+
+
+def start_app_in_thread(port: int) -> uvicorn.Server:
+    """runs the app with a single uvicorn worker (like production) on a background thread"""
+    import main
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_turn(client: httpx.AsyncClient, url: str, payload: dict) -> dict:
+    """posts one turn and walks the sse stream, ttft is the time to the first content delta"""
+    started = time.perf_counter()
+    first_token_at = None
+    reply = ""
+    error = None
+    try:
+        async with client.stream("POST", url, json=payload) as response:
+            if response.status_code != 200:
+                error = f"http {response.status_code}"
+            async for line in response.aiter_lines():
+                if error or not line.startswith("data: ") or line == "data: [DONE]":
+                    continue
+                event_body = json.loads(line[len("data: "):])
+                if "error" in event_body:
+                    error = event_body["error"]
+                    continue
+                content = ((event_body.get("choices") or [{}])[0].get("delta") or {}).get("content")
+                if content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    reply += content
+    except Exception as exception:
+        error = f"{type(exception).__name__}: {exception}"
+    finished = time.perf_counter()
+    if not error and first_token_at is None:
+        error = "empty response"
+    return {
+        "ttft": first_token_at - started if first_token_at else None,
+        "tokens": len(reply.split()),
+        "stream": finished - first_token_at if first_token_at else None,
+        "reply": reply,
+        "error": error,
+    }
+
+
+async def simulate_call(client: httpx.AsyncClient, url: str, call_id: str, candidate_messages: list, rng: random.Random, args) -> list:
+    """one vapi call, the candidate speaks (words / speaking rate, with jitter) before every turn"""
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+    call = {
+        "id": call_id,
+        "orgId": "load-test",
+        "createdAt": datetime.now(timezone.utc).isoformat(),
+        "updatedAt": datetime.now(timezone.utc).isoformat(),
+        "type": "webCall",
+        "monitor": {"controlUrl": "http://load-test/control", "listenUrl": "ws://load-test/listen"},
+    }
+    messages = [{"role": "assistant", "content": GREETING}]
+    results = []
+    for candidate_message in candidate_messages:
+        speaking_time = len(candidate_message.split()) / args.words_per_sec
+        await asyncio.sleep(args.gap_scale * (speaking_time + rng.uniform(0.2, 1.0)))
+        messages.append({"role": "user", "content": candidate_message})
+        result = await run_turn(client, url, {"messages": messages, "stream": True, "call": call})
+        results.append(result)
+        messages.append({"role": "assistant", "content": result["reply"] or "Could you say that again?"})
+    return results
+
+
+async def run_endpoint(endpoint: str, transcripts: list, commit_counter: CommitCounter, args) -> dict:
+    url = f"http://127.0.0.1:{APP_PORT}/api/platform{endpoint}"
+    limits = httpx.Limits(max_connections=args.calls, max_keepalive_connections=args.calls)
+    commits_before = commit_counter.commits
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        call_results = await asyncio.gather(*[
+            simulate_call(
+                client,
+                url,
+                f"load-test-{endpoint}-{call_index}",
+                transcripts[call_index % len(transcripts)],
+                random.Random(f"{args.seed}-{endpoint}-{call_index}"),
+                args,
+            )
+            for call_index in range(args.calls)
+        ])
+    elapsed = time.perf_counter() - started
+    # the turn background tasks and the exchange writer commit after the responses, let them land in this endpoint
+    await asyncio.sleep(args.settle)
+    await asyncio.to_thread(exchange_writer.flush)
+
+    turns = [result for results in call_results for result in results]
+    ok_turns = [turn for turn in turns if not turn["error"]]
+    ttfts = sorted(turn["ttft"] * 1000 for turn in ok_turns)
+    token_rates = sorted(turn["tokens"] / turn["stream"] for turn in ok_turns if turn["stream"])
+    errors = {}
+    for turn in turns:
+        if turn["error"]:
+            errors[turn["error"]] = errors.get(turn["error"], 0) + 1
+    return {
+        "endpoint": endpoint,
+        "calls": args.calls,
+        "turns": len(turns),
+        "errorRate": round((len(turns) - len(ok_turns)) / len(turns), 4) if turns else 0.0,
+        "errors": errors,
+        "ttftMs": {name: round(percentile(ttfts, pct), 1) if ttfts else None for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))},
+        "tokensPerSecP50": round(percentile(token_rates, 50), 1) if token_rates else None,
+        "throughputTokensPerSec": round(sum(turn["tokens"] for turn in ok_turns) / elapsed, 1),
+        "dbCommitsPerTurn": round((commit_counter.commits - commits_before) / len(turns), 2) if turns else None,
+        "elapsedSec": round(elapsed, 2),
+    }
+
+
+def print_report(results: list):
+    print(f"{'endpoint':<24}{'turns':>7}{'err %':>7}{'ttft p50':>10}{'ttft p95':>10}{'ttft p99':>10}{'tok/s':>8}{'commits/turn':>14}")
+    for result in results:
+        ttft = {name: f"{value:.1f}" if value is not None else "-" for name, value in result["ttftMs"].items()}
+        print(
+            f"{result['endpoint']:<24}{result['turns']:>7}{result['errorRate'] * 100:>7.1f}{ttft['p50']:>10}{ttft['p95']:>10}{ttft['p99']:>10}"
+            f"{result['tokensPerSecP50'] or 0:>8.1f}{result['dbCommitsPerTurn'] or 0:>14.2f}"
+        )
+        for error, count in result["errors"].items():
+            print(f"    {count} x {error}")
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    transcripts = load_transcripts(args.transcript) if args.transcript else [synthetic_transcript(rng, args.turns) for _ in range(args.calls)]
+    transcripts = [transcript[:args.turns] for transcript in transcripts]
+
+    tmp_dir = tempfile.TemporaryDirectory()
+    engine = setup_database(os.path.join(tmp_dir.name, "load_test.db"), args.calls, args.endpoints)
+    commit_counter = CommitCounter(engine)
+    if args.provider == "fake":
+        # the fake provider emulates the interview tools itself, retrieve_context and main_question_setter
+        register_llm_provider(FakeProvider(first_token_delay=args.first_token_delay, tokens_per_sec=args.tokens_per_sec))
+        config.LLM_PROVIDER = FakeProvider.name
+    else:
+        start_stub_server_in_thread(
+            STUB_PORT,
+            first_token_delay=args.first_token_delay,
+            tokens_per_sec=args.tokens_per_sec,
+            prefill_tokens_per_sec=args.prefill_tokens_per_sec,
+            function_call="retrieve_context" if args.tool_calls else None,
+            function_call_args={"session_id": 1},
+        )
+    start_app_in_thread(APP_PORT)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results = [await run_endpoint(endpoint, transcripts, commit_counter, args) for endpoint in args.endpoints]
+    print_report(results)
+    if args.output:
+        settings = {key: value for key, value in vars(args).items() if key not in ("output", "verbose")}
+        with open(args.output, "w") as output_file:
+            json.dump({"settings": settings, "results": results}, output_file, indent=2)
+        print(f"results written to {args.output}")
+    tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the live interview endpoints with simulated vapi calls.")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINT_AGENTS.keys()), default=["/chat/completions", "/v3/chat/completions"])
+    parser.add_argument("--calls", type=int, default=10, help="concurrent calls per endpoint")
+    parser.add_argument("--turns", type=int, default=6, help="candidate turns per call (recorded transcripts are cut to it)")
+    parser.add_argument("--transcript", help="json file with recorded transcripts, synthetic ones are generated otherwise")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="calls start at a random point within these seconds")
+    parser.add_argument("--words-per-sec", type=float, default=2.5, help="candidate speaking rate used for the inter turn gap")
+    parser.add_argument("--gap-scale", type=float, default=1.0, help="multiplies every inter turn gap, 0 sends turns back to back")
+    parser.add_argument("--provider", choices=["stub", "fake"], default="stub", help="stub gemini server over http or the in process fake provider")
+    parser.add_argument("--first-token-delay", type=float, default=0.4)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--tool-calls", action="store_true", help="the stub model calls retrieve_context before every answer")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait for background commits after an endpoint")
+    parser.add_argument("--output", help="write the settings and results as json, to compare runs")
+    parser.add_argument("--verbose", action="store_true", help="keep the app logs")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# local stand in for the gemini generateContent / streamGenerateContent rest api, used by the benchmark scripts.
+# point the sdk at it with GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:<port>/
+
+STUB_REPLY = (
+    "Thanks for walking me through that. Could you tell me about a time you had to prioritise "
+    "between two competing stakeholder requests, and how you decided what to ship first?"
+)
+
+
+def create_stub_app(
+    first_token_delay: float = 0.4,
+    tokens_per_sec: float = 80.0,
+    words_per_chunk: int = 4,
+    prefill_tokens_per_sec: float = 0.0,
+    function_call: Optional[str] = None,
+    function_call_args: Optional[Dict[str, Any]] = None,
+    skip_function_call_marker: Optional[str] = None,
+) -> FastAPI:
+    """
+    builds the stub gemini app.
+
+    Args:
+        first_token_delay: seconds to wait before the first streamed chunk (simulated model ttft)
+        tokens_per_sec: streaming rate, one word is counted as one token
+        words_per_chunk: words packed into every streamed chunk
+        prefill_tokens_per_sec: when set, the first token is further delayed by the uncached prompt tokens
+            at this rate, so ttft grows with the prompt like it does on the real model
+        function_call: name of a function the stub calls (with function_call_args) before answering every turn,
+            like a model told to always use a tool. the turn is answered once the function response is sent back
+        skip_function_call_marker: the function is not called when the system instruction (or the cached content)
+            contains this text, like a model that already has what the tool would return
+    """
+    app = FastAPI()
+    words = STUB_REPLY.split(" ")
+    # cached contents created through the stub, name -> (cached token count (one token counted per 4 chars), raw body)
+    cached_contents = {}
+
+    def response_chunk(text: str, candidates_token_count: int, prompt_token_count: int, cached_token_count: int = 0) -> dict:
+        usage_metadata = {
+            "promptTokenCount": prompt_token_count + cached_token_count,
+            "candidatesTokenCount": candidates_token_count,
+            "totalTokenCount": prompt_token_count + cached_token_count + candidates_token_count,
+        }
+        if cached_token_count:
+            usage_metadata["cachedContentTokenCount"] = cached_token_count
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}],
+            "usageMetadata": usage_metadata,
+            "modelVersion": "stub-gemini",
+        }
+
+    def wants_function_call(body: dict, prompt: str, declared_tools: str) -> bool:
+        if f'"name": "{function_call}"' not in declared_tools:
+            return False
+        if skip_function_call_marker and skip_function_call_marker in prompt:
+            return False
+        last_parts = (body.get("contents") or [{}])[-1].get("parts", [])
+        return not any("functionResponse" in part for part in last_parts)
+
+    @app.post("/{api_version}/cachedContents")
+    async def create_cached_content(request: Request, api_version: str):
+        body = await request.json()
+        name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+        raw_body = json.dumps(body)
+        cached_contents[name] = (len(raw_body) // 4, raw_body)
+        return {"name": name, "model": body.get("model"), "usageMetadata": {"totalTokenCount": cached_contents[name][0]}}
+
+    @app.delete("/{api_version}/cachedContents/{cache_id}")
+    async def delete_cached_content(api_version: str, cache_id: str):
+        cached_contents.pop(f"cachedContents/{cache_id}", None)
+        return {}
+
+    @app.get("/{api_version}/models/{model}")
+    async def get_model(api_version: str, model: str):
+        return {"name": f"models/{model}", "inputTokenLimit": 1048576, "outputTokenLimit": 8192}
+
+    @app.post("/{api_version}/models/{model_action}")
+    async def generate_content(request: Request, api_version: str, model_action: str):
+        body = await request.json()
+        cached_token_count, cached_body = cached_contents.get(body.get("cachedContent"), (0, ""))
+        # rough token count of the uncached prompt, one token per 4 chars of the request
+        raw_body = json.dumps(body)
+        prompt_token_count = len(raw_body) // 4
+        prefill_delay = prompt_token_count / prefill_tokens_per_sec if prefill_tokens_per_sec else 0.0
+
+        if function_call and wants_function_call(body, raw_body + cached_body, json.dumps(body.get("tools", [])) + cached_body):
+            await asyncio.sleep(first_token_delay + prefill_delay)
+            chunk = response_chunk("", 1, prompt_token_count, cached_token_count)
+            chunk["candidates"][0]["content"]["parts"] = [{"functionCall": {"name": function_call, "args": function_call_args or {}}}]
+            if model_action.endswith(":generateContent"):
+                return chunk
+            return StreamingResponse(iter([f"data: {json.dumps(chunk)}\r\n\r\n"]), media_type="text/event-stream")
+
+        if model_action.endswith(":generateContent"):
+            await asyncio.sleep(first_token_delay + prefill_delay + len(words) / tokens_per_sec)
+            return response_chunk(STUB_REPLY, len(words), prompt_token_count, cached_token_count)
+
+        async def sse():
+            await asyncio.sleep(first_token_delay + prefill_delay)
+            sent = 0
+            for i in range(0, len(words), words_per_chunk):
+                piece = words[i:i + words_per_chunk]
+                sent += len(piece)
+                text = " ".join(piece) + (" " if i + words_per_chunk < len(words) else "")
+                yield f"data: {json.dumps(response_chunk(text, sent, prompt_token_count, cached_token_count))}\r\n\r\n"
+                await asyncio.sleep(len(piece) / tokens_per_sec)
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    return app
+
+
+def start_stub_server_in_thread(port: int, ssl_certfile: str = None, ssl_keyfile: str = None, **stub_kwargs) -> uvicorn.Server:
+    """
+    starts the stub server on a background thread with its own event loop and waits for it to accept requests,
+    served over https when a certificate and key are given
+    """
+    server = uvicorn.Server(uvicorn.Config(
+        create_stub_app(**stub_kwargs), host="127.0.0.1", port=port, log_level="warning", ssl_certfile=ssl_certfile, ssl_keyfile=ssl_keyfile
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the gemini streaming api.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.4)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--words-per-chunk", type=int, default=4)
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=0.0)
+    cli_args = parser.parse_args()
+
+    uvicorn.run(
+        create_stub_app(cli_args.first_token_delay, cli_args.tokens_per_sec, cli_args.words_per_chunk, cli_args.prefill_tokens_per_sec),
+        host="127.0.0.1",
+        port=cli_args.port,
+        log_level="warning",
+    )
@@ -1,4 +1,5 @@
 import uuid
+import base64
 import requests
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, desc, func, cast, Integer, and_
@@ -11,6 +12,7 @@ import logging
 from models.agents import Agent, AGENT_NAME_SEPARATOR
 from models.organisations import Organisation
 from services.agent_management_services import AgentManagementServices
+from utils.agent_registry import agent_registry
 from config import config
 logger = logging.getLogger(__name__)
 
@@ -77,6 +79,7 @@ class AdminService:
             existing_agent.org_id = org_id
             db.commit()
             db.refresh(existing_agent)
+            agent_registry.invalidate()
             return existing_agent, "updated"
         else:
             
@@ -92,6 +95,7 @@ class AdminService:
             db.add(new_agent)
             db.commit()
             db.refresh(new_agent)
+            agent_registry.invalidate()
             return new_agent, "created"
         
     @staticmethod
@@ -112,6 +116,7 @@ class AdminService:
             existing_agent.config = llmConfig
             db.commit()
             db.refresh(existing_agent)
+            agent_registry.invalidate()
             return existing_agent, "updated"
        
         global_agent = db.query(Agent).filter(Agent.name == standardized_agent_name).first()
@@ -130,63 +135,88 @@ class AdminService:
         db.add(new_agent)
         db.commit()
         db.refresh(new_agent)
+        agent_registry.invalidate()
         
         return new_agent, "created"
     
     @staticmethod
-    def get_agents_of_org(db: Session, org_id: int, page: int = 1, limit: int = 10, job_id: int = None):
-        
+    def _encode_agent_cursor(created_at: datetime, agent_id: int) -> str:
+        return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{agent_id}".encode()).decode()
+
+    @staticmethod
+    def _decode_agent_cursor(cursor: str):
+        try:
+            created_at, _, agent_id = base64.urlsafe_b64decode(cursor.encode()).decode().partition("|")
+            return datetime.fromisoformat(created_at), int(agent_id)
+        except Exception:
+            raise ValueError("invalid agents cursor")
+
+    @staticmethod
+    def get_agents_of_org(db: Session, org_id: int, page: int = 1, limit: int = 10, job_id: int = None, cursor: str = None):
+        """
+        agents of the organisation (of one of its jobs when job_id is given), newest first, without their prompts.
+        the job filter and the count run in sql. pages are read after the cursor of the previous page (nextCursor)
+        when one is given, by page offset otherwise.
+        """
         query = db.query(Agent).filter(Agent.org_id == org_id)
+        if job_id:
+            query = query.filter(Agent.job_id == str(job_id))
         total = query.count()
-        
-        agents = query.order_by(Agent.created_at.desc()).offset((page - 1) * limit).limit(limit).all() if not job_id else query.order_by(Agent.created_at.desc()).all()
-        
-        org_data = db.query(Organisation).filter(Organisation.id == org_id).first()
-        agent_list = []
-        
-        for agent in agents:
-            if not agent:
-                continue
-            name_parts = agent.name.split(AGENT_NAME_SEPARATOR)
-            
-            org_job_id = name_parts[0].split("_")[1]
-             
-            if not job_id:
-                agent_list.append({
-                    "id": agent.uuid,
-                    "name": name_parts[0],
-                    "version": name_parts[1] if len(name_parts) > 1 else "",
-                    "prompt": agent.prompt,
-                    # "config": agent.config,
-                    "isActive": agent.is_active,
-                    "createdAt": agent.created_at,
-                    "updatedAt": agent.updated_at,
-                    "orgId": agent.org_id,
-                    "orgName" : org_data.name
-                })
-            else: 
-                if int(job_id) == int(org_job_id):
-                    agent_list.append({
-                        "id": agent.uuid,
-                        "name": name_parts[0],
-                        "version": name_parts[1] if len(name_parts) > 1 else "",
-                        "prompt": agent.prompt,
-                        # "config": agent.config,
-                        "isActive": agent.is_active,
-                        "createdAt": agent.created_at,
-                        "updatedAt": agent.updated_at,
-                        "orgId": agent.org_id,
-                        "orgName" : org_data.name
-                    })  
-                 
-            
+
+        if cursor:
+            cursor_created_at, cursor_id = AdminService._decode_agent_cursor(cursor)
+            query = query.filter(or_(
+                Agent.created_at < cursor_created_at,
+                and_(Agent.created_at == cursor_created_at, Agent.id < cursor_id),
+            ))
+        query = query.with_entities(
+            Agent.id, Agent.uuid, Agent.base_name, Agent.version, Agent.is_active, Agent.created_at, Agent.updated_at, Agent.org_id
+        ).order_by(Agent.created_at.desc(), Agent.id.desc())
+        if not cursor:
+            query = query.offset((page - 1) * limit)
+
+        # one row past the page tells whether there is a next one
+        agents = query.limit(limit + 1).all()
+        next_cursor = AdminService._encode_agent_cursor(agents[limit - 1].created_at, agents[limit - 1].id) if len(agents) > limit else None
+        agents = agents[:limit]
+
+        org_name = db.query(Organisation.name).filter(Organisation.id == org_id).scalar()
         return {
             "total": total,
             "currentPage": page,
-            "limit" : 10,
-            "agents": agent_list
+            "limit" : limit,
+            "nextCursor": next_cursor,
+            "agents": [{
+                "id": agent.uuid,
+                "name": agent.base_name,
+                "version": agent.version or "",
+                "isActive": agent.is_active,
+                "createdAt": agent.created_at,
+                "updatedAt": agent.updated_at,
+                "orgId": agent.org_id,
+                "orgName" : org_name
+            } for agent in agents]
         }
-        
+
+    @staticmethod
+    def get_agent_of_org(db: Session, org_id: int, agent_uuid: str):
+        """one agent of the organisation with its prompt, the listings leave the prompts out"""
+        agent = db.query(Agent).filter(Agent.org_id == org_id, Agent.uuid == agent_uuid).first()
+        if not agent:
+            return None
+        return {
+            "id": agent.uuid,
+            "name": agent.base_name,
+            "version": agent.version or "",
+            "jobId": agent.job_id,
+            "prompt": agent.prompt,
+            "isActive": agent.is_active,
+            "createdAt": agent.created_at,
+            "updatedAt": agent.updated_at,
+            "orgId": agent.org_id,
+            "orgName" : agent.organisation.name if agent.organisation else None
+        }
+
     @staticmethod
     def get_external_users_of_org(db: Session, org_id: int, page: int = 1, limit: int = 10):
         
@@ -2,6 +2,7 @@ import uuid
 from models.agents import AGENT_NAME_SEPARATOR, Agent
 import logging
 from models.base import get_db_session
+from utils.agent_registry import agent_registry
 from utils.datetime_helper import StandardDT
 
 logger = logging.getLogger(__name__)
@@ -47,6 +48,7 @@ class AgentManagementServices:
                 if not is_agent_exists:                        
                     db.add(new_agent)
                     db.commit()
+                    agent_registry.invalidate()
                     return True, {"message" : f"new agent {name} with version tag {version} created", "agent uuid" : agent_uuid}
                 else:
                     return False, {"message" : f"agent with {name} and verion tag {version} already exists"}
@@ -80,13 +82,14 @@ class AgentManagementServices:
                     existing_agent.config = llm_config if llm_config != None else existing_agent.config
                     
                     db.commit()
+                    agent_registry.invalidate()
                     return True, {"message" : f"agent successfully updated"}
                 else:
-                    existing_agent_name = db.query(Agent).filter(
-                        Agent.name.startswith(str(name).strip())
-                    ).all()
+                    existing_agent_name = db.query(Agent.id).filter(
+                        Agent.base_name == str(name).strip()
+                    ).first()
                     
-                    if existing_agent_name and len(existing_agent_name) != 0:
+                    if existing_agent_name:
                         # then create the new veriosn of this agent
                         args = {
                             "name" : name,
@@ -121,6 +124,7 @@ class AgentManagementServices:
                 
                 db.delete(agent)
                 db.commit()
+                agent_registry.invalidate()
                 return True
         except Exception as e:
             logger.exception("[AgentServices.delete_agent] :: caught exception")
@@ -133,8 +137,8 @@ class AgentManagementServices:
                 all_agents_data = db.query(Agent).all()
                 all_agents = {}
                 for agent in all_agents_data:
-                    agent_name = agent.name.split(AGENT_NAME_SEPARATOR)[0]
-                    agent_version = agent.name.split(AGENT_NAME_SEPARATOR)[1]
+                    agent_name = agent.base_name
+                    agent_version = agent.version
                     agent_data = {
                         "version" : agent_version,
                         "prompt" : agent.prompt,
@@ -176,7 +180,7 @@ class AgentManagementServices:
                     return False, {"message" : f"No agent found, so keeping the default agent as active"}
                 else: 
                     currently_active_agent = db.query(Agent).filter(
-                        Agent.name.startswith(selected_agent.name.split(AGENT_NAME_SEPARATOR)[0]),
+                        Agent.base_name == selected_agent.base_name,
                         Agent.is_active == True
                         ).first()
                     
@@ -186,6 +190,7 @@ class AgentManagementServices:
                     selected_agent.is_active = True
                 
                 db.commit()
+            agent_registry.invalidate()
                          
             return True, {"message" : "Agent set as active"}        
         except Exception:
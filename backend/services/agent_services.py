@@ -1,8 +1,12 @@
+import asyncio
 import json
-from models.base import get_db_session
-from utils.agent_return_types import AgentTypesEnum
-from utils.llm_helper import generate_with_gemini
-from models.agents import Agent
+from utils.agent_registry import agent_registry
+from utils.llm_helper import generate_with_gemini, agenerate_with_gemini
+from utils.llm_call_policy import CallPolicy
+from utils.agent_result_cache import agent_result_cache
+from utils.llm_scheduler import LLMPriority
+from utils.structured_stream import StructuredStreamParser
+from utils.model_router import get_model_settings
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,82 +14,215 @@ logger = logging.getLogger(__name__)
 
 class AgentServices:
     
+    @staticmethod
+    def _load_agent(args: dict, default_priority: LLMPriority):
+        """
+        looks up the agent of the args (by uuid, else by name) and returns the generation kwargs for it, with the
+        result cache entry of the call ({ key, agent_uuid, agent_name, ttl_seconds }) or None when the agent does
+        not use the result cache. args can set the "priority" class of the call for the llm scheduler and the
+        "user_id" the llm usage of the call is counted for.
+        """
+        agent_uuid = args.get("uuid", None)
+        agent_name = args.get("name", None)
+        input_context = args.get("context", None)
+
+        if agent_name and not agent_uuid:
+            selected_agent = agent_registry.get_active(agent_name)
+            if not selected_agent:
+                logger.error("[generic_agent] :: Agent by name = %s does not exist", agent_name)
+                raise ValueError(f"Agent by name = {agent_name} does not exist")
+        else:
+            selected_agent = agent_registry.get_by_uuid(agent_uuid)
+            if not selected_agent:
+                logger.error("[generic_agent] :: Agent by uuid = %s does not exist", agent_uuid)
+                raise ValueError(f"Agent by uuid = {agent_uuid} does not exist")
+                    
+        agent_prompt = selected_agent.prompt #if not input_context else f"{selected_agent.prompt}\n\n context = {input_context}"
+        agent_name = selected_agent.name
+        agent_org_id = selected_agent.org_id
+        model_settings = get_model_settings(selected_agent.config)
+        # latencies (for the hedge delay) are tracked per agent, across its versions, and model
+        call_policy = CallPolicy.from_agent_config(selected_agent.config, latency_key=f"{selected_agent.base_name}:{model_settings['model']}")
+        
+        response_type = selected_agent.response_type
+        if not response_type:
+            logger.info("[generic_agent] :: No response type defined for agent = %s, returning pure text response from llm", agent_name)
+        
+        result_cache = None
+        result_cache_settings = agent_result_cache.settings(selected_agent.config)
+        if result_cache_settings["enabled"]:
+            result_cache = {
+                "key" : agent_result_cache.build_key(selected_agent.uuid, agent_prompt, model_settings["model"], input_context),
+                "agent_uuid" : selected_agent.uuid,
+                "agent_name" : agent_name,
+                "ttl_seconds" : result_cache_settings["ttl_seconds"],
+            }
+            
+        logger.info("[generic_agent] :: calling agent : %s with model = %s", agent_name, model_settings["model"])
+        
+        generation_kwargs = {
+            "system_instruction" : agent_prompt,
+            "stream" : False,
+            "prompt" : f"context = {input_context}",
+            "model" : model_settings["model"],
+            "temperature" : model_settings["temperature"],
+            "call_policy" : call_policy,
+            "priority" : args.get("priority", default_priority),
+            "org_id" : agent_org_id,
+            "user_id" : args.get("user_id"),
+            "agent_name" : agent_name,
+        }
+        if response_type:
+            generation_kwargs["response_format"] = response_type
+        
+        return generation_kwargs, result_cache
+    
+    @staticmethod
+    def _llm_metadata(raw_response, is_streaming_response: bool = False):
+        """llm metadata of a response, or of the last chunk of a stream (it carries the usage of the whole stream)"""
+        return {
+            "is_streaming_response" : is_streaming_response,
+            "model_version" : raw_response.model_version,
+            "cached_content_token_count" : raw_response.usage_metadata.cached_content_token_count,
+            "candidates_token_count" : raw_response.usage_metadata.candidates_token_count,
+            "prompt_token_count" : raw_response.usage_metadata.prompt_token_count,
+            "total_token_count" : raw_response.usage_metadata.total_token_count,
+        }
+    
+    @staticmethod
+    def _decode_text(text: str):
+        try:
+            return json.loads(text)
+        except Exception:
+            return text
+    
+    @staticmethod
+    def _build_result(raw_response, is_typed: bool):
+        """the agent result and the llm metadata of a non streaming response"""
+        llm_response_metadata = AgentServices._llm_metadata(raw_response)
+        
+        llm_result = None
+        
+        # typed agents get the response validated and decoded once by the llm helper
+        if is_typed and raw_response.parsed is not None:
+            llm_result = raw_response.parsed.model_dump()
+        else:
+            llm_result = AgentServices._decode_text(raw_response.text)
+            
+        return llm_result , llm_response_metadata
+    
+    @staticmethod
+    def _cached_result(cached):
+        """the agent result and llm metadata of a result cache hit, the metadata is the one of the stored call"""
+        llm_result, llm_response_metadata = cached
+        return llm_result, {**llm_response_metadata, "is_cached_result" : True}
+    
+    @staticmethod
+    def _is_cacheable(raw_response, is_typed: bool) -> bool:
+        # a typed agent whose response did not validate falls back to the raw text, that is not kept
+        return not is_typed or raw_response.parsed is not None
+    
     @staticmethod
     def generic_agent(args: dict):
+        """blocking version of ageneric_agent, for scripts and worker threads. calls are batch priority unless args set one"""
         try:
-            agent_uuid = args.get("uuid", None)
-            agent_name = args.get("name", None)
-            input_context = args.get("context", None)
-
-            agent_prompt = None
-            response_type = None
+            generation_kwargs, result_cache = AgentServices._load_agent(args, LLMPriority.BATCH)
+            if result_cache:
+                cached = agent_result_cache.get(result_cache["key"])
+                if cached:
+                    logger.info("[generic_agent] :: serving stored result of agent = %s", result_cache["agent_name"])
+                    return AgentServices._cached_result(cached)
             
-            with get_db_session() as db:
-                selected_agent = None
-                
-                if agent_name and not agent_uuid:
-                    selected_agent = db.query(Agent).filter(
-                    Agent.name.startswith(agent_name), 
-                    Agent.is_active == True,
-                    ).first()
-                    
-                    if not selected_agent:
-                        logger.error("[generic_agent] :: Agent by name = %s does not exist", agent_name)
-                        raise ValueError(f"Agent by name = {agent_name} does not exist")
-                                
-                else:
-                    selected_agent = db.query(Agent).filter(Agent.uuid == agent_uuid).first()
-                    if not selected_agent:
-                        logger.error("[generic_agent] :: Agent by uuid = %s does not exist", agent_uuid)
-                        raise ValueError(f"Agent by uuid = {agent_uuid} does not exist")
-                            
-                agent_prompt = selected_agent.prompt #if not input_context else f"{selected_agent.prompt}\n\n context = {input_context}"
-                agent_name = selected_agent.name
-                
-                try:
-                    response_type = AgentTypesEnum[agent_name.split("~@~")[0]]
-                except Exception:
-                    logger.info("[generic_agent] :: No response type defined for agent = %s, returning pure text response from llm", agent_name)
-                
-            logger.info("[generic_agent] :: calling agent : %s", agent_name)
+            is_typed = "response_format" in generation_kwargs
+            raw_response = generate_with_gemini(**generation_kwargs)
+            llm_result, llm_response_metadata = AgentServices._build_result(raw_response, is_typed)
             
-            raw_response = None
+            if result_cache and AgentServices._is_cacheable(raw_response, is_typed):
+                agent_result_cache.put(result_cache["key"], result_cache["agent_uuid"], result_cache["agent_name"], llm_result, llm_response_metadata, result_cache["ttl_seconds"])
+            return llm_result, llm_response_metadata
+                        
+        except Exception:
+            logger.exception("[generic_agent] :: caught exception ")
+            raise
+    
+    @staticmethod
+    async def ageneric_agent(args: dict):
+        """
+        runs the agent of the args on its context without blocking the event loop, used by the async routes.
+        calls are interactive priority (a user waits on them) unless args set one
+        """
+        try:
+            generation_kwargs, result_cache = await asyncio.to_thread(AgentServices._load_agent, args, LLMPriority.INTERACTIVE)
+            if result_cache:
+                cached = await asyncio.to_thread(agent_result_cache.get, result_cache["key"])
+                if cached:
+                    logger.info("[ageneric_agent] :: serving stored result of agent = %s", result_cache["agent_name"])
+                    return AgentServices._cached_result(cached)
             
-            if response_type: 
-                raw_response = generate_with_gemini(
-                system_instruction=agent_prompt,
-                stream=False,
-                prompt=f"context = {input_context}",
-                response_format=response_type.value
-                )
-            else :
-                raw_response = generate_with_gemini(
-                system_instruction=agent_prompt,
-                stream=False,
-                prompt=f"context = {input_context}",
-                )      
+            is_typed = "response_format" in generation_kwargs
+            raw_response = await agenerate_with_gemini(**generation_kwargs)
+            llm_result, llm_response_metadata = AgentServices._build_result(raw_response, is_typed)
             
-            llm_response_metadata = {
-                "is_streaming_response" : False,
-                "model_version" : raw_response.model_version,
-                "cached_content_token_count" : raw_response.usage_metadata.cached_content_token_count,
-                "candidates_token_count" : raw_response.usage_metadata.candidates_token_count,
-                "prompt_token_count" : raw_response.usage_metadata.prompt_token_count,
-                "total_token_count" : raw_response.usage_metadata.total_token_count,
-            }
+            if result_cache and AgentServices._is_cacheable(raw_response, is_typed):
+                await asyncio.to_thread(agent_result_cache.put, result_cache["key"], result_cache["agent_uuid"], result_cache["agent_name"], llm_result, llm_response_metadata, result_cache["ttl_seconds"])
+            return llm_result, llm_response_metadata
+                        
+        except Exception:
+            logger.exception("[ageneric_agent] :: caught exception ")
+            raise
+    
+    @staticmethod
+    async def astream_agent(args: dict):
+        """
+        streaming version of ageneric_agent. for typed agents the validated fields of the response are yielded as
+        soon as they are complete ({ type : "field" | "item", field, index, value }, see utils.structured_stream),
+        then { type : "result", result, llm_metadata } with what ageneric_agent would have returned. agents
+        without a response type only yield their result.
+        """
+        try:
+            generation_kwargs, result_cache = await asyncio.to_thread(AgentServices._load_agent, args, LLMPriority.INTERACTIVE)
+            if result_cache:
+                cached = await asyncio.to_thread(agent_result_cache.get, result_cache["key"])
+                if cached:
+                    logger.info("[astream_agent] :: serving stored result of agent = %s", result_cache["agent_name"])
+                    llm_result, llm_response_metadata = AgentServices._cached_result(cached)
+                    if isinstance(llm_result, dict):
+                        for field, value in llm_result.items():
+                            yield {"type" : "field", "field" : field, "value" : value}
+                    yield {"type" : "result", "result" : llm_result, "llm_metadata" : llm_response_metadata}
+                    return
             
-            llm_result = None
+            response_format = generation_kwargs.get("response_format")
+            structured_stream = StructuredStreamParser(response_format) if response_format else None
+            text_parts = []
+            last_chunk = None
             
-            try:
-                llm_result = json.loads(raw_response.text)
-            except Exception:
-                llm_result = raw_response.text
-                
-            return llm_result , llm_response_metadata
-        
+            stream = await agenerate_with_gemini(**{**generation_kwargs, "stream" : True})
+            async for chunk in stream:
+                last_chunk = chunk
+                if not chunk.text:
+                    continue
+                if structured_stream:
+                    for event in structured_stream.feed(chunk.text):
+                        yield event
+                else:
+                    text_parts.append(chunk.text)
+            
+            if last_chunk is None:
+                raise ValueError(f"empty response from agent = {generation_kwargs['agent_name']}")
+            
+            llm_response_metadata = AgentServices._llm_metadata(last_chunk, is_streaming_response=True)
+            parsed = structured_stream.result() if structured_stream else None
+            if parsed is not None:
+                llm_result = parsed.model_dump()
+            else:
+                llm_result = AgentServices._decode_text(structured_stream.text if structured_stream else "".join(text_parts))
+            
+            # a typed agent whose response did not validate falls back to the raw text, that is not kept
+            if result_cache and (not structured_stream or parsed is not None):
+                await asyncio.to_thread(agent_result_cache.put, result_cache["key"], result_cache["agent_uuid"], result_cache["agent_name"], llm_result, llm_response_metadata, result_cache["ttl_seconds"])
+            yield {"type" : "result", "result" : llm_result, "llm_metadata" : llm_response_metadata}
                         
         except Exception:
-            logger.exception("[generic_agent] :: caught exception ")
+            logger.exception("[astream_agent] :: caught exception ")
             raise
-        
-        
\ No newline at end of file
@@ -0,0 +1,132 @@
+import logging
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session as DBSession
+from models.base import get_db_session
+from models.credit_ledger import CreditBalance, CreditEntryTypeEnum, CreditLedgerEntry
+from models.payments import Payments
+from models.users import User
+from utils.datetime_helper import StandardDT
+
+logger = logging.getLogger(__name__)
+
+
+class CreditLedgerService:
+    """
+    credits of a user are an append only ledger (credit_ledger) with the balance materialized in
+    credit_balances by an insert trigger. every write is a single insert keyed by an idempotency reference,
+    so concurrent or retried writes can neither lose nor double count credits.
+
+    users.credits is kept as a mirror of the balance for the profile / dashboard / admin reads, it is
+    synced on top ups, at session end and by the periodic reconciliation, not on every call turn.
+    call writes (record_usage, write_off) expect the opening balance to exist, get_balance creates it
+    when the call state is loaded.
+    """
+
+    @staticmethod
+    def _append(db: DBSession, user_id: int, entry_type: CreditEntryTypeEnum, credits, reference: str, session_id: int = None) -> bool:
+        """inserts one ledger entry, returns False when an entry with the same reference already exists"""
+        statement = insert(CreditLedgerEntry).values(
+            user_id=user_id,
+            session_id=session_id,
+            entry_type=entry_type.value,
+            credits=credits,
+            reference=reference,
+            created_at=StandardDT.get_iso_dt(),
+        ).on_conflict_do_nothing(index_elements=[CreditLedgerEntry.reference])
+        return db.execute(statement).rowcount == 1
+
+    @staticmethod
+    def ensure_opening_balance(db: DBSession, user_id: int):
+        """carries users.credits over into the ledger the first time a user is seen by it"""
+        opening_credits = func.coalesce(select(User.credits).where(User.id == user_id).scalar_subquery(), 0)
+        CreditLedgerService._append(db, user_id, CreditEntryTypeEnum.OPENING, opening_credits, f"opening:{user_id}")
+
+    @staticmethod
+    def get_balance(db: DBSession, user_id: int) -> int:
+        CreditLedgerService.ensure_opening_balance(db, user_id)
+        return db.execute(select(CreditBalance.balance).where(CreditBalance.user_id == user_id)).scalar() or 0
+
+    @staticmethod
+    def record_usage(db: DBSession, user_id: int, session_id: int, call_id: str, used_credits: int, credits_delta: int) -> bool:
+        """
+        debits the credits a call used since its last debit. the reference is the session, the call and the total
+        minutes used so far, so a retried vapi turn at the same minute mark is not debited twice. the call is part
+        of it because a short session relinked to a new call counts its minutes from 0 again.
+        """
+        if not credits_delta:
+            return False
+        return CreditLedgerService._append(
+            db, user_id, CreditEntryTypeEnum.USAGE, -credits_delta, f"usage:{session_id}:{call_id}:{used_credits}", session_id=session_id
+        )
+
+    @staticmethod
+    def write_off(db: DBSession, user_id: int, session_id: int) -> bool:
+        """brings the balance back to 0 when a call is terminated, the overdraft allowed by the call is forgiven"""
+        remaining = select(-CreditBalance.balance).where(CreditBalance.user_id == user_id).scalar_subquery()
+        return CreditLedgerService._append(
+            db, user_id, CreditEntryTypeEnum.TERMINATION, remaining, f"termination:{session_id}", session_id=session_id
+        )
+
+    @staticmethod
+    def record_topup(db: DBSession, user_id: int, credits: int, payment_id: str) -> bool:
+        """credits a completed stripe checkout once, no matter how many of webhook / confirm / reconcile see it"""
+        CreditLedgerService.ensure_opening_balance(db, user_id)
+        return CreditLedgerService._append(db, user_id, CreditEntryTypeEnum.TOPUP, int(credits), f"stripe:{payment_id}")
+
+    @staticmethod
+    def sync_user_credits(db: DBSession, user_id: Optional[int] = None):
+        """copies the materialized balance into users.credits, for one user or every user on the ledger"""
+        balance = select(CreditBalance.balance).where(CreditBalance.user_id == User.id).scalar_subquery()
+        statement = update(User).where(User.id.in_(select(CreditBalance.user_id))).values(credits=balance)
+        if user_id is not None:
+            statement = statement.where(User.id == user_id)
+        db.execute(statement.execution_options(synchronize_session=False))
+
+    @staticmethod
+    def reconcile():
+        """
+        reconciles the ledger against stripe top ups and the materialized balances.
+            - every COMPLETED payment gets its TOPUP entry (e.g. the webhook failed after marking the payment)
+            - balances that drifted from the sum of the entries are corrected
+            - users.credits is re-synced from the balances
+        """
+        try:
+            with get_db_session() as db:
+                missing_topups = 0
+                completed_payments = db.query(Payments).filter(
+                    func.json_extract(Payments.payment_details, "$.status") == "COMPLETED"
+                ).all()
+                for payment in completed_payments:
+                    payment_details = payment.payment_details or {}
+                    if not payment_details.get("payment_id"):
+                        continue
+                    if CreditLedgerService.record_topup(db, payment.user_id, int(payment_details.get("credits", 0)), payment_details.get("payment_id")):
+                        missing_topups += 1
+
+                ledger_sums = (
+                    select(CreditLedgerEntry.user_id, func.sum(CreditLedgerEntry.credits).label("total"))
+                    .group_by(CreditLedgerEntry.user_id)
+                    .subquery()
+                )
+                drifted = db.execute(
+                    select(ledger_sums.c.user_id, ledger_sums.c.total)
+                    .outerjoin(CreditBalance, CreditBalance.user_id == ledger_sums.c.user_id)
+                    .where(func.coalesce(CreditBalance.balance, 0) != ledger_sums.c.total)
+                ).all()
+                for user_id, total in drifted:
+                    db.execute(
+                        insert(CreditBalance)
+                        .values(user_id=user_id, balance=total, updated_at=StandardDT.get_iso_dt())
+                        .on_conflict_do_update(index_elements=[CreditBalance.user_id], set_={"balance": total})
+                    )
+
+                CreditLedgerService.sync_user_credits(db)
+                db.commit()
+
+            logger.info("[credit_ledger_service | reconcile] :: added %s missing top ups, corrected %s balances", missing_topups, len(drifted))
+            return {"missing_topups": missing_topups, "corrected_balances": len(drifted)}
+        except Exception:
+            logger.exception("[credit_ledger_service | reconcile] :: caught exception")
+            return None
@@ -0,0 +1,100 @@
+import logging
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session as DBSession
+from models.platform_metrics import PlatformMetrics
+from models.user_metrics import UserMetrics
+from utils.datetime_helper import StandardDT
+
+logger = logging.getLogger(__name__)
+
+# dimensions the usage can be grouped by, user needs the per user rollup
+USAGE_GROUP_BY = ["org", "user", "agent", "model", "day", "hour"]
+
+
+class LLMUsageService:
+
+    @staticmethod
+    def _group_column(model_cls, dimension: str):
+        if dimension == "day":
+            return func.date(model_cls.hour_start).label("day")
+        if dimension == "hour":
+            return model_cls.hour_start.label("hour")
+        return {
+            "org": model_cls.org_id,
+            "user": getattr(model_cls, "user_id", None),
+            "agent": model_cls.agent_name,
+            "model": model_cls.model,
+        }[dimension].label(dimension)
+
+    @staticmethod
+    def get_usage(
+        db: DBSession,
+        org_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        agent_name: Optional[str] = None,
+        model: Optional[str] = None,
+        since_hours: int = 24,
+        group_by: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        calls, tokens, cost and latency of the llm requests of the last since_hours, summed over the hourly rollup
+        rows and optionally filtered by organisation, user, agent (base name) and model. grouped by any of
+        USAGE_GROUP_BY, the totals are always returned. usage of the current hour is written on the next flush.
+        """
+        group_by = group_by or []
+        unknown = [dimension for dimension in group_by if dimension not in USAGE_GROUP_BY]
+        if unknown:
+            raise ValueError(f"cannot group llm usage by {unknown}, expected any of {USAGE_GROUP_BY}")
+
+        # per user questions need the per user rollup, everything else is answered by the smaller platform one
+        model_cls = UserMetrics if user_id is not None or "user" in group_by else PlatformMetrics
+        group_columns = [LLMUsageService._group_column(model_cls, dimension) for dimension in group_by]
+        sums = [
+            func.coalesce(func.sum(model_cls.calls), 0).label("calls"),
+            func.coalesce(func.sum(model_cls.prompt_tokens), 0).label("promptTokens"),
+            func.coalesce(func.sum(model_cls.candidates_tokens), 0).label("candidatesTokens"),
+            func.coalesce(func.sum(model_cls.cached_tokens), 0).label("cachedTokens"),
+            func.coalesce(func.sum(model_cls.total_tokens), 0).label("totalTokens"),
+            func.coalesce(func.sum(model_cls.cost_usd), 0.0).label("costUsd"),
+            func.coalesce(func.sum(model_cls.latency_ms_total), 0.0).label("latencyMsTotal"),
+            func.coalesce(func.max(model_cls.latency_ms_max), 0.0).label("latencyMsMax"),
+        ]
+
+        query = db.query(*group_columns, *sums).filter(
+            model_cls.hour_start.isnot(None),
+            model_cls.hour_start >= StandardDT.get_iso_dt().replace(minute=0, second=0, microsecond=0) - timedelta(hours=since_hours),
+        )
+        if org_id is not None:
+            query = query.filter(model_cls.org_id == org_id)
+        if user_id is not None:
+            query = query.filter(model_cls.user_id == user_id)
+        if agent_name:
+            query = query.filter(model_cls.agent_name == agent_name)
+        if model:
+            query = query.filter(model_cls.model == model)
+
+        def _usage(row) -> Dict[str, Any]:
+            calls = int(row.calls)
+            return {
+                "calls": calls,
+                "promptTokens": int(row.promptTokens),
+                "candidatesTokens": int(row.candidatesTokens),
+                "cachedTokens": int(row.cachedTokens),
+                "totalTokens": int(row.totalTokens),
+                "costUsd": round(float(row.costUsd), 6),
+                "latencyMsMean": round(float(row.latencyMsTotal) / calls, 1) if calls else None,
+                "latencyMsMax": round(float(row.latencyMsMax), 1),
+            }
+
+        totals = _usage(query.with_entities(*sums).one())
+        groups = []
+        if group_columns:
+            for row in query.group_by(*group_columns).order_by(*group_columns).all():
+                groups.append({
+                    **{dimension: getattr(row, dimension) for dimension in group_by},
+                    **_usage(row),
+                })
+
+        return {"sinceHours": since_hours, "groupBy": group_by, "totals": totals, "groups": groups}
@@ -9,6 +9,7 @@ from typing import Dict
 from models.base import get_db_session
 from models.parsed_results import ParsedResult
 from models.uploads import Upload
+from utils.candidate_context_cache import candidate_context_cache
 from config import config
 
 nest_asyncio.apply()
@@ -66,9 +67,22 @@ class ParserService:
             
             db.add(new_parsed_result)
             db.commit()   
+        candidate_context_cache.invalidate_media(media_uuid)
                  
         return complete_parsed_result
 
+    @staticmethod
+    def save_structured_result(media_db_id: int, media_uuid: str, structured_result):
+        """
+        caches the structured resume of a parsed media on its parsed result, in a session of its own so the callers
+        do not hold a connection while the resume structuring agent runs
+        """
+        with get_db_session() as db:
+            parsed_results_data = db.query(ParsedResult).filter(ParsedResult.source_id == media_db_id).first()
+            parsed_results_data.structured_result = structured_result
+            db.commit()
+        candidate_context_cache.invalidate_media(media_uuid)
+
     @staticmethod
     async def async_parse_document(media_id: int, media_uuid: str):
         """Immediately return job ID and run parsing in background with correct integer ID"""
@@ -115,6 +129,7 @@ class ParserService:
                     
                     db.add(new_parsed_result)
                     db.commit()
+                candidate_context_cache.invalidate_media(media_uuid)
                     
                 print(f"[Job {job_id}] Parsing complete.")
             except Exception as e:
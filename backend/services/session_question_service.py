@@ -0,0 +1,74 @@
+import logging
+from datetime import timezone
+from typing import Any, Dict, Iterable, List
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session as DBSession
+from models.base import get_db_session
+from models.session_questions import SessionQuestion
+from models.sessions import Session
+from utils.datetime_helper import StandardDT
+
+logger = logging.getLogger(__name__)
+
+
+class SessionQuestionService:
+    """
+    main questions of a live interview are appended to the session_questions table, one insert per question,
+    instead of rewriting the sessions.session_questions json on every question.
+
+    reads keep the old shape of sessions.session_questions :: a list of { "question", "createdAt" } with the latest
+    question first, followed by whatever the column already held (questions saved before the table existed). a column
+    that holds pre generated questions instead of a list is returned as is while the session has no main questions.
+    """
+
+    @staticmethod
+    def add_question(session_id: int, question: str, question_type: str = None, used_resume: bool = False):
+        """appends a main question, the seq is assigned inside the insert so overlapping tool calls can not clash"""
+        next_seq = (
+            select(func.coalesce(func.max(SessionQuestion.seq), 0) + 1)
+            .where(SessionQuestion.session_id == session_id)
+            .scalar_subquery()
+        )
+        with get_db_session() as db:
+            db.execute(insert(SessionQuestion).values(
+                session_id=session_id,
+                seq=next_seq,
+                question=question,
+                question_type=question_type,
+                used_resume=bool(used_resume),
+                created_at=StandardDT.get_iso_dt(),
+            ))
+
+    @staticmethod
+    def _as_legacy_entry(row: SessionQuestion) -> Dict[str, Any]:
+        return {
+            "question": row.question,
+            "createdAt": row.created_at.replace(tzinfo=timezone.utc).isoformat() if row.created_at else None,
+            "type": row.question_type,
+            "usedResume": row.used_resume,
+        }
+
+    @staticmethod
+    def _merge(rows: List[SessionQuestion], stored_questions: Any) -> Any:
+        if not rows:
+            return stored_questions
+        main_questions = [SessionQuestionService._as_legacy_entry(row) for row in sorted(rows, key=lambda row: row.seq, reverse=True)]
+        if isinstance(stored_questions, list):
+            main_questions.extend(stored_questions)
+        return main_questions
+
+    @staticmethod
+    def get_session_questions(db: DBSession, session: Session) -> Any:
+        """the session questions of one session in the sessions.session_questions shape"""
+        rows = db.query(SessionQuestion).filter(SessionQuestion.session_id == session.id).all()
+        return SessionQuestionService._merge(rows, session.session_questions)
+
+    @staticmethod
+    def get_session_questions_for(db: DBSession, sessions: Iterable[Session]) -> Dict[int, Any]:
+        """session id -> session questions for a page of sessions, with a single query on the table"""
+        sessions = list(sessions)
+        rows_by_session = {session.id: [] for session in sessions}
+        if sessions:
+            for row in db.query(SessionQuestion).filter(SessionQuestion.session_id.in_(rows_by_session.keys())).all():
+                rows_by_session[row.session_id].append(row)
+        return {session.id: SessionQuestionService._merge(rows_by_session[session.id], session.session_questions) for session in sessions}
@@ -0,0 +1,98 @@
+import logging
+import math
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session as DBSession
+from models.turn_timings import TurnTiming
+from utils.datetime_helper import StandardDT
+from utils.turn_timing_writer import turn_timing_writer
+
+logger = logging.getLogger(__name__)
+
+TURN_TIMING_PHASES = ["bootstrap_ms", "prompt_ms", "ttft_ms", "tools_ms", "stream_ms", "persist_ms", "total_ms"]
+DEFAULT_HISTOGRAM_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000]
+MAX_REPORT_TURNS = 50000
+
+
+class TurnTimingService:
+
+    @staticmethod
+    def record(turn_timing: Dict[str, Any]):
+        """
+        buffers the latency breakdown of one turn, turn_timing_writer writes it with the next batch. never raises so
+        timing can not affect the call
+        """
+        try:
+            turn_timing_writer.add(turn_timing)
+        except Exception:
+            logger.exception("[turn_timing_service | record] :: could not store turn timing of session = %s", turn_timing.get("session_id"))
+
+    @staticmethod
+    def _percentile(sorted_values: List[float], percentile: float) -> float:
+        """nearest rank percentile of an already sorted list"""
+        rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+        return round(sorted_values[rank - 1], 1)
+
+    @staticmethod
+    def _histogram(sorted_values: List[float], buckets_ms: List[int]) -> List[Dict[str, Any]]:
+        histogram = []
+        lower = 0
+        index = 0
+        for upper in buckets_ms + [None]:
+            count = 0
+            while index < len(sorted_values) and (upper is None or sorted_values[index] < upper):
+                count += 1
+                index += 1
+            histogram.append({"fromMs": lower, "toMs": upper, "count": count})
+            lower = upper
+        return histogram
+
+    @staticmethod
+    def get_latency_report(
+        db: DBSession,
+        endpoint: Optional[str] = None,
+        agent_version: Optional[str] = None,
+        since_hours: int = 24,
+        buckets_ms: Optional[List[int]] = None,
+    ) -> Dict[str, Any]:
+        """
+        percentiles (p50 / p90 / p95 / p99) and histograms of every phase over the turns of the last since_hours,
+        optionally for one endpoint and / or agent version. grouped by endpoint and agent version.
+        """
+        buckets_ms = sorted(buckets_ms or DEFAULT_HISTOGRAM_BUCKETS_MS)
+        query = db.query(TurnTiming).filter(TurnTiming.created_at >= StandardDT.get_iso_dt() - timedelta(hours=since_hours))
+        if endpoint:
+            query = query.filter(TurnTiming.endpoint == endpoint)
+        if agent_version:
+            query = query.filter(TurnTiming.agent_version == agent_version)
+        turn_timings = query.order_by(TurnTiming.created_at.desc()).limit(MAX_REPORT_TURNS).all()
+
+        groups: Dict[tuple, List[TurnTiming]] = {}
+        for turn_timing in turn_timings:
+            groups.setdefault((turn_timing.endpoint, turn_timing.agent_version), []).append(turn_timing)
+
+        report = []
+        for (group_endpoint, group_agent_version), group_turns in groups.items():
+            phases = {}
+            for phase in TURN_TIMING_PHASES:
+                values = sorted(getattr(turn_timing, phase) for turn_timing in group_turns if getattr(turn_timing, phase) is not None)
+                if not values:
+                    continue
+                phases[phase] = {
+                    "count": len(values),
+                    "p50": TurnTimingService._percentile(values, 50),
+                    "p90": TurnTimingService._percentile(values, 90),
+                    "p95": TurnTimingService._percentile(values, 95),
+                    "p99": TurnTimingService._percentile(values, 99),
+                    "max": round(values[-1], 1),
+                    "histogram": TurnTimingService._histogram(values, buckets_ms),
+                }
+            report.append({
+                "endpoint": group_endpoint,
+                "agentVersion": group_agent_version,
+                "turns": len(group_turns),
+                "toolCalls": sum(turn_timing.tool_calls or 0 for turn_timing in group_turns),
+                "phases": phases,
+            })
+
+        return {"sinceHours": since_hours, "groups": report}
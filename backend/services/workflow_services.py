@@ -1,4 +1,5 @@
 from services.agent_services import AgentServices
+from utils.llm_scheduler import LLMPriority
 import logging
 
 
@@ -97,4 +98,107 @@ def ent_analyse_interview_workflow(args: dict):
         return result 
     except Exception:
         logger.exception("[analyse_interview_workflow] :: caught exception")
-        raise 
\ No newline at end of file
+        raise 
+
+# async versions of the workflows for the async routes, the sync ones above stay for the scripts
+
+async def ainterview_preparation_workflow(args: dict):
+    try:
+        logger.info(f"[ainterview_preparation_workflow] :: received input data :: {args}")
+        
+        parsed_resume = args.get("parsed_resume", None)
+        other_context = args.get("other_context", None)
+        
+        structured_resume = None
+        
+        if parsed_resume:
+            resume_structuring_agent_config = {
+                "name" : "resume_structuring_agent",
+                "context" : {
+                    "parsed_resume" : parsed_resume
+                }
+            }
+            
+            structured_resume, _ = await AgentServices.ageneric_agent(resume_structuring_agent_config)
+        
+        question_gen_agent_config = {
+            "name" : "question_gen_agent",
+            "context" : {
+                "candidate_resume" : structured_resume,
+                "candidates_other_contexts" : other_context,
+            }
+        }
+        
+        generated_questions, _ = await AgentServices.ageneric_agent(question_gen_agent_config)
+        
+        return generated_questions
+    
+    except Exception:
+        logger.exception('[ainterview_preparation_workflow] :: caught exception')
+        raise
+    
+    
+async def alive_interview_workflow(args: dict):
+    try:
+        main_question = args.get("mainQuestion")
+        previous_conversation_list = args.get("previousConversationList", [])
+        candidate_reply = args.get("candidateReply")
+        
+        live_interviewer_agent_config = {
+            "name" : "interviewer_agent",
+            "context" : {
+                "interview_main_question" : main_question,
+                "previous_conversation" : previous_conversation_list,
+                "candidate_reply" : candidate_reply
+            }
+        }
+        
+        result, _ = await AgentServices.ageneric_agent(live_interviewer_agent_config)
+        
+        previous_conversation_list.append({
+            "candidate" : candidate_reply,
+            "interviewer" : result
+        })
+                
+        return previous_conversation_list
+    except Exception:
+        logger.exception("[alive_interview_workflow] :: caught exception")
+        raise
+    
+async def aanalyse_interview_workflow(args: dict, user_id: int = None): 
+    try: 
+        
+        interview_analysis_agent_config = {
+            "name" : "interview_analysis_agent",
+            "context" : args,
+            "priority" : LLMPriority.ANALYSIS,
+            "user_id" : user_id,
+        }
+        
+        result, _ = await AgentServices.ageneric_agent(interview_analysis_agent_config) # save this llm metadata in session
+        
+        return result 
+    except Exception:
+        logger.exception("[aanalyse_interview_workflow] :: caught exception")
+        raise 
+    
+def astream_analyse_interview_workflow(args: dict, user_id: int = None):
+    """the analysis of aanalyse_interview_workflow as the events of AgentServices.astream_agent, its fields as they complete"""
+    interview_analysis_agent_config = {
+        "name" : "interview_analysis_agent",
+        "context" : args,
+        "priority" : LLMPriority.ANALYSIS,
+        "user_id" : user_id,
+    }
+    
+    return AgentServices.astream_agent(interview_analysis_agent_config)
+    
+async def aent_analyse_interview_workflow(args: dict): 
+    try: 
+        # args carry the name of the analysis agent of the session and its context
+        result, _ = await AgentServices.ageneric_agent({**args, "priority" : LLMPriority.ANALYSIS}) # save this llm metadata in session
+        
+        return result 
+    except Exception:
+        logger.exception("[aent_analyse_interview_workflow] :: caught exception")
+        raise 
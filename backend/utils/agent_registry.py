@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Type
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from models.agents import Agent
+from models.base import get_db_session
+from models.cache_versions import CacheVersion
+from utils.agent_return_types import AgentTypesEnum
+from config import config
+
+logger = logging.getLogger(__name__)
+
+AGENTS_CACHE_VERSION = "agents"
+
+
+@dataclass(frozen=True)
+class AgentRecord:
+    """an agent as the registry serves it, with its response type looked up once"""
+    id: int
+    uuid: str
+    name: str # full versioned agent name (name~@~version)
+    base_name: str
+    version: str
+    job_id: Optional[str]
+    kind: str
+    org_id: Optional[int]
+    is_active: bool
+    prompt: Any
+    config: Optional[Dict[str, Any]]
+    response_type: Optional[Type[BaseModel]]
+
+    @staticmethod
+    def from_agent(agent: Agent) -> "AgentRecord":
+        response_type = AgentTypesEnum[agent.base_name].value if agent.base_name in AgentTypesEnum.__members__ else None
+        return AgentRecord(
+            id=agent.id,
+            uuid=agent.uuid,
+            name=agent.name,
+            base_name=agent.base_name,
+            version=agent.version,
+            job_id=agent.job_id,
+            kind=agent.kind,
+            org_id=agent.org_id,
+            is_active=bool(agent.is_active),
+            prompt=agent.prompt,
+            config=agent.config,
+            response_type=response_type,
+        )
+
+
+class AgentRegistry:
+    """
+    every agent of the agents table in memory, indexed by uuid and by base name, so running an agent does not
+    query the database. loaded on startup (or on first use) and reloaded whole when the agents version counter in
+    cache_versions changed, which every mutation through AgentManagementServices / AdminService bumps with
+    invalidate(). a worker compares its version with the counter at most every AGENT_REGISTRY_VERSION_CHECK_SECONDS,
+    so an agent changed on another uvicorn worker is picked up within that interval.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._by_uuid: Dict[str, AgentRecord] = {}
+        self._by_base_name: Dict[str, List[AgentRecord]] = {}
+        self._by_org: Dict[Optional[int], List[AgentRecord]] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._stale = True
+
+    @staticmethod
+    def _read_version(db) -> int:
+        version = db.query(CacheVersion.version).filter(CacheVersion.name == AGENTS_CACHE_VERSION).scalar()
+        return version or 0
+
+    def load(self):
+        """reads every agent and swaps the indexes in one go"""
+        with get_db_session() as db:
+            version = self._read_version(db)
+            records = [AgentRecord.from_agent(agent) for agent in db.query(Agent).order_by(Agent.id).all()]
+
+        by_uuid = {record.uuid: record for record in records}
+        by_base_name: Dict[str, List[AgentRecord]] = {}
+        by_org: Dict[Optional[int], List[AgentRecord]] = {}
+        for record in records:
+            by_base_name.setdefault(record.base_name, []).append(record)
+            by_org.setdefault(record.org_id, []).append(record)
+
+        with self._lock:
+            self._by_uuid, self._by_base_name, self._by_org = by_uuid, by_base_name, by_org
+            self._version = version
+            self._checked_at = time.monotonic()
+            self._stale = False
+        logger.info("[agent_registry | load] :: loaded %s agents at version = %s", len(records), version)
+
+    def _ensure_fresh(self):
+        if not self._stale and time.monotonic() - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            stale = self._stale
+        if not stale:
+            with get_db_session() as db:
+                version = self._read_version(db)
+            with self._lock:
+                self._checked_at = time.monotonic()
+                stale = version != self._version
+        if stale:
+            self.load()
+
+    def get_by_uuid(self, agent_uuid: str) -> Optional[AgentRecord]:
+        self._ensure_fresh()
+        return self._by_uuid.get(agent_uuid)
+
+    def get_active(self, name: str, org_id: Optional[int] = None) -> Optional[AgentRecord]:
+        """
+        the active version of the agent with the given base name (of the organisation when given). a name that is
+        not a base name falls back to the first active agent whose versioned name starts with it, as the
+        database lookup this replaces did.
+        """
+        self._ensure_fresh()
+        for record in self._by_base_name.get(name, ()):
+            if record.is_active and (org_id is None or record.org_id == org_id):
+                return record
+
+        for record in self._by_uuid.values():
+            if record.is_active and record.name.startswith(name) and (org_id is None or record.org_id == org_id):
+                return record
+        return None
+
+    def get_versions(self, name: str) -> List[AgentRecord]:
+        """every version of the agent with the given base name, oldest first"""
+        self._ensure_fresh()
+        return list(self._by_base_name.get(name, ()))
+
+    def get_by_org(self, org_id: Optional[int]) -> List[AgentRecord]:
+        self._ensure_fresh()
+        return list(self._by_org.get(org_id, ()))
+
+    def invalidate(self):
+        """
+        bumps the agents version counter so every worker reloads, call it after committing a change to the agents.
+        this worker reloads on its next lookup.
+        """
+        with self._lock:
+            self._stale = True
+        try:
+            with get_db_session() as db:
+                updated = db.query(CacheVersion).filter(CacheVersion.name == AGENTS_CACHE_VERSION).update(
+                    {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+                )
+                if not updated:
+                    db.add(CacheVersion(name=AGENTS_CACHE_VERSION, version=1))
+                db.commit()
+        except IntegrityError:
+            # another worker created the counter row first, bump that one
+            with get_db_session() as db:
+                db.query(CacheVersion).filter(CacheVersion.name == AGENTS_CACHE_VERSION).update(
+                    {CacheVersion.version: CacheVersion.version + 1}, synchronize_session=False
+                )
+                db.commit()
+        except Exception:
+            logger.exception("[agent_registry | invalidate] :: could not bump the agents version, other workers keep their agents until the next change")
+
+
+agent_registry = AgentRegistry(check_interval=config.AGENT_REGISTRY_VERSION_CHECK_SECONDS)
@@ -0,0 +1,162 @@
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Optional, Tuple
+import orjson
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models.base import get_db_session
+from models.agent_result_cache import AgentResultCacheEntry
+from utils.datetime_helper import StandardDT
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# per agent settings in agent.config (the llmConfig of create_agent) ::
+# "result_cache" : { "enabled" : false } or { "enabled" : true, "ttl_seconds" : 86400 }
+# agents without it follow AGENT_RESULT_CACHE_ENABLED
+
+
+def _canonical_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+def _canonical_hash(value: Any) -> str:
+    """sha256 of the value serialized with sorted keys, so equal contexts hash the same whatever their key order"""
+    serialized = orjson.dumps(value, default=_canonical_default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.sha256(serialized).hexdigest()
+
+
+class AgentResultCache:
+    """
+    stored generic_agent results in sqlite, so an agent run on a context it already saw (the same parsed resume
+    structured again, a recurring question gen context) is answered from the database instead of the llm.
+
+    entries are keyed by the agent uuid (one per agent version), a hash of the prompt and model and a hash of the
+    canonical context, expire after their ttl and are evicted least recently used first once the table is over
+    AGENT_RESULT_CACHE_MAX_ENTRIES or AGENT_RESULT_CACHE_MAX_BYTES. a failing cache read or write is logged and
+    the agent runs as if there was no cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    @staticmethod
+    def settings(agent_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """{ enabled, ttl_seconds } of the agent, the config defaults for what the agent does not set"""
+        result_cache = (agent_config or {}).get("result_cache") or {}
+        return {
+            "enabled": bool(result_cache.get("enabled", config.AGENT_RESULT_CACHE_ENABLED)),
+            "ttl_seconds": int(result_cache.get("ttl_seconds", config.AGENT_RESULT_CACHE_TTL_SECONDS)),
+        }
+
+    @staticmethod
+    def build_key(agent_uuid: str, prompt: Any, model: str, context: Any) -> str:
+        prompt_hash = _canonical_hash({"prompt": prompt, "model": model})
+        return hashlib.sha256(f"{agent_uuid}:{prompt_hash}:{_canonical_hash(context)}".encode()).hexdigest()
+
+    def get(self, cache_key: str) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """(result, llm metadata) stored under the key, None on a miss or an expired entry"""
+        try:
+            now = StandardDT.get_iso_dt()
+            with get_db_session() as db:
+                entry = (
+                    db.query(AgentResultCacheEntry)
+                    .filter(AgentResultCacheEntry.cache_key == cache_key, AgentResultCacheEntry.expires_at > now)
+                    .first()
+                )
+                if not entry:
+                    self._count("misses")
+                    return None
+                entry.hits += 1
+                entry.last_accessed_at = now
+                result, llm_metadata = entry.result, dict(entry.llm_metadata or {})
+                db.commit()
+            self._count("hits")
+            return result, llm_metadata
+        except Exception:
+            self._count("errors")
+            logger.exception("[agent_result_cache | get] :: could not read cached agent result, running the agent")
+            return None
+
+    def put(self, cache_key: str, agent_uuid: str, agent_name: str, result: Any, llm_metadata: Dict[str, Any], ttl_seconds: int):
+        """stores the result under the key, replacing an expired entry, then evicts down to the size caps"""
+        try:
+            now = StandardDT.get_iso_dt()
+            size_bytes = len(orjson.dumps(result, default=_canonical_default))
+            if size_bytes > config.AGENT_RESULT_CACHE_MAX_BYTES:
+                logger.info("[agent_result_cache | put] :: result of agent = %s is larger than the cache, not stored", agent_name)
+                return
+            with get_db_session() as db:
+                entry = db.query(AgentResultCacheEntry).filter(AgentResultCacheEntry.cache_key == cache_key).first()
+                if not entry:
+                    entry = AgentResultCacheEntry(cache_key=cache_key)
+                    db.add(entry)
+                entry.agent_uuid = agent_uuid
+                entry.agent_name = agent_name
+                entry.result = result
+                entry.llm_metadata = llm_metadata
+                entry.size_bytes = size_bytes
+                entry.hits = 0
+                entry.created_at = now
+                entry.last_accessed_at = now
+                entry.expires_at = now + timedelta(seconds=ttl_seconds)
+                db.flush()
+                evicted = self._evict(db, now)
+                db.commit()
+            self._count("stores")
+            self._count("evictions", evicted)
+        except IntegrityError:
+            # a concurrent call of the same agent on the same context stored it first
+            logger.info("[agent_result_cache | put] :: result of agent = %s already stored", agent_name)
+        except Exception:
+            self._count("errors")
+            logger.exception("[agent_result_cache | put] :: could not store agent result of agent = %s", agent_name)
+
+    @staticmethod
+    def _evict(db, now) -> int:
+        """drops the expired entries, then the least recently used ones until both caps hold"""
+        evicted = db.query(AgentResultCacheEntry).filter(AgentResultCacheEntry.expires_at <= now).delete(synchronize_session=False)
+        entries, total_bytes = db.query(func.count(AgentResultCacheEntry.id), func.coalesce(func.sum(AgentResultCacheEntry.size_bytes), 0)).one()
+        if entries <= config.AGENT_RESULT_CACHE_MAX_ENTRIES and total_bytes <= config.AGENT_RESULT_CACHE_MAX_BYTES:
+            return evicted
+
+        lru_ids = []
+        for entry_id, size_bytes in db.query(AgentResultCacheEntry.id, AgentResultCacheEntry.size_bytes).order_by(AgentResultCacheEntry.last_accessed_at):
+            if entries <= config.AGENT_RESULT_CACHE_MAX_ENTRIES and total_bytes <= config.AGENT_RESULT_CACHE_MAX_BYTES:
+                break
+            lru_ids.append(entry_id)
+            entries -= 1
+            total_bytes -= size_bytes
+        db.query(AgentResultCacheEntry).filter(AgentResultCacheEntry.id.in_(lru_ids)).delete(synchronize_session=False)
+        return evicted + len(lru_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """hit / miss counters of this process and the size of the stored results"""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters["hits"] + counters["misses"]
+        with get_db_session() as db:
+            entries, total_bytes = db.query(func.count(AgentResultCacheEntry.id), func.coalesce(func.sum(AgentResultCacheEntry.size_bytes), 0)).one()
+        return {
+            **counters,
+            "hitRate": round(counters["hits"] / lookups, 4) if lookups else None,
+            "entries": entries,
+            "sizeBytes": int(total_bytes),
+            "maxEntries": config.AGENT_RESULT_CACHE_MAX_ENTRIES,
+            "maxBytes": config.AGENT_RESULT_CACHE_MAX_BYTES,
+        }
+
+
+agent_result_cache = AgentResultCache()
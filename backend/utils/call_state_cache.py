@@ -0,0 +1,137 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+from cachetools import TTLCache
+from models.base import get_db_session
+from models.sessions import Session, SessionStatusEnum
+from services.credit_ledger_service import CreditLedgerService
+from services.session_question_service import SessionQuestionService
+from utils.agent_registry import agent_registry
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class CallStateCache:
+    """
+    in-memory per call state for live interview turns, keyed by the vapi call id.
+
+    an entry holds everything a chat completions turn needs before the gemini request goes out
+    (session and user ids, session status, credit counters, agent prompt and the built system instruction)
+    so only the first turn of a call touches the database. entries are evicted lru once the cache is full
+    and expire after the ttl, which is refreshed on every turn through put().
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, call_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._cache.get(call_id)
+
+    def put(self, call_id: str, call_state: Dict[str, Any]):
+        with self._lock:
+            self._cache[call_id] = call_state
+
+    def invalidate(self, call_id: str):
+        with self._lock:
+            self._cache.pop(call_id, None)
+
+    def invalidate_session(self, session_uuid: str):
+        """drops every cached call of the given session, used when a session ends, is terminated or relinked"""
+        with self._lock:
+            for call_id in [cid for cid, state in self._cache.items() if state.get("session_uuid") == session_uuid]:
+                self._cache.pop(call_id, None)
+
+    def invalidate_user(self, user_id: int):
+        """drops every cached call of the given user, used when the users credits change outside of a call"""
+        with self._lock:
+            for call_id in [cid for cid, state in self._cache.items() if state.get("user_id") == user_id]:
+                self._cache.pop(call_id, None)
+
+
+call_state_cache = CallStateCache(maxsize=config.CALL_STATE_CACHE_MAX_CALLS, ttl=config.CALL_STATE_CACHE_TTL_SECONDS)
+
+
+def load_call_state(call_id: str = None, session_uuid: str = None, agent_name: str = None) -> Optional[Dict[str, Any]]:
+    """
+    loads the call state of a session from the database, by vapi call id or by session uuid.
+
+    Args:
+        call_id: vapi call id linked to the session
+        session_uuid: session uuid, used when the call is linked and the call id might not be committed yet
+        agent_name: base name of the interview agent, defaults to the agent recorded in the session metadata
+
+    Returns:
+        the call state dict or None if no session was found
+    """
+    with get_db_session() as db:
+        query = db.query(Session)
+        session_data = query.filter(Session.uuid == session_uuid).first() if session_uuid else query.filter(Session.call_id == str(call_id)).first()
+
+        if not session_data:
+            return None
+
+        # the ledger balance, the call keeps it in memory and only debits the ledger from here on
+        user_credits = CreditLedgerService.get_balance(db, session_data.user_id) if session_data.user_id else None
+        db.commit()
+
+        if not agent_name:
+            agent_name = session_data.session_metadata.get("interview_agent", "ent_interview_agent") if session_data.session_metadata else str("ent_interview_agent")
+
+        interview_agent = agent_registry.get_active(agent_name)
+
+        return {
+            "call_id": call_id or session_data.call_id,
+            "session_id": session_data.id,
+            "session_uuid": session_data.uuid,
+            "user_id": session_data.user_id,
+            "status": session_data.status,
+            "used_credits": session_data.used_credits if session_data.used_credits else int(0),
+            "user_credits": user_credits,
+            "contexts": session_data.contexts if session_data.contexts else {},
+            "session_questions": SessionQuestionService.get_session_questions(db, session_data),
+            "agent_name": agent_name,
+            "agent_version": interview_agent.name if interview_agent else None,
+            "agent_prompt": interview_agent.prompt if interview_agent else None,
+            "agent_config": interview_agent.config if interview_agent else None,
+            "org_id": interview_agent.org_id if interview_agent else None, # fair share of the llm scheduler
+            "system_instruction": None, # built once by the chat completions handler on its first turn
+            "last_main_question_turn": None, # turn in which the interviewer last called main_question_setter
+        }
+
+
+def persist_call_credits(session_id: int, call_id: str, user_id: int, used_credits: int, credits_delta: int, status: str):
+    """
+    writes the credits used by a turn back to the database, the session counters and one ledger debit.
+    the debit is keyed by the session, call and minute mark so a retried turn is not counted twice, and users.credits
+    is not touched on the turn (see CreditLedgerService).
+    """
+    try:
+        with get_db_session() as db:
+            db.query(Session).filter(Session.id == session_id).update(
+                {Session.used_credits: used_credits, Session.status: status},
+                synchronize_session=False
+            )
+            CreditLedgerService.record_usage(db, user_id, session_id, call_id, used_credits, credits_delta)
+            db.commit()
+    except Exception:
+        logger.exception("[call_state_cache | persist_call_credits] :: failed to persist credits for session = %s", session_id)
+
+
+def terminate_call(call_state: Dict[str, Any], used_credits: int):
+    """marks the session of the call as terminated with the user credits emptied and drops the cached call"""
+    with get_db_session() as db:
+        db.query(Session).filter(Session.id == call_state["session_id"]).update(
+            {Session.status: SessionStatusEnum.TERMINATED.value, Session.used_credits: used_credits},
+            synchronize_session=False
+        )
+        CreditLedgerService.record_usage(
+            db, call_state["user_id"], call_state["session_id"], call_state["call_id"], used_credits, used_credits - call_state["used_credits"]
+        )
+        CreditLedgerService.write_off(db, call_state["user_id"], call_state["session_id"])
+        CreditLedgerService.sync_user_credits(db, call_state["user_id"])
+        db.commit()
+
+    call_state_cache.invalidate_session(call_state["session_uuid"])
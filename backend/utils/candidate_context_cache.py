@@ -0,0 +1,89 @@
+import json
+import logging
+import threading
+from typing import Any, Dict
+from cachetools import TTLCache
+from models.base import get_db_session
+from models.parsed_results import ParsedResult
+from models.sessions import Session
+from models.uploads import Upload
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def build_candidate_context(session_id: int) -> Dict[str, Any]:
+    """
+    materializes the candidate context of a session :: the session contexts (job details, pre screening answers ...)
+    with the structured resume of the selected resume under "candidate_resume_data". raises on db errors.
+    """
+    with get_db_session() as db:
+        this_session_data = db.query(Session).filter(Session.id == session_id).first()
+        session_context = this_session_data.contexts
+        context_dict = {}
+        if isinstance(session_context, dict):
+            context_dict = dict(session_context)
+        elif session_context:
+            try:
+                context_dict = json.loads(session_context)
+            except Exception:
+                logger.warning("[candidate_context_cache | build_candidate_context] :: could not parse session contexts")
+        resume_media_uuid = context_dict.get('selected_resume_media_uuid', None)
+        if not resume_media_uuid:
+            return context_dict
+
+        # one query through the upload instead of resolving the media id in a second db session
+        parsed_result_data = (
+            db.query(ParsedResult)
+            .join(Upload, Upload.id == ParsedResult.source_id)
+            .filter(Upload.uuid == resume_media_uuid)
+            .first()
+        )
+        context_dict["candidate_resume_data"] = parsed_result_data.structured_result if parsed_result_data else None
+        return context_dict
+
+
+class CandidateContextCache:
+    """
+    memoized candidate context per session id, shared by the retrieve_context tool, the prefetched interview
+    instruction and the analysis endpoints so a session assembles it from the database once.
+
+    entries are dropped when the session changes (relink, delete) or when the parsed result of the resume they
+    were built from changes, and expire after the ttl otherwise. a build that raced with an invalidation is not
+    stored, so a stale context can not outlive the change that invalidated it.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._invalidations = 0
+
+    def get(self, session_id: int) -> Dict[str, Any]:
+        """returns the candidate context of the session, built on a miss. the returned dict is the callers own copy"""
+        session_id = int(session_id)
+        with self._lock:
+            candidate_context = self._cache.get(session_id)
+            invalidations = self._invalidations
+        if candidate_context is None:
+            candidate_context = build_candidate_context(session_id)
+            with self._lock:
+                if invalidations == self._invalidations:
+                    self._cache[session_id] = candidate_context
+        return dict(candidate_context)
+
+    def invalidate_session(self, session_id: int):
+        with self._lock:
+            self._invalidations += 1
+            self._cache.pop(int(session_id), None)
+
+    def invalidate_media(self, media_uuid: str):
+        """drops every session built from the given resume, used when its parsed / structured result changes"""
+        with self._lock:
+            self._invalidations += 1
+            for session_id in [sid for sid, context in self._cache.items() if context.get("selected_resume_media_uuid") == media_uuid]:
+                self._cache.pop(session_id, None)
+
+
+candidate_context_cache = CandidateContextCache(
+    maxsize=config.CANDIDATE_CONTEXT_CACHE_MAX_SESSIONS, ttl=config.CANDIDATE_CONTEXT_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from sqlalchemy.exc import OperationalError
+from models.base import get_db_session
+from models.session_exchanges import SessionExchange
+from utils.datetime_helper import StandardDT
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# waits between the flushes of flush_session while exchanges of the session are still buffered (e.g. sqlite locked)
+SESSION_FLUSH_RETRY_DELAYS = (0.2, 0.5, 1.0)
+
+
+class ExchangeWriter:
+    """
+    write-behind buffer for session exchanges of live interview turns.
+
+    turns only append to an in-memory buffer, a background thread writes the buffered rows in one
+    commit once the batch size is reached or the flush interval passes. anything that reads exchanges
+    (analysis, exchange listing) or deletes them has to call flush() first so it sees every turn, what needs
+    the complete interview (analysis) calls flush_session() and checks nothing of the session is left unwritten.
+    the buffer is per process, the backend runs as a single uvicorn worker.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_attempts: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._pending: List[Dict[str, Any]] = []
+        # exchanges dropped after max_attempts per session id, their interview can not be complete anymore
+        self._dropped: Dict[int, int] = {}
+        self._pending_lock = threading.Lock()
+        # serialises flushes so a flush() call returns only after rows taken by an in flight flush are committed
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread = None
+
+    def add(self, user_id: int, session_id: int, data: Dict[str, Any], exchange_metadata: Any = None):
+        """buffers one exchange, created_at is taken now so exchange order does not depend on flush time"""
+        with self._pending_lock:
+            self._pending.append({
+                "user_id": user_id,
+                "session_id": session_id,
+                "data": data,
+                "exchange_metadata": exchange_metadata,
+                "created_at": StandardDT.get_iso_dt(),
+            })
+            batch_full = len(self._pending) >= self.batch_size
+
+        self._ensure_started()
+        if batch_full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        writes every buffered exchange in a single commit, returns the number of rows written. when the batch
+        fails the rows are written one by one so a row that cannot be written does not hold back the others, it
+        is kept for the next flushes and dropped after max_attempts. when the database itself is unreachable
+        every row is kept for the next flush.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+
+            if not rows:
+                return 0
+
+            try:
+                self._write(rows)
+                logger.info("[exchange_writer | flush] :: wrote %s session exchanges", len(rows))
+                return len(rows)
+            except Exception:
+                logger.exception("[exchange_writer | flush] :: failed to write a batch of %s session exchanges, writing them one by one", len(rows))
+
+            written, retry = 0, []
+            for position, row in enumerate(rows):
+                try:
+                    self._write([row])
+                    written += 1
+                except OperationalError:
+                    # the database is unreachable, no point in trying the rest now
+                    logger.exception("[exchange_writer | flush] :: database unavailable, keeping %s session exchanges for the next flush", len(rows) - position)
+                    retry.extend(rows[position:])
+                    break
+                except Exception:
+                    row["_attempts"] = row.get("_attempts", 0) + 1
+                    if row["_attempts"] >= self.max_attempts:
+                        with self._pending_lock:
+                            self._dropped[row["session_id"]] = self._dropped.get(row["session_id"], 0) + 1
+                        logger.exception(
+                            "[exchange_writer | flush] :: dropping a session exchange of session_id = %s after %s failed writes",
+                            row["session_id"], row["_attempts"],
+                        )
+                    else:
+                        logger.exception("[exchange_writer | flush] :: failed to write a session exchange of session_id = %s", row["session_id"])
+                        retry.append(row)
+
+            if retry:
+                # back in front so they are retried with the next flush, in order
+                with self._pending_lock:
+                    self._pending = retry + self._pending
+            logger.info("[exchange_writer | flush] :: wrote %s session exchanges, %s kept for retry", written, len(retry))
+            return written
+
+    @staticmethod
+    def _write(rows: List[Dict[str, Any]]):
+        with get_db_session() as db:
+            db.add_all([SessionExchange(**{key: value for key, value in row.items() if key != "_attempts"}) for row in rows])
+            db.commit()
+
+    def flush_session(self, session_id: int) -> Tuple[int, int]:
+        """
+        flushes until no exchange of the session is buffered anymore, retrying a few times when some could not be
+        written yet (a locked database). returns (pending, dropped), the exchanges of the session still buffered
+        and the ones dropped after max_attempts, the interview in the database is complete only when both are 0.
+        """
+        for delay in (*SESSION_FLUSH_RETRY_DELAYS, None):
+            self.flush()
+            with self._pending_lock:
+                pending = sum(1 for row in self._pending if row["session_id"] == session_id)
+                dropped = self._dropped.get(session_id, 0)
+            if not pending or delay is None:
+                return pending, dropped
+            time.sleep(delay)
+
+    def discard_session(self, session_id: int) -> int:
+        """drops the buffered exchanges of a session whose conversation is being reset"""
+        with self._flush_lock, self._pending_lock:
+            kept = [row for row in self._pending if row["session_id"] != session_id]
+            discarded = len(self._pending) - len(kept)
+            self._pending = kept
+            self._dropped.pop(session_id, None)
+        return discarded
+
+    def stop(self):
+        """stops the background flusher and writes what is left in the buffer"""
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._pending_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped.clear()
+                    self._thread = threading.Thread(target=self._run, name="exchange-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("[exchange_writer | _run] :: flush failed, the rows stay buffered for the next round")
+
+
+exchange_writer = ExchangeWriter(
+    batch_size=config.EXCHANGE_WRITER_BATCH_SIZE,
+    flush_interval=config.EXCHANGE_WRITER_FLUSH_INTERVAL_SECONDS,
+    max_attempts=config.EXCHANGE_WRITER_MAX_ATTEMPTS,
+)
@@ -0,0 +1,319 @@
+import asyncio
+import inspect
+import json
+import logging
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from google.genai import types
+from utils.llm_providers import LLMProvider
+from config import config
+
+logger = logging.getLogger(__name__)
+
+FAKE_MODEL_VERSION = "fake-llm"
+FAKE_REPLY = (
+    "Thanks for walking me through that. What was the hardest trade off you had to make there, "
+    "and how did you explain it to the people who disagreed with you?"
+)
+FAKE_MAIN_QUESTION = (
+    "Let us move on. Could you tell me about a time you had to prioritise between two competing "
+    "stakeholder requests, and how you decided what to ship first?"
+)
+# the fake interviewer sets a new main question on the first candidate turn and then every few turns
+MAIN_QUESTION_EVERY_TURNS = 3
+# an instruction that already carries the candidate context (see prefetch_candidate_context) needs no retrieve_context
+PREFETCHED_CONTEXT_MARKER = "already retrieved"
+SESSION_ID_PATTERN = re.compile(r"session_id is:?\s*(\d+)")
+WORDS_PER_CHUNK = 4
+MAX_FUNCTION_CALL_ROUNDS = 10
+
+
+def sample_from_schema(schema: Dict[str, Any], root: Dict[str, Any] = None, name: str = "value") -> Any:
+    """a deterministic value valid against a pydantic json schema (objects, arrays, enums, refs, bounds)"""
+    root = root or schema
+    if "$ref" in schema:
+        definition = root
+        for key in schema["$ref"].lstrip("#/").split("/"):
+            definition = definition[key]
+        return sample_from_schema(definition, root, name)
+    for combinator in ("anyOf", "oneOf", "allOf"):
+        if combinator in schema:
+            options = [option for option in schema[combinator] if option.get("type") != "null"] or schema[combinator]
+            return sample_from_schema(options[0], root, name)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+
+    schema_type = schema.get("type")
+    if isinstance(schema_type, list):
+        schema_type = next((option for option in schema_type if option != "null"), "null")
+    if schema_type == "object" or "properties" in schema:
+        return {prop: sample_from_schema(prop_schema, root, prop) for prop, prop_schema in schema.get("properties", {}).items()}
+    if schema_type == "array":
+        items = max(schema.get("minItems", 0), 2)
+        if "maxItems" in schema:
+            items = min(items, schema["maxItems"])
+        return [sample_from_schema(schema.get("items", {}), root, name) for _ in range(items)]
+    if schema_type in ("integer", "number"):
+        value = 5
+        if "minimum" in schema:
+            value = max(value, schema["minimum"])
+        if "exclusiveMinimum" in schema:
+            value = max(value, schema["exclusiveMinimum"] + 1)
+        if "maximum" in schema:
+            value = min(value, schema["maximum"])
+        if "exclusiveMaximum" in schema:
+            value = min(value, schema["exclusiveMaximum"] - 1)
+        return int(value) if schema_type == "integer" else float(value)
+    if schema_type == "boolean":
+        return True
+    if schema_type == "null":
+        return None
+    if schema_type == "string":
+        if schema.get("format") == "date-time":
+            return "2025-01-01T00:00:00Z"
+        if schema.get("format") == "date":
+            return "2025-01-01"
+        value = f"sample {name}"
+        return value.ljust(schema.get("minLength", 0), "x")[:schema.get("maxLength", len(value))]
+    return schema.get("default")
+
+
+def _part_view(part: Any) -> Dict[str, Any]:
+    if isinstance(part, str):
+        return {"text": part}
+    if isinstance(part, dict):
+        function_call = part.get("function_call") or part.get("functionCall")
+        function_response = part.get("function_response") or part.get("functionResponse")
+        return {
+            "text": part.get("text"),
+            "function_call": (function_call.get("name") if isinstance(function_call, dict) else getattr(function_call, "name", None)),
+            "function_response": (function_response.get("name") if isinstance(function_response, dict) else getattr(function_response, "name", None)),
+        }
+    return {
+        "text": getattr(part, "text", None),
+        "function_call": part.function_call.name if getattr(part, "function_call", None) else None,
+        "function_response": part.function_response.name if getattr(part, "function_response", None) else None,
+    }
+
+
+def _as_messages(contents: Any) -> List[Dict[str, Any]]:
+    """role and parts (text, function call name, function response name) of every content of the request"""
+    messages = []
+    for content in contents if isinstance(contents, list) else [contents]:
+        if isinstance(content, str):
+            messages.append({"role": "user", "parts": [{"text": content}]})
+        elif isinstance(content, dict):
+            messages.append({"role": content.get("role", "user"), "parts": [_part_view(part) for part in content.get("parts", [])]})
+        else:
+            messages.append({"role": content.role or "user", "parts": [_part_view(part) for part in content.parts or []]})
+    return messages
+
+
+def _declared_functions(tools: List[Any]) -> List[str]:
+    names = []
+    for tool in tools:
+        if callable(tool):
+            names.append(tool.__name__)
+            continue
+        declarations = tool.get("function_declarations", []) if isinstance(tool, dict) else (getattr(tool, "function_declarations", None) or [])
+        names.extend(declaration["name"] if isinstance(declaration, dict) else declaration.name for declaration in declarations)
+    return names
+
+
+class FakeProvider(LLMProvider):
+    """
+    local, deterministic stand in for gemini, selected with LLM_PROVIDER=fake. no network, so workflow, analysis
+    and chat path benchmarks measure our own overhead, with the model latency set by first_token_delay and
+    tokens_per_sec (one word counted as one token).
+
+    - structured outputs :: a schema valid sample of the response schema (every AgentTypesEnum model)
+    - text :: a fixed interviewer reply, streamed in chunks of a few words
+    - function calling :: behaves like an interviewer told to always use its tools, retrieve_context (unless the
+      instruction already carries the candidate context) and main_question_setter on the first candidate turn and
+      every MAIN_QUESTION_EVERY_TURNS turns after. callable tools are run by the provider under automatic function
+      calling like the sdk does, otherwise the function call is returned to the caller.
+    - cached contents are kept in memory and count as cached tokens in the usage metadata
+    """
+
+    name = "fake"
+
+    def __init__(self, first_token_delay: float = None, tokens_per_sec: float = None):
+        self.first_token_delay = config.FAKE_LLM_FIRST_TOKEN_DELAY_SECONDS if first_token_delay is None else first_token_delay
+        self.tokens_per_sec = config.FAKE_LLM_TOKENS_PER_SEC if tokens_per_sec is None else tokens_per_sec
+        self._caches: Dict[str, Dict[str, Any]] = {}
+
+    def _plan(self, contents: Any, request_config: Dict[str, Any]) -> Dict[str, Any]:
+        """what the fake model does for the request :: the function calls it makes and the text it answers with"""
+        request_config = request_config or {}
+        cached = self._caches.get(request_config.get("cached_content"), {})
+        system_text = f"{request_config.get('system_instruction') or ''}\n{cached.get('system_instruction') or ''}"
+        tools = list(request_config.get("tools") or []) + list(cached.get("tools") or [])
+        callables = {tool.__name__: tool for tool in tools if callable(tool)}
+        declared = _declared_functions(tools)
+        afc_config = request_config.get("automatic_function_calling") or {}
+        automatic_function_calling = bool(callables) and not (afc_config.get("disable") if isinstance(afc_config, dict) else afc_config.disable)
+
+        messages = _as_messages(contents)
+        candidate_turns = [index for index, message in enumerate(messages) if message["role"] == "user" and any(part.get("text") for part in message["parts"])]
+        turn_start = candidate_turns[-1] if candidate_turns else 0
+        called = {part["function_call"] for message in messages[turn_start:] for part in message["parts"] if part.get("function_call")}
+        session_match = SESSION_ID_PATTERN.search(system_text)
+        session_id = int(session_match.group(1)) if session_match else 0
+        has_context = PREFETCHED_CONTEXT_MARKER in system_text
+
+        function_calls = []
+        for _ in range(MAX_FUNCTION_CALL_ROUNDS):
+            if "retrieve_context" in declared and "retrieve_context" not in called and not has_context:
+                function_call = ("retrieve_context", {"session_id": session_id})
+            elif "main_question_setter" in declared and "main_question_setter" not in called and (len(candidate_turns) - 1) % MAIN_QUESTION_EVERY_TURNS == 0:
+                function_call = ("main_question_setter", {
+                    "question": FAKE_MAIN_QUESTION,
+                    "session_id": session_id,
+                    "has_used_resume_context": has_context or "retrieve_context" in called,
+                    "last_main_question_type": "behavioural",
+                })
+            else:
+                break
+            function_calls.append(function_call)
+            called.add(function_call[0])
+            # without automatic function calling the model stops at its first function call and waits for the response
+            if not automatic_function_calling or function_call[0] not in callables:
+                break
+
+        if request_config.get("response_schema"):
+            text = json.dumps(sample_from_schema(request_config["response_schema"]))
+        elif request_config.get("response_mime_type") == "application/json":
+            text = "{}"
+        else:
+            text = FAKE_MAIN_QUESTION if "main_question_setter" in called else FAKE_REPLY
+
+        run_functions = automatic_function_calling and all(name in callables for name, _ in function_calls)
+        return {
+            "function_calls": function_calls,
+            "callables": callables if run_functions else None,
+            "text": text,
+            "prompt_token_count": len(json.dumps(messages) + str(request_config.get("system_instruction") or "")) // 4,
+            "cached_token_count": cached.get("token_count", 0),
+        }
+
+    @staticmethod
+    def _response(parts: List[types.Part], plan: Dict[str, Any], candidates_token_count: int) -> types.GenerateContentResponse:
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts), index=0, finish_reason=types.FinishReason.STOP)],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=plan["prompt_token_count"] + plan["cached_token_count"],
+                cached_content_token_count=plan["cached_token_count"] or None,
+                candidates_token_count=candidates_token_count,
+                total_token_count=plan["prompt_token_count"] + plan["cached_token_count"] + candidates_token_count,
+            ),
+            model_version=FAKE_MODEL_VERSION,
+        )
+
+    def _function_call_response(self, plan: Dict[str, Any]) -> types.GenerateContentResponse:
+        name, args = plan["function_calls"][0]
+        return self._response([types.Part(function_call=types.FunctionCall(name=name, args=args))], plan, 1)
+
+    def _chunks(self, plan: Dict[str, Any]) -> List[Tuple[types.GenerateContentResponse, int]]:
+        """the streamed chunks of the answer with the words each carries"""
+        words = plan["text"].split(" ")
+        chunks = []
+        for start in range(0, len(words), WORDS_PER_CHUNK):
+            piece = words[start:start + WORDS_PER_CHUNK]
+            text = " ".join(piece) + (" " if start + WORDS_PER_CHUNK < len(words) else "")
+            chunks.append((self._response([types.Part(text=text)], plan, start + len(piece)), len(piece)))
+        return chunks
+
+    def _generation_time(self, words: int) -> float:
+        return words / self.tokens_per_sec if self.tokens_per_sec else 0.0
+
+    @staticmethod
+    def _log_tool_error(name: str):
+        logger.exception("[fake_llm_provider | function call] :: function = %s raised, continuing like the sdk would", name)
+
+    def _run_functions(self, plan: Dict[str, Any]):
+        for name, args in plan["function_calls"]:
+            time.sleep(self.first_token_delay)
+            try:
+                plan["callables"][name](**args)
+            except Exception:
+                self._log_tool_error(name)
+
+    async def _arun_functions(self, plan: Dict[str, Any]):
+        for name, args in plan["function_calls"]:
+            await asyncio.sleep(self.first_token_delay)
+            func: Callable = plan["callables"][name]
+            try:
+                if inspect.iscoroutinefunction(func):
+                    await func(**args)
+                else:
+                    await asyncio.to_thread(func, **args)
+            except Exception:
+                self._log_tool_error(name)
+
+    def generate_content(self, model, contents, request_config):
+        plan = self._plan(contents, request_config)
+        if plan["function_calls"] and not plan["callables"]:
+            time.sleep(self.first_token_delay)
+            return self._function_call_response(plan)
+        if plan["function_calls"]:
+            self._run_functions(plan)
+        words = len(plan["text"].split(" "))
+        time.sleep(self.first_token_delay + self._generation_time(words))
+        return self._response([types.Part(text=plan["text"])], plan, words)
+
+    def generate_content_stream(self, model, contents, request_config):
+        plan = self._plan(contents, request_config)
+        if plan["function_calls"] and not plan["callables"]:
+            time.sleep(self.first_token_delay)
+            yield self._function_call_response(plan)
+            return
+        if plan["function_calls"]:
+            self._run_functions(plan)
+        time.sleep(self.first_token_delay)
+        for chunk, words in self._chunks(plan):
+            yield chunk
+            time.sleep(self._generation_time(words))
+
+    async def agenerate_content(self, model, contents, request_config):
+        plan = self._plan(contents, request_config)
+        if plan["function_calls"] and not plan["callables"]:
+            await asyncio.sleep(self.first_token_delay)
+            return self._function_call_response(plan)
+        if plan["function_calls"]:
+            await self._arun_functions(plan)
+        words = len(plan["text"].split(" "))
+        await asyncio.sleep(self.first_token_delay + self._generation_time(words))
+        return self._response([types.Part(text=plan["text"])], plan, words)
+
+    async def agenerate_content_stream(self, model, contents, request_config):
+        plan = self._plan(contents, request_config)
+
+        async def stream():
+            if plan["function_calls"] and not plan["callables"]:
+                await asyncio.sleep(self.first_token_delay)
+                yield self._function_call_response(plan)
+                return
+            if plan["function_calls"]:
+                await self._arun_functions(plan)
+            await asyncio.sleep(self.first_token_delay)
+            for chunk, words in self._chunks(plan):
+                yield chunk
+                await asyncio.sleep(self._generation_time(words))
+
+        return stream()
+
+    async def acreate_cache(self, model, cache_config):
+        name = f"cachedContents/fake-{uuid.uuid4().hex[:12]}"
+        self._caches[name] = {
+            "system_instruction": str(cache_config.get("system_instruction") or ""),
+            "tools": list(cache_config.get("tools") or []),
+            "token_count": len(str(cache_config.get("system_instruction") or "")) // 4,
+        }
+        return name
+
+    async def adelete_cache(self, name):
+        self._caches.pop(name, None)
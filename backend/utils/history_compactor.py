@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from utils.llm_helper import agenerate_with_gemini
+from utils.llm_scheduler import LLMPriority
+
+logger = logging.getLogger(__name__)
+
+# sliding window compaction of the interview history sent to gemini, enabled per agent through agent.config ::
+# "history_compaction" : { "keep_last_exchanges" : 6, "summarize_every_exchanges" : 4, "summary_model" : "gemini-2.0-flash" }
+DEFAULT_KEEP_LAST_EXCHANGES = 6
+DEFAULT_SUMMARIZE_EVERY_EXCHANGES = 4
+DEFAULT_SUMMARY_MODEL = "gemini-2.0-flash"
+
+SUMMARY_INSTRUCTION = """You keep a running summary of an ongoing job interview between an interviewer and a candidate.
+You get the summary so far and the exchanges that happened after it. Return the updated summary only.
+Keep every main question that was asked, the key points, facts, numbers and examples the candidate gave in their answers,
+follow ups that are still open and anything the interviewer said they would come back to.
+Write it as short factual notes in plain text, no more than 300 words."""
+
+_summary_tasks = set()
+
+
+def get_compaction_settings(agent_config: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """reads the history_compaction settings of an agent config, None when compaction is off for the agent"""
+    settings = (agent_config or {}).get("history_compaction")
+    if not settings or not settings.get("enabled", True):
+        return None
+    return {
+        "keep_last_exchanges": max(int(settings.get("keep_last_exchanges", DEFAULT_KEEP_LAST_EXCHANGES)), 1),
+        "summarize_every_exchanges": max(int(settings.get("summarize_every_exchanges", DEFAULT_SUMMARIZE_EVERY_EXCHANGES)), 1),
+        "summary_model": settings.get("summary_model", DEFAULT_SUMMARY_MODEL),
+    }
+
+
+def _window_start(gemini_messages: List[Dict[str, Any]], keep_last_exchanges: int) -> int:
+    """index of the message opening the last keep_last_exchanges exchanges (an exchange starts at a candidate message)"""
+    user_turns = 0
+    for index in range(len(gemini_messages) - 1, -1, -1):
+        if gemini_messages[index]["role"] == "user":
+            user_turns += 1
+            if user_turns == keep_last_exchanges:
+                return index
+    return 0
+
+
+def _as_transcript(gemini_messages: List[Dict[str, Any]]) -> str:
+    speaker = {"user": "candidate", "model": "interviewer"}
+    return "\n".join(
+        f"{speaker.get(message['role'], message['role'])}: {' '.join(part.get('text', '') for part in message['parts'])}"
+        for message in gemini_messages
+    )
+
+
+async def _summarize(call_state: Dict[str, Any], gemini_messages: List[Dict[str, Any]], start: int, end: int, model: str):
+    previous_summary = (call_state.get("history_summary") or {}).get("text") or "(nothing summarized yet)"
+    try:
+        response = await agenerate_with_gemini(
+            prompt=[{"role": "user", "parts": [{"text": f"Summary so far:\n{previous_summary}\n\nNew exchanges:\n{_as_transcript(gemini_messages[start:end])}"}]}],
+            model=model,
+            system_instruction=SUMMARY_INSTRUCTION,
+            # background work, live turns of the call go first
+            priority=LLMPriority.ANALYSIS,
+            org_id=call_state.get("org_id"),
+            user_id=call_state.get("user_id"),
+            agent_name="history_compactor",
+        )
+        if response.text:
+            call_state["history_summary"] = {"text": response.text.strip(), "upto": end}
+            logger.info("[history_compactor | _summarize] :: summarized history of session = %s up to message %s", call_state.get("session_id"), end)
+    except Exception:
+        logger.exception("[history_compactor | _summarize] :: could not summarize history of session = %s, keeping it verbatim", call_state.get("session_id"))
+    finally:
+        call_state["history_summary_pending"] = False
+
+
+def compact_history(call_state: Dict[str, Any], gemini_messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    returns the history to send for this turn. with compaction on for the agent, the exchanges older than the window
+    are replaced by the rolling summary kept in the call state. the summary is extended in the background once
+    summarize_every_exchanges exchanges have left the window, never on the turn itself, and until it is extended
+    the not yet summarized exchanges are sent verbatim so nothing is dropped.
+    """
+    settings = get_compaction_settings(call_state.get("agent_config"))
+    if not settings:
+        return gemini_messages
+
+    summary = call_state.get("history_summary")
+    if not summary or summary["upto"] > len(gemini_messages):
+        # nothing summarized yet, or the history is not the one the summary was built from
+        summary = call_state["history_summary"] = {"text": None, "upto": 0}
+
+    window_start = _window_start(gemini_messages, settings["keep_last_exchanges"])
+    unsummarized_exchanges = sum(1 for message in gemini_messages[summary["upto"]:window_start] if message["role"] == "user")
+
+    if unsummarized_exchanges >= settings["summarize_every_exchanges"] and not call_state.get("history_summary_pending"):
+        call_state["history_summary_pending"] = True
+        task = asyncio.get_running_loop().create_task(
+            _summarize(call_state, list(gemini_messages), summary["upto"], window_start, settings["summary_model"])
+        )
+        _summary_tasks.add(task)
+        task.add_done_callback(_summary_tasks.discard)
+
+    if not summary["text"]:
+        return gemini_messages
+
+    summary_message = {"role": "user", "parts": [{"text": f"(summary of the earlier part of this interview :: {summary['text']})"}]}
+    return [summary_message] + gemini_messages[summary["upto"]:]
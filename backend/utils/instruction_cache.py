@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+import logging
+from typing import Any, Callable, Dict, List, Optional, Union
+from cachetools import TTLCache
+from utils.llm_helper import acreate_cached_content, adelete_cached_content
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class InstructionCache:
+    """
+    tracks the gemini cached contents holding the stable system instruction (and tools) of live interviews.
+
+    one cached content is kept per key (the session uuid for the interview handlers) and model, a cached content
+    only serves requests to the model it was created for so a session routed across model tiers gets one per tier.
+    the first turn of a session schedules the cache creation in the background and goes out uncached, later turns reuse the
+    cache by name. a cache is released when the session completes and otherwise expires on the gemini side
+    after the ttl. keys whose cache could not be created (e.g. instruction under the model's minimum token
+    count) are remembered so the creation is not retried on every turn.
+    """
+
+    def __init__(self, ttl_seconds: int, maxsize: int = 1024, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        # entries are dropped locally a bit before gemini expires the cache so a turn never uses an expired name
+        self._entries = TTLCache(maxsize=maxsize, ttl=max(ttl_seconds - 60, 1))
+        self._tasks = set()
+
+    def get(
+        self,
+        key: str,
+        model: str,
+        system_instruction: str,
+        tools: List[Union[Dict[str, Any], Callable]] = None,
+    ) -> Optional[str]:
+        """
+        returns the cache name to send with the request, or None while the cache is not ready.
+        must be called from the event loop, a missing cache is created in the background.
+        """
+        if not self.enabled or not key:
+            return None
+
+        fingerprint = hashlib.sha256(f"{model}\n{system_instruction}".encode()).hexdigest()
+        entry = self._entries.get((key, model))
+
+        if entry and entry["fingerprint"] == fingerprint:
+            return entry["name"]
+
+        if entry and entry["name"]:
+            # the instruction changed under the same key, the old cache is of no use anymore
+            self._spawn(adelete_cached_content(entry["name"]))
+
+        self._entries[(key, model)] = {"fingerprint": fingerprint, "name": None}
+        self._spawn(self._create(key, fingerprint, model, system_instruction, tools))
+        return None
+
+    async def release(self, key: str):
+        """drops the caches of the key (every model) and deletes them on the gemini side, called when the session completes"""
+        for entry_key in [entry_key for entry_key in list(self._entries.keys()) if entry_key[0] == key]:
+            entry = self._entries.pop(entry_key, None)
+            if entry and entry["name"]:
+                await adelete_cached_content(entry["name"])
+                logger.info("[instruction_cache | release] :: released cached content = %s of key = %s", entry["name"], key)
+
+    async def _create(self, key: str, fingerprint: str, model: str, system_instruction: str, tools):
+        try:
+            name = await acreate_cached_content(
+                model=model,
+                system_instruction=system_instruction,
+                tools=tools,
+                ttl_seconds=self.ttl_seconds,
+                display_name=f"interview-{key}",
+            )
+        except Exception:
+            # entry stays with no name so this key keeps going out uncached without retrying
+            logger.warning("[instruction_cache | _create] :: could not create cached content for key = %s, continuing uncached", key)
+            return
+
+        entry = self._entries.get((key, model))
+        if not entry or entry["fingerprint"] != fingerprint:
+            # released or replaced while the cache was being created
+            await adelete_cached_content(name)
+            return
+
+        entry["name"] = name
+        logger.info("[instruction_cache | _create] :: cached content = %s ready for key = %s", name, key)
+
+    def _spawn(self, coro):
+        # keep a reference so the background task is not garbage collected before it is done
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+instruction_cache = InstructionCache(
+    ttl_seconds=config.GEMINI_CONTEXT_CACHE_TTL_SECONDS,
+    enabled=config.GEMINI_CONTEXT_CACHE_ENABLED,
+)
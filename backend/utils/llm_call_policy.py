@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import httpx
+from google.genai import errors
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# status codes worth another attempt :: timeouts, rate limits and server side failures
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# latencies kept per agent and model for the hedge delay, and how many are needed before hedging
+LATENCY_WINDOW = 200
+
+# per agent overrides in agent.config (the llmConfig of create_agent), every key is optional ::
+# "call_policy" : { "deadline_seconds" : 45, "max_attempts" : 3, "hedge" : true, "hedge_quantile" : 0.95 }
+
+
+class LLMCallError(Exception):
+    """a failed llm call, retryable when another attempt could succeed (rate limits, timeouts, server errors)"""
+
+    def __init__(self, message: str, retryable: bool = False, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+class LLMDeadlineExceeded(LLMCallError):
+    """the deadline of the call ran out before any attempt finished"""
+
+    def __init__(self, message: str):
+        super().__init__(message, retryable=False, status_code=504)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, LLMCallError):
+        return error.retryable
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError, TimeoutError))
+
+
+def as_llm_call_error(error: BaseException, message: str) -> LLMCallError:
+    """wraps an error of a provider call, keeping whether it is retryable and its status code"""
+    if isinstance(error, LLMCallError):
+        return error
+    status_code = error.code if isinstance(error, errors.APIError) else None
+    return LLMCallError(f"{message}: {str(error)}", retryable=is_retryable(error), status_code=status_code)
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """deadline, retries and hedging of one non streaming llm call"""
+
+    deadline_seconds: float
+    max_attempts: int
+    hedge: bool
+    hedge_quantile: float
+    # latencies are tracked per key (agent name and model), the hedge delay is their hedge_quantile
+    latency_key: str = "default"
+
+    @staticmethod
+    def from_agent_config(agent_config: Optional[Dict[str, Any]], latency_key: str) -> "CallPolicy":
+        """the call policy of the agent config, the config defaults otherwise"""
+        overrides = (agent_config or {}).get("call_policy") or {}
+        return CallPolicy(
+            deadline_seconds=float(overrides.get("deadline_seconds", config.LLM_CALL_DEADLINE_SECONDS)),
+            max_attempts=max(1, int(overrides.get("max_attempts", config.LLM_CALL_MAX_ATTEMPTS))),
+            hedge=bool(overrides.get("hedge", config.LLM_HEDGING_ENABLED)),
+            hedge_quantile=float(overrides.get("hedge_quantile", config.LLM_HEDGE_QUANTILE)),
+            latency_key=latency_key,
+        )
+
+
+class LatencyTracker:
+    """rolling window of successful call latencies per key, the source of the hedge delay"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._window = window
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def quantile(self, key: str, quantile: float) -> Optional[float]:
+        """the observed quantile of the key, None until LLM_HEDGE_MIN_SAMPLES calls finished"""
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if len(latencies) < config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(quantile * len(latencies)))]
+
+
+class HedgeBudget:
+    """
+    caps hedged requests to a share of all calls so hedging cannot double the spend when everything is slow.
+    every call earns ratio of a token (up to burst tokens) and a hedge spends a whole one, e.g. a ratio of 0.1
+    allows at most one hedge per ten calls over time.
+    """
+
+    def __init__(self, ratio: float, burst: float):
+        self._ratio = ratio
+        self._burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self._burst, self._tokens + self._ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget(ratio=config.LLM_HEDGE_BUDGET_RATIO, burst=config.LLM_HEDGE_BUDGET_BURST)
+
+
+def _backoff_seconds(attempt: int) -> float:
+    """full jitter exponential backoff before the attempt after the given one (0 based)"""
+    return random.uniform(0, min(config.LLM_RETRY_MAX_DELAY_SECONDS, config.LLM_RETRY_BASE_DELAY_SECONDS * (2 ** attempt)))
+
+
+async def _atimed(key: str, make_call: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.perf_counter()
+    result = await make_call()
+    latency_tracker.record(key, time.perf_counter() - started)
+    return result
+
+
+async def _ahedged_attempt(make_call: Callable[[], Awaitable[Any]], policy: CallPolicy) -> Any:
+    """
+    one attempt, with a second identical request fired when the first one is still running after the observed
+    hedge quantile (and the hedge budget allows it). the first request to succeed wins and the other is cancelled.
+    """
+    hedge_budget.earn()
+    primary = asyncio.ensure_future(_atimed(policy.latency_key, make_call))
+    hedge_delay = latency_tracker.quantile(policy.latency_key, policy.hedge_quantile) if policy.hedge else None
+    if hedge_delay is None:
+        return await primary
+
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+        if done or not hedge_budget.try_spend():
+            return await primary
+
+        logger.info("[llm_call_policy | _ahedged_attempt] :: no response after %.2fs, hedging key = %s", hedge_delay, policy.latency_key)
+        pending.add(asyncio.ensure_future(_atimed(policy.latency_key, make_call)))
+        last_error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def acall_with_policy(make_call: Callable[[], Awaitable[Any]], policy: CallPolicy) -> Any:
+    """
+    runs make_call (a fresh request per call) until it succeeds, with at most policy.max_attempts attempts,
+    jittered backoff between retryable failures and every attempt (and its hedge) bounded by the deadline.
+
+    Raises:
+        LLMDeadlineExceeded: the deadline ran out
+        LLMCallError: the last attempt failed, or the failure is not retryable
+    """
+    deadline = time.monotonic() + policy.deadline_seconds
+    for attempt in range(policy.max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            return await asyncio.wait_for(_ahedged_attempt(make_call, policy), timeout=remaining)
+        except asyncio.TimeoutError:
+            break
+        except Exception as e:
+            if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                raise as_llm_call_error(e, "llm call failed") from e
+            backoff = _backoff_seconds(attempt)
+            logger.warning(
+                "[llm_call_policy | acall_with_policy] :: attempt %s of key = %s failed (%s), retrying in %.2fs",
+                attempt + 1, policy.latency_key, e, backoff,
+            )
+            await asyncio.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+
+    raise LLMDeadlineExceeded(f"llm call of key = {policy.latency_key} exceeded its deadline of {policy.deadline_seconds}s")
+
+
+def call_with_policy(make_call: Callable[[float], Any], policy: CallPolicy) -> Any:
+    """
+    blocking version of acall_with_policy for the sync helpers, without hedging. make_call gets the seconds left
+    until the deadline and has to bound its request with them (the http timeout of the request).
+    """
+    deadline = time.monotonic() + policy.deadline_seconds
+    for attempt in range(policy.max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            started = time.perf_counter()
+            result = make_call(remaining)
+            latency_tracker.record(policy.latency_key, time.perf_counter() - started)
+            return result
+        except Exception as e:
+            if time.monotonic() >= deadline:
+                break
+            if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                raise as_llm_call_error(e, "llm call failed") from e
+            backoff = _backoff_seconds(attempt)
+            logger.warning(
+                "[llm_call_policy | call_with_policy] :: attempt %s of key = %s failed (%s), retrying in %.2fs",
+                attempt + 1, policy.latency_key, e, backoff,
+            )
+            time.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+
+    raise LLMDeadlineExceeded(f"llm call of key = {policy.latency_key} exceeded its deadline of {policy.deadline_seconds}s")
@@ -1,21 +1,298 @@
-from google.genai import Client
+import asyncio
+import functools
+import time
+from google.genai import types
+from google.genai import _extra_utils
 from pydantic import BaseModel
-from typing import Callable, Type, Union, List, Dict, Any
+from typing import AsyncIterator, Callable, Iterator, Type, Union, List, Dict, Any
 import logging
-from config import config
+from utils.llm_providers import LLMProvider, get_llm_provider
+from utils.llm_call_policy import CallPolicy, acall_with_policy, as_llm_call_error, call_with_policy
+from utils.llm_scheduler import LLMPriority, estimate_tokens, llm_scheduler
+from utils.llm_usage_recorder import llm_usage_recorder
+from utils.response_schemas import response_schema_registry
 
 logger = logging.getLogger(__name__)
 
+# same bound as the sdk default for automatic function calling
+MAX_FUNCTION_CALL_ROUNDS = 10
+
+# used when the caller (or the agent config) does not set them
+DEFAULT_MODEL = 'gemini-2.0-flash'
+DEFAULT_TEMPERATURE = 0.5
+
+class _ManagedProvider:
+    """
+    the llm provider of one helper call. every request it sends is admitted by the llm scheduler first (the priority
+    class and organisation of the call) and its usage is metered by the llm usage recorder (agent, user, organisation)
+    once the response, or the last chunk of a stream, is in. the scheduler token bucket is then corrected by it.
+    """
+
+    def __init__(self, provider: LLMProvider, priority: LLMPriority, system_instruction: str = None, org_id: int = None, user_id: int = None, agent_name: str = None):
+        self._provider = provider
+        self._priority = priority
+        self._system_instruction = system_instruction
+        self._org_id = org_id
+        self._user_id = user_id
+        self._agent_name = agent_name
+
+    def _estimate(self, contents: Any) -> int:
+        return estimate_tokens(contents, self._system_instruction)
+
+    def _meter(self, ticket: Any, model: str, usage_metadata: Any, started: float):
+        if usage_metadata is None:
+            return
+        llm_scheduler.reconcile(ticket, getattr(usage_metadata, 'total_token_count', None))
+        llm_usage_recorder.record(
+            model, usage_metadata, (time.perf_counter() - started) * 1000,
+            agent_name=self._agent_name, user_id=self._user_id, org_id=self._org_id,
+        )
+
+    def _metered_stream(self, stream: Iterator[Any], ticket: Any, model: str, started: float) -> Iterator[Any]:
+        usage_metadata = None
+        try:
+            for chunk in stream:
+                usage_metadata = getattr(chunk, 'usage_metadata', None) or usage_metadata
+                yield chunk
+        finally:
+            self._meter(ticket, model, usage_metadata, started)
+
+    async def _ametered_stream(self, stream: AsyncIterator[Any], ticket: Any, model: str, started: float) -> AsyncIterator[Any]:
+        # the usage of a stream is on its chunks, the last one carries the totals
+        usage_metadata = None
+        try:
+            async for chunk in stream:
+                usage_metadata = getattr(chunk, 'usage_metadata', None) or usage_metadata
+                yield chunk
+        finally:
+            self._meter(ticket, model, usage_metadata, started)
+
+    def generate_content(self, model, contents, request_config, timeout_seconds: float = None):
+        # with timeout_seconds (the time left of the call deadline) the admission wait and the request share it
+        admission_started = time.monotonic()
+        ticket = llm_scheduler.acquire_sync(model, self._priority, self._estimate(contents), self._org_id, timeout=timeout_seconds)
+        if timeout_seconds is not None:
+            remaining_seconds = timeout_seconds - (time.monotonic() - admission_started)
+            request_config['http_options'] = {'timeout': max(1, int(remaining_seconds * 1000))}
+        started = time.perf_counter()
+        response = self._provider.generate_content(model=model, contents=contents, request_config=request_config)
+        self._meter(ticket, model, getattr(response, 'usage_metadata', None), started)
+        return response
+
+    def generate_content_stream(self, model, contents, request_config):
+        ticket = llm_scheduler.acquire_sync(model, self._priority, self._estimate(contents), self._org_id)
+        started = time.perf_counter()
+        stream = self._provider.generate_content_stream(model=model, contents=contents, request_config=request_config)
+        return self._metered_stream(stream, ticket, model, started)
+
+    async def agenerate_content(self, model, contents, request_config):
+        ticket = await llm_scheduler.acquire(model, self._priority, self._estimate(contents), self._org_id)
+        started = time.perf_counter()
+        response = await self._provider.agenerate_content(model=model, contents=contents, request_config=request_config)
+        self._meter(ticket, model, getattr(response, 'usage_metadata', None), started)
+        return response
+
+    async def agenerate_content_stream(self, model, contents, request_config):
+        ticket = await llm_scheduler.acquire(model, self._priority, self._estimate(contents), self._org_id)
+        started = time.perf_counter()
+        stream = await self._provider.agenerate_content_stream(model=model, contents=contents, request_config=request_config)
+        return self._ametered_stream(stream, ticket, model, started)
+
+
+def _as_threaded_tool(func: Callable) -> Callable:
+    """
+    wraps a sync tool function into a coroutine function that runs it on a worker thread.
+    the async sdk client invokes sync tools inline on the event loop during automatic function calling,
+    and our tools do blocking db work, so they are pushed off the loop here. functools.wraps keeps the
+    name, docstring and signature intact so the sdk still builds the same function declaration.
+    """
+    if asyncio.iscoroutinefunction(func):
+        return func
+
+    @functools.wraps(func)
+    async def threaded_tool(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return threaded_tool
+
+
+def _build_request_config(
+    response_format: Type[BaseModel] = None,
+    tools: List[Union[Dict[str, Any], Callable]] = None,
+    tool_config: Dict[str, Any] = None,
+    auto_execute_functions: bool = False,
+    available_functions: Dict[str, Callable] = None,
+    system_instruction: str = None,
+    run_tools_in_thread: bool = False,
+    cached_content: str = None,
+    temperature: float = DEFAULT_TEMPERATURE,
+) -> Dict[str, Any]:
+    """builds the generate content config shared by the sync and async gemini helpers"""
+    # Create configuration for request
+    request_config = {
+        'temperature': DEFAULT_TEMPERATURE if temperature is None else temperature,
+    }
+
+    # Add response format if provided
+    if response_format:
+        request_config['response_mime_type'] = 'application/json'
+        request_config['response_schema'] = response_schema_registry.json_schema(response_format)
+
+    # a cached content already carries the system instruction and tools, the api rejects them on the request
+    if cached_content:
+        request_config['cached_content'] = cached_content
+        return request_config
+
+    # Prepare tools based on what was provided
+    prepared_tools = tools
+
+    # If we have callables in tools, convert them to function declarations
+    if tools and any(callable(tool) for tool in tools):
+        # Create automatic function calling config if auto execution is enabled
+        if auto_execute_functions:
+            if not available_functions:
+                # Create available_functions dictionary from callables in tools
+                available_functions = {
+                    func.__name__: func for func in tools if callable(func)
+                }
+
+            # Add automatic function calling config
+            request_config['automatic_function_calling'] = {
+                'disable': False  # Enable automatic function calling
+            }
+
+        # async client runs the tools on the event loop, so keep blocking tools off it
+        if run_tools_in_thread:
+            prepared_tools = [_as_threaded_tool(tool) if callable(tool) else tool for tool in tools]
+
+
+    # Add tool config if provided
+    if tool_config:
+        request_config['tool_config'] = tool_config
+
+    # Add prepared tools to config
+    if prepared_tools:
+        request_config['tools'] = prepared_tools
+
+    if system_instruction:
+        request_config['system_instruction'] = system_instruction
+
+    return request_config
+
+
+async def _acall_functions(parts: List[types.Part], function_map: Dict[str, Callable]) -> List[types.Content]:
+    """
+    runs the function calls of a model turn on a worker thread, the same way the sdk does for automatic
+    function calling, and returns the model turn and the function responses to append to the contents
+    """
+    function_call_parts = [part for part in parts if part.function_call]
+    response_parts = []
+    for part in function_call_parts:
+        func = function_map.get(part.function_call.name)
+        args = _extra_utils.convert_number_values_for_dict_function_call_args(part.function_call.args or {})
+        try:
+            if not func:
+                raise ValueError(f"function {part.function_call.name} is not available")
+            func_response = {'result': await asyncio.to_thread(_extra_utils.invoke_function_from_dict_args, args, func)}
+        except Exception as e:
+            func_response = {'error': str(e)}
+        response_parts.append(types.Part.from_function_response(name=part.function_call.name, response=func_response))
+
+    return [
+        types.Content(role='model', parts=function_call_parts),
+        types.Content(role='user', parts=response_parts),
+    ]
+
+
+async def _astream_with_function_calls(
+    provider: _ManagedProvider,
+    model: str,
+    prompt: Any,
+    request_config: Dict[str, Any],
+    function_map: Dict[str, Callable],
+):
+    """
+    streams a response and runs the function calls it asks for, then streams the follow up response.
+    chunks carrying function calls are not yielded, same as the sdk automatic function calling stream.
+    """
+    contents = list(prompt) if isinstance(prompt, list) else [prompt]
+    for _ in range(MAX_FUNCTION_CALL_ROUNDS):
+        stream = await provider.agenerate_content_stream(model=model, contents=contents, request_config=request_config)
+        function_call_parts = []
+        async for chunk in stream:
+            if chunk.function_calls:
+                function_call_parts.extend(part for part in chunk.candidates[0].content.parts if part.function_call)
+                continue
+            yield chunk
+
+        if not function_call_parts:
+            return
+        contents.extend(await _acall_functions(function_call_parts, function_map))
+
+
+def _parse_response(
+    response: Any,
+    response_format: Type[BaseModel] = None,
+    tools: List[Union[Dict[str, Any], Callable]] = None,
+    auto_execute_functions: bool = False,
+) -> Any:
+    """shapes a non streaming gemini response the same way for the sync and async gemini helpers"""
+    # If auto_execute_functions is False, return function call info or text
+    if not auto_execute_functions:
+        # Check for function calls - supporting both Gemini 1.5 and 2.0 formats
+        if tools:
+            # For Gemini 2.0 compositional function calling (multiple function calls)
+            if hasattr(response, 'function_calls') and response.function_calls:
+                function_calls = []
+                for fc in response.function_calls:
+                    function_calls.append({
+                        'name': fc.name,
+                        'args': fc.args
+                    })
+                if len(function_calls) == 1:
+                    return {'function_call': function_calls[0]}
+                return {'function_calls': function_calls}
+
+            # For single function call (traditional format)
+            elif hasattr(response, 'candidates') and response.candidates:
+                candidate = response.candidates[0]
+                if hasattr(candidate, 'content') and candidate.content:
+                    for part in candidate.content.parts:
+                        if hasattr(part, 'function_call'):
+                            return {
+                                'function_call': {
+                                    'name': part.function_call.name,
+                                    'args': part.function_call.args
+                                }
+                            }
+
+    # with a response format the validated model is set on response.parsed (None when the response does not
+    # match it), the response itself is returned for its usage metadata
+    if response_format:
+        response.parsed = response_schema_registry.parse(response_format, response.text)
+
+    # For auto execution, the SDK should have already executed the functions
+    # Just return the final response
+    return response
+
+
 def generate_with_gemini(
-    prompt: str, 
+    prompt: str,
     response_format: Type[BaseModel] = None,
     tools: List[Union[Dict[str, Any], Callable]] = None,
     tool_config: Dict[str, Any] = None,
     auto_execute_functions: bool = False,
     available_functions: Dict[str, Callable] = None,
-    model: str = 'gemini-2.0-flash',
+    model: str = DEFAULT_MODEL,
     stream: bool = False,  # Stream parameter to control streaming
     system_instruction: str = None,
+    cached_content: str = None,
+    temperature: float = DEFAULT_TEMPERATURE,
+    call_policy: CallPolicy = None,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
+    org_id: int = None,
+    user_id: int = None,
+    agent_name: str = None,
 ) -> Any:
     """
     Generate content using Gemini with optional function calling support.
@@ -30,6 +307,9 @@ def generate_with_gemini(
     - auto_execute_functions: Whether to automatically execute function calls
     - available_functions: Functions available for execution
 
+    The request is served by the llm provider set with LLM_PROVIDER (see utils.llm_providers), gemini by
+    default or the local fake provider for benchmarks and tests.
+
     Args:
         prompt: Input text for the model
         response_format: Expected response format as Pydantic model
@@ -39,114 +319,213 @@ def generate_with_gemini(
         available_functions: Functions available for execution
         model: Gemini model to use
         stream: Whether to return a streaming response iterator
+        system_instruction: System instruction for the model
+        cached_content: Name of a cached content (see acreate_cached_content) holding the system
+            instruction and tools, these are then not sent with the request. Callable tools are
+            still executed when auto_execute_functions is set (async helper only)
+        temperature: Sampling temperature, the agent config (llmConfig) value when the caller has one
+        call_policy: Deadline and retries of a non streaming call (see utils.llm_call_policy), the async helper
+            also hedges it when the policy allows. Without one the call is made once with the client timeout
+        priority: Priority class of the call for the llm scheduler (see utils.llm_scheduler), live turns first
+        org_id: Organisation the call is made for, tenants get a fair share of their priority class
+        user_id: User the call is made for, with org_id and agent_name the dimensions of the usage rollups
+            (see utils.llm_usage_recorder)
+        agent_name: Agent making the call, versioned or base name
 
     Returns:
         - With stream=True: Iterator yielding response chunks
         - With auto_execute_functions=True: Final text after executing functions
         - With auto_execute_functions=False: Function call data or text response
-        - With response_format: Parsed response in specified format
+        - With response_format: The response, with the validated response model (None if invalid) on response.parsed
+
+    Raises:
+        LLMCallError: the call failed, LLMDeadlineExceeded when the deadline of the call policy ran out
     """
     try:
-        client = Client(api_key=config.GEMINI_API_KEY)
-        # Create configuration for request
-        request_config = {
-            'temperature': 0.5, # todo :: agent.config can return this if set by user 
-        }
-        
-        # Add response format if provided
-        if response_format:
-            request_config['response_mime_type'] = 'application/json'
-            request_config['response_schema'] = response_format.model_json_schema()
-        
-        # Prepare tools based on what was provided
-        prepared_tools = tools
-        
-        # If we have callables in tools, convert them to function declarations
-        if tools and any(callable(tool) for tool in tools):
-            # Create automatic function calling config if auto execution is enabled
-            if auto_execute_functions:
-                if not available_functions:
-                    # Create available_functions dictionary from callables in tools
-                    available_functions = {
-                        func.__name__: func for func in tools if callable(func)
-                    }
-                    
-                # Add automatic function calling config
-                request_config['automatic_function_calling'] = {
-                    'disable': False  # Enable automatic function calling
-                }
-                
-        
-        # Add tool config if provided
-        if tool_config:
-            request_config['tool_config'] = tool_config
-            
-        # Add prepared tools to config
-        if prepared_tools:
-            request_config['tools'] = prepared_tools
-        
-        if system_instruction:
-            request_config['system_instruction'] = system_instruction
-        
-        
+        provider = _ManagedProvider(get_llm_provider(), priority, system_instruction, org_id=org_id, user_id=user_id, agent_name=agent_name)
+        build_request_config = functools.partial(
+            _build_request_config,
+            response_format=response_format,
+            tools=tools,
+            tool_config=tool_config,
+            auto_execute_functions=auto_execute_functions,
+            available_functions=available_functions,
+            system_instruction=system_instruction,
+            cached_content=cached_content,
+            temperature=temperature,
+        )
+        request_config = build_request_config()
+
         # Handle streaming responses
         if stream:
             # Return streaming response
-            return client.models.generate_content_stream(
+            return provider.generate_content_stream(
                 model=model,
                 contents=prompt,
-                config=request_config
+                request_config=request_config
             )
+        elif call_policy:
+            def make_call(remaining_seconds: float):
+                # a fresh config per attempt (the sdk rewrites the schema in place), admission and request bounded by the time left
+                return provider.generate_content(model=model, contents=prompt, request_config=build_request_config(), timeout_seconds=remaining_seconds)
+
+            response = call_with_policy(make_call, call_policy)
+            return _parse_response(response, response_format, tools, auto_execute_functions)
         else:
             # Non-streaming mode (original behavior)
-            response = client.models.generate_content(
+            response = provider.generate_content(
+                model=model,
+                contents=prompt,
+                request_config=request_config
+            )
+
+            return _parse_response(response, response_format, tools, auto_execute_functions)
+
+    except Exception as e:
+        raise as_llm_call_error(e, "Error generating content with Gemini") from e
+
+
+async def agenerate_with_gemini(
+    prompt: str,
+    response_format: Type[BaseModel] = None,
+    tools: List[Union[Dict[str, Any], Callable]] = None,
+    tool_config: Dict[str, Any] = None,
+    auto_execute_functions: bool = False,
+    available_functions: Dict[str, Callable] = None,
+    model: str = DEFAULT_MODEL,
+    stream: bool = False,
+    system_instruction: str = None,
+    cached_content: str = None,
+    temperature: float = DEFAULT_TEMPERATURE,
+    call_policy: CallPolicy = None,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
+    org_id: int = None,
+    user_id: int = None,
+    agent_name: str = None,
+) -> Any:
+    """
+    Async counterpart of generate_with_gemini built on the async calls of the llm provider (client.aio for gemini).
+
+    Takes the same arguments and returns the same shapes as generate_with_gemini, but never blocks
+    the event loop while waiting on gemini. Sync tool callables are executed on a worker thread
+    during automatic function calling.
+
+    Returns:
+        - With stream=True: Async iterator yielding response chunks (consume with `async for`)
+        - Otherwise: same as generate_with_gemini
+    """
+    try:
+        provider = _ManagedProvider(get_llm_provider(), priority, system_instruction, org_id=org_id, user_id=user_id, agent_name=agent_name)
+        build_request_config = functools.partial(
+            _build_request_config,
+            response_format=response_format,
+            tools=tools,
+            tool_config=tool_config,
+            auto_execute_functions=auto_execute_functions,
+            available_functions=available_functions,
+            system_instruction=system_instruction,
+            run_tools_in_thread=True,
+            cached_content=cached_content,
+            temperature=temperature,
+        )
+        request_config = build_request_config()
+
+        # the sdk only runs the functions it finds in the request config, with a cached content
+        # the tools live in the cache so the function calls are run here instead
+        function_map = None
+        if cached_content and auto_execute_functions and tools:
+            function_map = available_functions or {func.__name__: func for func in tools if callable(func)}
+
+        if function_map:
+            if stream:
+                return _astream_with_function_calls(provider, model, prompt, request_config, function_map)
+
+            contents = list(prompt) if isinstance(prompt, list) else [prompt]
+            for _ in range(MAX_FUNCTION_CALL_ROUNDS):
+                response = await provider.agenerate_content(model=model, contents=contents, request_config=request_config)
+                if not response.function_calls:
+                    break
+                contents.extend(await _acall_functions(response.candidates[0].content.parts, function_map))
+            return _parse_response(response, response_format, tools, auto_execute_functions)
+
+        if stream:
+            return await provider.agenerate_content_stream(
                 model=model,
                 contents=prompt,
-                config=request_config
+                request_config=request_config
+            )
+
+        if call_policy:
+            # retries and hedges each send a fresh config, the sdk rewrites the schema in place
+            response = await acall_with_policy(
+                lambda: provider.agenerate_content(model=model, contents=prompt, request_config=build_request_config()),
+                call_policy,
             )
-            
-            # If auto_execute_functions is False, return function call info or text
-            if not auto_execute_functions:
-                # Check for function calls - supporting both Gemini 1.5 and 2.0 formats
-                if tools:
-                    # For Gemini 2.0 compositional function calling (multiple function calls)
-                    if hasattr(response, 'function_calls') and response.function_calls:
-                        function_calls = []
-                        for fc in response.function_calls:
-                            function_calls.append({
-                                'name': fc.name,
-                                'args': fc.args
-                            })
-                        if len(function_calls) == 1:
-                            return {'function_call': function_calls[0]}
-                        return {'function_calls': function_calls}
-                    
-                    # For single function call (traditional format)
-                    elif hasattr(response, 'candidates') and response.candidates:
-                        candidate = response.candidates[0]
-                        if hasattr(candidate, 'content') and candidate.content:
-                            for part in candidate.content.parts:
-                                if hasattr(part, 'function_call'):
-                                    return {
-                                        'function_call': {
-                                            'name': part.function_call.name,
-                                            'args': part.function_call.args
-                                        }
-                                    }
-            
-                # Return parsed response if format specified, otherwise return text
-                if response_format:
-                    try:
-                        return response_format.model_validate_json(response)
-                    except Exception as e:
-                        # If parsing fails, return the raw text and log the error
-                        logger.warning("[generate_with_gemini] :: Failed to parse response as %s. Returning raw response.", response_format.__name__)
-                        return response
-                return response
-            else:
-                # For auto execution, the SDK should have already executed the functions
-                # Just return the final text response
-                return response
-            
+            return _parse_response(response, response_format, tools, auto_execute_functions)
+
+        response = await provider.agenerate_content(
+            model=model,
+            contents=prompt,
+            request_config=request_config
+        )
+
+        return _parse_response(response, response_format, tools, auto_execute_functions)
+
     except Exception as e:
-        raise Exception(f"Error generating content with Gemini: {str(e)}")
+        raise as_llm_call_error(e, "Error generating content with Gemini") from e
+
+
+async def acreate_cached_content(
+    model: str,
+    system_instruction: str,
+    tools: List[Union[Dict[str, Any], Callable]] = None,
+    ttl_seconds: int = 3600,
+    display_name: str = None,
+) -> str:
+    """
+    Creates a named gemini cached content holding a system instruction and tools.
+
+    Pass the returned name as cached_content to generate_with_gemini / agenerate_with_gemini with the same model,
+    the cached prefix is then billed at the cached token rate and not re-processed on every request.
+    Gemini rejects caches below the model's minimum token count, the error is raised to the caller.
+
+    Args:
+        model: Gemini model the cache is created for, requests using it must use the same model
+        system_instruction: System instruction to cache
+        tools: Callables (converted to function declarations) or tool declarations to cache
+        ttl_seconds: Time to live of the cache on the gemini side
+        display_name: Readable name shown when listing caches
+
+    Returns:
+        the cache name, e.g. cachedContents/abc123
+    """
+    try:
+        cache_config = {
+            'system_instruction': system_instruction,
+            'ttl': f"{int(ttl_seconds)}s",
+        }
+        if display_name:
+            cache_config['display_name'] = display_name
+
+        if tools:
+            function_declarations = [
+                types.FunctionDeclaration.from_callable_with_api_option(callable=tool, api_option='GEMINI_API')
+                for tool in tools if callable(tool)
+            ]
+            cache_tools = [tool for tool in tools if not callable(tool)]
+            if function_declarations:
+                cache_tools.append(types.Tool(function_declarations=function_declarations))
+            cache_config['tools'] = cache_tools
+
+        return await get_llm_provider().acreate_cache(model=model, cache_config=cache_config)
+
+    except Exception as e:
+        raise Exception(f"Error creating cached content with Gemini: {str(e)}")
+
+
+async def adelete_cached_content(name: str):
+    """Deletes a gemini cached content, a cache that already expired is ignored."""
+    try:
+        await get_llm_provider().adelete_cache(name)
+    except Exception:
+        logger.warning("[llm_helper | adelete_cached_content] :: could not delete cached content = %s", name)
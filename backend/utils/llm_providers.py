@@ -0,0 +1,167 @@
+import asyncio
+from abc import ABC, abstractmethod
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator
+import httpx
+from google.genai import Client, types
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProvider(ABC):
+    """
+    interface of the llm backends behind generate_with_gemini / agenerate_with_gemini and the cached content helpers.
+
+    a provider takes the request config built by the llm helper (temperature, response schema, tools, system
+    instruction or cached content name, automatic function calling) and returns gemini sdk response objects, so
+    the helpers and their callers stay the same whichever provider serves the call. callable tools are executed by
+    the provider when automatic function calling is on, like the sdk does. a provider has to implement every
+    abstract method, one that misses any fails when it is built instead of on its first call.
+    """
+
+    name: str = None
+
+    @abstractmethod
+    def generate_content(self, model: str, contents: Any, request_config: Dict[str, Any]) -> types.GenerateContentResponse:
+        ...
+
+    @abstractmethod
+    def generate_content_stream(self, model: str, contents: Any, request_config: Dict[str, Any]) -> Iterator[types.GenerateContentResponse]:
+        ...
+
+    @abstractmethod
+    async def agenerate_content(self, model: str, contents: Any, request_config: Dict[str, Any]) -> types.GenerateContentResponse:
+        ...
+
+    @abstractmethod
+    async def agenerate_content_stream(self, model: str, contents: Any, request_config: Dict[str, Any]) -> AsyncIterator[types.GenerateContentResponse]:
+        ...
+
+    @abstractmethod
+    async def acreate_cache(self, model: str, cache_config: Dict[str, Any]) -> str:
+        """creates a cached content from a cache config (system instruction, tools, ttl) and returns its name"""
+
+    @abstractmethod
+    async def adelete_cache(self, name: str):
+        ...
+
+    async def awarm_up(self, model: str):
+        """prepares the provider for the first request to the model, called on app startup"""
+
+    async def aclose(self):
+        """releases the resources (connections) of the provider, called on app shutdown"""
+
+
+class GoogleProvider(LLMProvider):
+    """
+    the gemini api through the google genai sdk, with one client per process.
+
+    building a Client costs tens of ms of cpu (ssl context and http client setup) and every new client opens its
+    own connections, so the sync and async calls share a lazily built client whose httpx pools keep connections
+    alive between calls. awarm_up() opens them on startup so the first turn does not pay the tls handshake, aclose()
+    closes them on shutdown.
+    """
+
+    name = "google"
+
+    def __init__(self):
+        self._client: Client = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _http_options() -> types.HttpOptions:
+        limits = httpx.Limits(
+            max_connections=config.GEMINI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.GEMINI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.GEMINI_HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return types.HttpOptions(
+            timeout=int(config.GEMINI_HTTP_TIMEOUT_SECONDS * 1000),
+            client_args={"limits": limits},
+            async_client_args={"limits": limits},
+        )
+
+    def _get_client(self) -> Client:
+        # the sync helpers run on worker threads, the lock keeps them from building a client each
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = Client(api_key=config.GEMINI_API_KEY, http_options=self._http_options())
+        return self._client
+
+    def generate_content(self, model, contents, request_config):
+        return self._get_client().models.generate_content(model=model, contents=contents, config=request_config)
+
+    def generate_content_stream(self, model, contents, request_config):
+        return self._get_client().models.generate_content_stream(model=model, contents=contents, config=request_config)
+
+    async def agenerate_content(self, model, contents, request_config):
+        return await self._get_client().aio.models.generate_content(model=model, contents=contents, config=request_config)
+
+    async def agenerate_content_stream(self, model, contents, request_config):
+        return await self._get_client().aio.models.generate_content_stream(model=model, contents=contents, config=request_config)
+
+    async def acreate_cache(self, model, cache_config):
+        cached_content = await self._get_client().aio.caches.create(model=model, config=cache_config)
+        return cached_content.name
+
+    async def adelete_cache(self, name):
+        await self._get_client().aio.caches.delete(name=name)
+
+    async def awarm_up(self, model: str):
+        """
+        builds the client and opens a connection in the async and sync pools with a models.get of the model,
+        a failed warm up is logged and the connections are then opened by the first calls
+        """
+        client = await asyncio.to_thread(self._get_client)
+        try:
+            await client.aio.models.get(model=model)
+            await asyncio.to_thread(client.models.get, model=model)
+            logger.info("[llm_providers | awarm_up] :: gemini client ready with warm connections")
+        except Exception:
+            logger.warning("[llm_providers | awarm_up] :: could not warm up the gemini connections, continuing cold", exc_info=True)
+
+    async def aclose(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client is None:
+            return
+        # the sdk has no close of its own, its httpx clients are closed directly
+        api_client = client._api_client
+        await api_client._async_httpx_client.aclose()
+        await asyncio.to_thread(api_client._httpx_client.close)
+        logger.info("[llm_providers | aclose] :: closed the gemini client connections")
+
+
+_providers: Dict[str, LLMProvider] = {}
+
+
+def register_llm_provider(provider: LLMProvider):
+    """makes a provider available to get_llm_provider (and LLM_PROVIDER) under its name"""
+    _providers[provider.name] = provider
+
+
+def get_llm_provider(name: str = None) -> LLMProvider:
+    """the provider of the given name, the LLM_PROVIDER of the config by default"""
+    name = (name or config.LLM_PROVIDER).lower()
+    if name not in _providers:
+        if name == GoogleProvider.name:
+            register_llm_provider(GoogleProvider())
+        elif name == "fake":
+            from utils.fake_llm_provider import FakeProvider
+            register_llm_provider(FakeProvider())
+        else:
+            raise ValueError(f"llm provider = {name} is not registered")
+        logger.info("[llm_providers | get_llm_provider] :: using llm provider = %s", name)
+    return _providers[name]
+
+
+async def aclose_llm_providers():
+    """closes every provider in use, called on app shutdown"""
+    for provider in list(_providers.values()):
+        try:
+            await provider.aclose()
+        except Exception:
+            logger.exception("[llm_providers | aclose_llm_providers] :: could not close llm provider = %s", provider.name)
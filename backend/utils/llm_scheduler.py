@@ -0,0 +1,312 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional
+from config import config
+from utils.llm_call_policy import LLMDeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class LLMPriority(IntEnum):
+    """priority classes of the gemini traffic, lower values are served first"""
+    LIVE_TURN = 0 # live interview turns, a candidate is waiting on the call
+    INTERACTIVE = 1 # session setup a user waits on (resume structuring, question generation)
+    ANALYSIS = 2 # interview analysis and background summaries
+    BATCH = 3 # scripts and bulk work
+
+
+# share of the request and token buckets a class has to leave untouched, so a burst of analyses can not drain the
+# quota the next live turn needs. live turns may use the whole bucket
+PRIORITY_RESERVE = {
+    LLMPriority.LIVE_TURN: 0.0,
+    LLMPriority.INTERACTIVE: 0.05,
+    LLMPriority.ANALYSIS: 0.2,
+    LLMPriority.BATCH: 0.35,
+}
+# tenants without an organisation share one fair share slot
+PLATFORM_ORG = "platform"
+# token usage per organisation halves every minute, the least recent user of a class is served first
+ORG_USAGE_HALF_LIFE_SECONDS = 60.0
+WAIT_SAMPLES = 1000
+# longest a waiter sleeps before checking the buckets again, in case a wake up was missed
+MAX_POLL_SECONDS = 1.0
+
+
+def estimate_tokens(prompt: Any, system_instruction: Any = None) -> int:
+    """rough token count of a request (4 characters per token) with the expected response size"""
+    characters = len(prompt if isinstance(prompt, str) else json.dumps(prompt, default=str))
+    if system_instruction:
+        characters += len(str(system_instruction))
+    return characters // 4 + config.LLM_SCHEDULER_OUTPUT_TOKENS_ESTIMATE
+
+
+class TokenBucket:
+    """per minute quota refilled continuously, the level can go below zero when a call used more than estimated"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._rate = per_minute / 60.0
+        self._updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def _needed(self, amount: float, reserve: float) -> float:
+        # a request larger than the share of the class is let through once that whole share is free
+        return min(amount, (1 - reserve) * self.capacity)
+
+    def allows(self, amount: float, reserve: float) -> bool:
+        return self.level - self._needed(amount, reserve) >= reserve * self.capacity
+
+    def seconds_until(self, amount: float, reserve: float) -> float:
+        missing = reserve * self.capacity + self._needed(amount, reserve) - self.level
+        return max(0.0, missing / self._rate)
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        self.level = min(self.capacity, self.level + amount)
+
+
+@dataclass
+class LLMTicket:
+    """admission of one gemini request, handed back to reconcile() with the tokens it really used"""
+    model: str
+    org: str
+    estimated_tokens: int
+
+
+class _Waiter:
+    def __init__(self, priority: LLMPriority, org: str, tokens: int, seq: int):
+        self.priority = priority
+        self.org = org
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.wake: Callable[[], None] = lambda: None
+
+
+class _ModelLane:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waiters: List[_Waiter] = []
+
+
+class LLMScheduler:
+    """
+    admission of every gemini request through per model request (rpm) and token (tpm) buckets.
+
+    waiting requests are served by priority class, and within a class by the organisation that used the fewest
+    tokens lately, so one tenant's bulk work can not starve the others. lower classes also have to leave a reserve
+    of each bucket for the classes above them. a request waits until it is the next one to serve and the buckets
+    allow it, async callers on their event loop and sync callers on their thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._org_usage: Dict[str, List[float]] = {} # org -> [decayed tokens, updated at]
+        self._seq = 0
+        self._waits: Dict[LLMPriority, Deque[float]] = {priority: deque(maxlen=WAIT_SAMPLES) for priority in LLMPriority}
+        self._granted: Dict[LLMPriority, int] = {priority: 0 for priority in LLMPriority}
+        self._limits = json.loads(config.LLM_RATE_LIMITS) if config.LLM_RATE_LIMITS else {}
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            limits = self._limits.get(model, {})
+            lane = self._lanes[model] = _ModelLane(
+                rpm=limits.get("rpm", config.LLM_DEFAULT_RPM),
+                tpm=limits.get("tpm", config.LLM_DEFAULT_TPM),
+            )
+        return lane
+
+    def _org_tokens(self, org: str, now: float) -> float:
+        usage = self._org_usage.get(org)
+        if not usage:
+            return 0.0
+        usage[0] *= 0.5 ** ((now - usage[1]) / ORG_USAGE_HALF_LIFE_SECONDS)
+        usage[1] = now
+        return usage[0]
+
+    def _add_org_tokens(self, org: str, tokens: float, now: float):
+        self._org_usage[org] = [max(0.0, self._org_tokens(org, now) + tokens), now]
+
+    def _next_waiter(self, lane: _ModelLane, now: float) -> _Waiter:
+        return min(lane.waiters, key=lambda waiter: (waiter.priority, self._org_tokens(waiter.org, now), waiter.seq))
+
+    def _try_grant(self, lane: _ModelLane, waiter: _Waiter) -> Optional[float]:
+        """grants the waiter when it is next and the buckets allow it (None), else returns how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            if self._next_waiter(lane, now) is not waiter:
+                return MAX_POLL_SECONDS
+            lane.requests.refill(now)
+            lane.tokens.refill(now)
+            reserve = PRIORITY_RESERVE[waiter.priority]
+            if not (lane.requests.allows(1, reserve) and lane.tokens.allows(waiter.tokens, reserve)):
+                return min(MAX_POLL_SECONDS, max(0.005, lane.requests.seconds_until(1, reserve), lane.tokens.seconds_until(waiter.tokens, reserve)))
+            lane.requests.take(1)
+            lane.tokens.take(waiter.tokens)
+            lane.waiters.remove(waiter)
+            self._add_org_tokens(waiter.org, waiter.tokens, now)
+            self._waits[waiter.priority].append(now - waiter.enqueued_at)
+            self._granted[waiter.priority] += 1
+            others = list(lane.waiters)
+        # the next waiter in line may be able to go now
+        for other in others:
+            other.wake()
+        return None
+
+    def _enqueue(self, model: str, priority: LLMPriority, tokens: int, org_id: Optional[int]):
+        with self._lock:
+            self._seq += 1
+            lane = self._lane(model)
+            waiter = _Waiter(LLMPriority(priority), str(org_id) if org_id is not None else PLATFORM_ORG, tokens, self._seq)
+            lane.waiters.append(waiter)
+        return lane, waiter
+
+    def _leave(self, lane: _ModelLane, waiter: _Waiter):
+        """drops a waiter that gave up (cancelled, deadline) and lets the next one in line check the buckets"""
+        with self._lock:
+            if waiter not in lane.waiters:
+                return
+            lane.waiters.remove(waiter)
+            others = list(lane.waiters)
+        for other in others:
+            other.wake()
+
+    def _wait_deadline(self, timeout: Optional[float]) -> float:
+        return time.monotonic() + (config.LLM_CALL_DEADLINE_SECONDS if timeout is None else timeout)
+
+    @staticmethod
+    def _deadline_exceeded(model: str, priority: LLMPriority, timeout: Optional[float]) -> LLMDeadlineExceeded:
+        logger.warning("[llm_scheduler | acquire] :: request of class = %s to model = %s not admitted in time, giving up", LLMPriority(priority).name, model)
+        return LLMDeadlineExceeded(f"llm request to model = {model} was not admitted within {config.LLM_CALL_DEADLINE_SECONDS if timeout is None else timeout}s")
+
+    async def acquire(self, model: str, priority: LLMPriority, tokens: int, org_id: Optional[int] = None, timeout: Optional[float] = None) -> Optional[LLMTicket]:
+        """
+        waits until the request may be sent, None when the scheduler is disabled. the wait is bounded by timeout
+        (the time left of the call deadline), LLM_CALL_DEADLINE_SECONDS when the call has none.
+
+        Raises:
+            LLMDeadlineExceeded: the request was not admitted in time
+        """
+        if not config.LLM_SCHEDULER_ENABLED:
+            return None
+        deadline = self._wait_deadline(timeout)
+        lane, waiter = self._enqueue(model, priority, tokens, org_id)
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+        waiter.wake = lambda: loop.call_soon_threadsafe(woken.set)
+        try:
+            while True:
+                wait_seconds = self._try_grant(lane, waiter)
+                if wait_seconds is None:
+                    return LLMTicket(model=model, org=waiter.org, estimated_tokens=tokens)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._deadline_exceeded(model, priority, timeout)
+                woken.clear()
+                try:
+                    await asyncio.wait_for(woken.wait(), timeout=min(wait_seconds, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._leave(lane, waiter)
+            raise
+
+    def acquire_sync(self, model: str, priority: LLMPriority, tokens: int, org_id: Optional[int] = None, timeout: Optional[float] = None) -> Optional[LLMTicket]:
+        """
+        blocking version of acquire for the sync helpers, nothing can cancel it so the timeout is what frees the thread
+
+        Raises:
+            LLMDeadlineExceeded: the request was not admitted in time
+        """
+        if not config.LLM_SCHEDULER_ENABLED:
+            return None
+        deadline = self._wait_deadline(timeout)
+        lane, waiter = self._enqueue(model, priority, tokens, org_id)
+        woken = threading.Event()
+        waiter.wake = woken.set
+        try:
+            while True:
+                wait_seconds = self._try_grant(lane, waiter)
+                if wait_seconds is None:
+                    return LLMTicket(model=model, org=waiter.org, estimated_tokens=tokens)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise self._deadline_exceeded(model, priority, timeout)
+                woken.clear()
+                woken.wait(timeout=min(wait_seconds, remaining))
+        except BaseException:
+            self._leave(lane, waiter)
+            raise
+
+    def reconcile(self, ticket: Optional[LLMTicket], used_tokens: Optional[int]):
+        """corrects the token bucket and the organisation usage with the tokens the request really used"""
+        if ticket is None or used_tokens is None:
+            return
+        difference = ticket.estimated_tokens - used_tokens
+        with self._lock:
+            lane = self._lane(ticket.model)
+            now = time.monotonic()
+            lane.tokens.refill(now)
+            if difference > 0:
+                lane.tokens.give(difference)
+            else:
+                lane.tokens.take(-difference)
+            self._add_org_tokens(ticket.org, -difference, now)
+
+    @staticmethod
+    def _wait_summary(waits: List[float]) -> Dict[str, Any]:
+        if not waits:
+            return {"samples": 0, "p50Ms": None, "p95Ms": None, "maxMs": None}
+        waits = sorted(waits)
+        return {
+            "samples": len(waits),
+            "p50Ms": round(waits[len(waits) // 2] * 1000, 1),
+            "p95Ms": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1),
+            "maxMs": round(waits[-1] * 1000, 1),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """queue depth per model, class and organisation, bucket levels, and wait times of the last grants per class"""
+        with self._lock:
+            now = time.monotonic()
+            models = {}
+            for model, lane in self._lanes.items():
+                lane.requests.refill(now)
+                lane.tokens.refill(now)
+                queue_by_org: Dict[str, int] = {}
+                for waiter in lane.waiters:
+                    queue_by_org[waiter.org] = queue_by_org.get(waiter.org, 0) + 1
+                models[model] = {
+                    "queueDepth": {priority.name: sum(1 for waiter in lane.waiters if waiter.priority == priority) for priority in LLMPriority},
+                    "queueDepthByOrg": queue_by_org,
+                    "requestsAvailable": round(lane.requests.level, 1),
+                    "rpm": lane.requests.capacity,
+                    "tokensAvailable": round(lane.tokens.level),
+                    "tpm": lane.tokens.capacity,
+                }
+            waits = {priority.name: list(samples) for priority, samples in self._waits.items()}
+            granted = {priority.name: count for priority, count in self._granted.items()}
+        return {
+            "enabled": config.LLM_SCHEDULER_ENABLED,
+            "models": models,
+            "granted": granted,
+            "waitTimes": {name: self._wait_summary(samples) for name, samples in waits.items()},
+        }
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,158 @@
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+from models.agents import AGENT_NAME_SEPARATOR
+from models.base import get_db_session
+from models.platform_metrics import PlatformMetrics
+from models.user_metrics import UserMetrics
+from utils.datetime_helper import StandardDT
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# usd per million tokens :: input (prompt tokens not served from a cache), cached input and output. LLM_PRICING
+# overrides or extends it as json in the same shape, models missing from both are counted at zero cost
+MODEL_PRICING_USD_PER_MILLION = {
+    "gemini-2.0-flash": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gemini-2.0-flash-lite": {"input": 0.075, "cached": 0.01875, "output": 0.30},
+    "gemini-2.5-flash": {"input": 0.30, "cached": 0.075, "output": 2.50},
+    "gemini-2.5-flash-lite": {"input": 0.10, "cached": 0.025, "output": 0.40},
+    "gemini-2.5-pro": {"input": 1.25, "cached": 0.31, "output": 10.00},
+}
+COUNTERS = ("calls", "prompt_tokens", "candidates_tokens", "cached_tokens", "total_tokens", "cost_usd", "latency_ms_total")
+
+
+def llm_cost_usd(model: str, prompt_tokens: int, candidates_tokens: int, cached_tokens: int) -> float:
+    pricing = {**MODEL_PRICING_USD_PER_MILLION, **(json.loads(config.LLM_PRICING) if config.LLM_PRICING else {})}.get(model)
+    if not pricing:
+        return 0.0
+    uncached_tokens = max(0, prompt_tokens - cached_tokens)
+    return (uncached_tokens * pricing["input"] + cached_tokens * pricing["cached"] + candidates_tokens * pricing["output"]) / 1_000_000
+
+
+class LLMUsageRecorder:
+    """
+    in-memory counters of the llm usage of every gemini request, flushed into hourly rollup rows.
+
+    calls only add to the counters of their (hour, user, organisation, agent, model). a background thread merges
+    them every flush interval into platform_metrics (per organisation, agent and model) and user_metrics (per user,
+    agent and model), so usage questions are a sum over a few rows instead of a scan of the json metadata blobs.
+    the counters are per process, the backend runs as a single uvicorn worker.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[Tuple, Dict[str, float]] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread = None
+
+    def record(self, model: str, usage_metadata: Any, latency_ms: float, agent_name: str = None, user_id: int = None, org_id: int = None):
+        """adds one gemini request to the counters of its hour, never raises so metering can not fail a call"""
+        try:
+            prompt_tokens = getattr(usage_metadata, "prompt_token_count", None) or 0
+            candidates_tokens = getattr(usage_metadata, "candidates_token_count", None) or 0
+            cached_tokens = getattr(usage_metadata, "cached_content_token_count", None) or 0
+            total_tokens = getattr(usage_metadata, "total_token_count", None) or prompt_tokens + candidates_tokens
+            hour_start = StandardDT.get_iso_dt().replace(minute=0, second=0, microsecond=0)
+            agent_name = agent_name.split(AGENT_NAME_SEPARATOR)[0] if agent_name else None
+            key = (hour_start, user_id, org_id, agent_name, model)
+            with self._pending_lock:
+                counters = self._pending.setdefault(key, {**{counter: 0 for counter in COUNTERS}, "latency_ms_max": 0.0})
+                counters["calls"] += 1
+                counters["prompt_tokens"] += prompt_tokens
+                counters["candidates_tokens"] += candidates_tokens
+                counters["cached_tokens"] += cached_tokens
+                counters["total_tokens"] += total_tokens
+                counters["cost_usd"] += llm_cost_usd(model, prompt_tokens, candidates_tokens, cached_tokens)
+                counters["latency_ms_total"] += latency_ms
+                counters["latency_ms_max"] = max(counters["latency_ms_max"], latency_ms)
+            self._ensure_started()
+        except Exception:
+            logger.exception("[llm_usage_recorder | record] :: could not record llm usage of model = %s", model)
+
+    @staticmethod
+    def _merge(into: Dict[Tuple, Dict[str, float]], key: Tuple, counters: Dict[str, float]):
+        merged = into.setdefault(key, {**{counter: 0 for counter in COUNTERS}, "latency_ms_max": 0.0})
+        for counter in COUNTERS:
+            merged[counter] += counters[counter]
+        merged["latency_ms_max"] = max(merged["latency_ms_max"], counters["latency_ms_max"])
+
+    @staticmethod
+    def _add_to_row(db, model_cls, dims: Dict[str, Any], counters: Dict[str, float]):
+        query = db.query(model_cls)
+        for column, value in dims.items():
+            attribute = getattr(model_cls, column)
+            query = query.filter(attribute.is_(None) if value is None else attribute == value)
+        row = query.first()
+        if row is None:
+            row = model_cls(**dims, **{counter: 0 for counter in COUNTERS}, latency_ms_max=0.0)
+            db.add(row)
+        for counter in COUNTERS:
+            setattr(row, counter, (getattr(row, counter) or 0) + counters[counter])
+        row.latency_ms_max = max(row.latency_ms_max or 0.0, counters["latency_ms_max"])
+
+    def flush(self) -> int:
+        """merges the counters into the hourly rollup rows in a single commit, returns the number of calls written"""
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return 0
+
+            platform_rows: Dict[Tuple, Dict[str, float]] = {}
+            user_rows: Dict[Tuple, Dict[str, float]] = {}
+            for (hour_start, user_id, org_id, agent_name, model), counters in pending.items():
+                self._merge(platform_rows, (hour_start, org_id, agent_name, model), counters)
+                if user_id is not None:
+                    self._merge(user_rows, (user_id, hour_start, org_id, agent_name, model), counters)
+
+            try:
+                with get_db_session() as db:
+                    for (hour_start, org_id, agent_name, model), counters in platform_rows.items():
+                        self._add_to_row(db, PlatformMetrics, {"hour_start": hour_start, "org_id": org_id, "agent_name": agent_name, "model": model}, counters)
+                    for (user_id, hour_start, org_id, agent_name, model), counters in user_rows.items():
+                        self._add_to_row(db, UserMetrics, {"user_id": user_id, "hour_start": hour_start, "org_id": org_id, "agent_name": agent_name, "model": model}, counters)
+                    db.commit()
+            except Exception:
+                # merge the counters back so they are written with the next flush
+                with self._pending_lock:
+                    for key, counters in pending.items():
+                        self._merge(self._pending, key, counters)
+                logger.exception("[llm_usage_recorder | flush] :: failed to write llm usage rollups")
+                raise
+
+            calls = int(sum(counters["calls"] for counters in pending.values()))
+            logger.info("[llm_usage_recorder | flush] :: wrote llm usage of %s calls into %s rollup rows", calls, len(platform_rows) + len(user_rows))
+            return calls
+
+    def stop(self):
+        """stops the background flusher and writes what is left in the counters"""
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._pending_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped.clear()
+                    self._thread = threading.Thread(target=self._run, name="llm-usage-recorder", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # already logged by flush, the counters stay pending for the next round
+                pass
+
+
+llm_usage_recorder = LLMUsageRecorder(flush_interval=config.LLM_USAGE_FLUSH_INTERVAL_SECONDS)
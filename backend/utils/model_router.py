@@ -0,0 +1,90 @@
+import logging
+from typing import Any, Dict, Optional
+from utils.llm_helper import DEFAULT_MODEL, DEFAULT_TEMPERATURE
+
+logger = logging.getLogger(__name__)
+
+# per call model settings of an agent, read from agent.config (the llmConfig of create_agent) ::
+# "model" : "gemini-2.0-flash", "temperature" : 0.5
+#
+# live interview turns can be routed to model tiers through "model_routing" ::
+# "model_routing" : {
+#     "tiers" : { "fast" : { "model" : "gemini-2.0-flash-lite" }, "strong" : { "model" : "gemini-2.5-flash", "temperature" : 0.4 } },
+#     "rules" : [
+#         { "tier" : "strong", "max_turn" : 1 },
+#         { "tier" : "strong", "min_turns_since_main_question" : 3 },
+#         { "tier" : "fast", "max_candidate_words" : 12 }
+#     ],
+#     "default_tier" : "fast"
+# }
+# rules are checked in order and the first one whose conditions all hold picks the tier, turns no rule matches go
+# to the default tier or to the agent model when there is none. a tier without a temperature uses the agent one.
+ROUTING_CONDITIONS = ("max_turn", "min_turn", "max_candidate_words", "min_candidate_words", "min_turns_since_main_question", "max_turns_since_main_question")
+
+
+def get_model_settings(agent_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """model and temperature set on the agent config, the llm helper defaults otherwise"""
+    agent_config = agent_config or {}
+    temperature = agent_config.get("temperature")
+    return {
+        "tier": None,
+        "model": agent_config.get("model") or DEFAULT_MODEL,
+        "temperature": float(temperature) if temperature is not None else DEFAULT_TEMPERATURE,
+    }
+
+
+def _rule_matches(rule: Dict[str, Any], turn_facts: Dict[str, int]) -> bool:
+    conditions = [condition for condition in ROUTING_CONDITIONS if rule.get(condition) is not None]
+    if not conditions:
+        return False
+    for condition in conditions:
+        bound = int(rule[condition])
+        fact = turn_facts[condition.split("_", 1)[1]]
+        if condition.startswith("max_") and fact > bound:
+            return False
+        if condition.startswith("min_") and fact < bound:
+            return False
+    return True
+
+
+def route_turn(
+    agent_config: Optional[Dict[str, Any]],
+    turn: int,
+    candidate_message: Optional[str],
+    last_main_question_turn: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    picks the model and temperature of a live interview turn from the agent config.
+
+    Args:
+        agent_config: config of the interview agent
+        turn: number of candidate messages in the call so far, the current one included
+        candidate_message: latest candidate message
+        last_main_question_turn: turn in which the interviewer last set a main question, None if it did not yet
+
+    Returns:
+        { "tier", "model", "temperature" } with tier None when the turn was not routed
+    """
+    model_settings = get_model_settings(agent_config)
+    routing = (agent_config or {}).get("model_routing")
+    if not routing or not routing.get("enabled", True):
+        return model_settings
+
+    turn_facts = {
+        "turn": turn,
+        "candidate_words": len((candidate_message or "").split()),
+        "turns_since_main_question": turn - (last_main_question_turn or 0),
+    }
+    tier = next((rule.get("tier") for rule in routing.get("rules", []) if _rule_matches(rule, turn_facts)), routing.get("default_tier"))
+    tier_settings = routing.get("tiers", {}).get(tier) if tier else None
+    if not tier_settings:
+        if tier:
+            logger.warning("[model_router | route_turn] :: tier = %s is not defined in the model routing, using the agent model", tier)
+        return model_settings
+
+    temperature = tier_settings.get("temperature")
+    return {
+        "tier": tier,
+        "model": tier_settings.get("model") or model_settings["model"],
+        "temperature": float(temperature) if temperature is not None else model_settings["temperature"],
+    }
@@ -0,0 +1,48 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Type
+import orjson
+from pydantic import BaseModel, ValidationError
+from utils.agent_return_types import AgentTypesEnum
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseSchemaRegistry:
+    """
+    json schemas of the structured agent responses, built once per response model instead of running
+    model_json_schema() (a few ms for the analysis model) on every call. the AgentTypesEnum models are registered
+    on import, any other response model on its first use.
+
+    responses are decoded and validated in a single pass by the model's compiled pydantic validator.
+    """
+
+    def __init__(self):
+        # serialized schemas, every request gets its own dict from them (see json_schema)
+        self._schemas: Dict[Type[BaseModel], bytes] = {}
+        self._lock = threading.Lock()
+
+    def register(self, response_format: Type[BaseModel]):
+        with self._lock:
+            if response_format not in self._schemas:
+                self._schemas[response_format] = orjson.dumps(response_format.model_json_schema())
+
+    def json_schema(self, response_format: Type[BaseModel]) -> Dict[str, Any]:
+        """the json schema of the response model for a request config, a fresh dict as the sdk rewrites it in place"""
+        if response_format not in self._schemas:
+            self.register(response_format)
+        return orjson.loads(self._schemas[response_format])
+
+    @staticmethod
+    def parse(response_format: Type[BaseModel], text: str) -> Optional[BaseModel]:
+        """decodes and validates a response text in one pass, None when it does not match the response model"""
+        try:
+            return response_format.model_validate_json(text)
+        except ValidationError:
+            logger.warning("[response_schemas | parse] :: response does not match %s", response_format.__name__)
+            return None
+
+
+response_schema_registry = ResponseSchemaRegistry()
+for agent_type in AgentTypesEnum:
+    response_schema_registry.register(agent_type.value)
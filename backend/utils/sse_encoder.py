@@ -0,0 +1,80 @@
+import re
+import time
+import uuid
+from typing import Any, Dict, Optional
+import orjson
+
+# a sentence ends at . ! ? (optionally followed by closing quotes / brackets) and whitespace
+SENTENCE_BOUNDARY = re.compile(r"""[.!?]["')\]]*\s+""")
+
+DONE_EVENT = b"data: [DONE]\n\n"
+
+
+def data_event(payload: Dict[str, Any]) -> bytes:
+    """frames a json payload as one sse event, used for the streamed structured agent responses"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+class ChatCompletionChunkEncoder:
+    """
+    sse framing of openai compatible chat.completion.chunk events for one streamed response.
+
+    the response id, created timestamp and the json envelope around the delta are built once per response,
+    every chunk only serializes its delta with orjson and is returned as bytes ready for the StreamingResponse.
+
+    with coalesce on, text is held back until a sentence boundary (or max_buffer_chars) so the client gets
+    whole sentences, call flush() once the model stream ends to send what is left.
+    """
+
+    def __init__(self, coalesce: bool = False, max_buffer_chars: int = 240):
+        self.id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        self.created = int(time.time())
+        self.coalesce = coalesce
+        self.max_buffer_chars = max_buffer_chars
+        self._buffer = ""
+
+        envelope = orjson.dumps({"id": self.id, "object": "chat.completion.chunk", "created": self.created})
+        # the envelope minus its closing brace, every event continues it with its own choices
+        self._event_prefix = b"data: " + envelope[:-1] + b',"choices":[{"index":0,"delta":'
+        self._content_prefix = self._event_prefix + b'{"content":'
+        self._content_suffix = b'},"finish_reason":null}]}\n\n'
+        self._delta_suffix = b',"finish_reason":null}]}\n\n'
+
+    def content(self, text: str) -> bytes:
+        """frames a content delta as is"""
+        return self._content_prefix + orjson.dumps(text) + self._content_suffix
+
+    def tool_call(self, tool_call: Dict[str, Any]) -> bytes:
+        """frames a tool call delta"""
+        return self._event_prefix + orjson.dumps({"tool_calls": [tool_call]}) + self._delta_suffix
+
+    def push(self, text: str) -> Optional[bytes]:
+        """frames streamed text, returns None while coalescing holds it back"""
+        if not self.coalesce:
+            return self.content(text)
+
+        self._buffer += text
+        boundary = None
+        for boundary in SENTENCE_BOUNDARY.finditer(self._buffer):
+            pass
+
+        if boundary:
+            ready, self._buffer = self._buffer[:boundary.end()], self._buffer[boundary.end():]
+            return self.content(ready)
+
+        if len(self._buffer) >= self.max_buffer_chars:
+            ready, self._buffer = self._buffer, ""
+            return self.content(ready)
+
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        """frames whatever text coalescing still holds"""
+        if not self._buffer:
+            return None
+        ready, self._buffer = self._buffer, ""
+        return self.content(ready)
+
+    @staticmethod
+    def error(message: str) -> bytes:
+        return b"data: " + orjson.dumps({"error": message}) + b"\n\n"
@@ -0,0 +1,178 @@
+import functools
+import logging
+import typing
+from typing import Any, Dict, Iterator, List, Optional, Type
+import orjson
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from utils.response_schemas import response_schema_registry
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """
+    scans the text of a streamed json object as it arrives and hands out the values of its top level fields as
+    soon as each one is complete, and the items of top level arrays one by one, so a caller does not have to wait
+    for the closing brace. every character is scanned once, the values are decoded from their slice of the text.
+
+    feed() returns events, ("field", name, None, value) for a finished top level field and
+    ("item", name, index, value) for a finished item of a top level array (the field event follows the last item).
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = None
+        self._object_start = None
+        self._object_end = None
+        self._reset_field()
+
+    def _reset_field(self):
+        self._key = None
+        self._awaiting_value = False
+        self._value_start = None
+        self._value_is_array = False
+        self._awaiting_item = False
+        self._item_start = None
+        self._item_index = 0
+
+    @property
+    def done(self) -> bool:
+        """the closing brace of the object was seen"""
+        return self._object_end is not None
+
+    @property
+    def text(self) -> str:
+        """the text of the object, without what came before or after it"""
+        return self._text[self._object_start or 0:self._object_end]
+
+    def _field_event(self, end: int) -> tuple:
+        event = ("field", self._key, None, orjson.loads(self._text[self._value_start:end]))
+        self._reset_field()
+        return event
+
+    def _item_event(self, end: int) -> tuple:
+        event = ("item", self._key, self._item_index, orjson.loads(self._text[self._item_start:end]))
+        self._item_start = None
+        self._item_index += 1
+        return event
+
+    def feed(self, chunk: str) -> List[tuple]:
+        events = []
+        self._text += chunk
+        text = self._text
+        for position in range(self._position, len(text)):
+            if self._object_end is not None:
+                break
+            char = text[position]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    # a string closing at the object level before any value is the name of the next field
+                    if self._depth == 1 and self._key is None and self._value_start is None:
+                        self._key = orjson.loads(text[self._string_start:position + 1])
+                continue
+
+            if char in WHITESPACE:
+                continue
+            # text before the object (a stray code fence) is skipped
+            if self._depth == 0 and char != "{":
+                continue
+
+            if self._awaiting_value:
+                self._awaiting_value = False
+                self._value_start = position
+                self._value_is_array = char == "["
+            elif self._awaiting_item and char not in ",]":
+                self._awaiting_item = False
+                self._item_start = position
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+            elif char in "{[":
+                if self._depth == 0:
+                    self._object_start = position
+                self._depth += 1
+                if self._depth == 2 and self._value_is_array and position == self._value_start:
+                    self._awaiting_item = True
+            elif char in "}]":
+                if self._depth == 2 and self._value_is_array and char == "]":
+                    if self._item_start is not None:
+                        events.append(self._item_event(position))
+                    self._awaiting_item = False
+                elif self._depth == 1 and self._value_start is not None:
+                    events.append(self._field_event(position))
+                self._depth -= 1
+                if self._depth == 0:
+                    self._object_end = position + 1
+            elif char == ":" and self._depth == 1:
+                self._awaiting_value = True
+            elif char == ",":
+                if self._depth == 1 and self._value_start is not None:
+                    events.append(self._field_event(position))
+                elif self._depth == 2 and self._value_is_array and self._item_start is not None:
+                    events.append(self._item_event(position))
+                    self._awaiting_item = True
+
+        self._position = len(text)
+        return events
+
+
+@functools.lru_cache(maxsize=None)
+def _field_adapters(response_format: Type[BaseModel], field_name: str) -> tuple:
+    """type adapters of a field of the response model and of its items when it is a list, built once per field"""
+    annotation = response_format.model_fields[field_name].annotation
+    item_adapter = None
+    if typing.get_origin(annotation) in (list, List):
+        item_adapter = TypeAdapter(typing.get_args(annotation)[0])
+    return TypeAdapter(annotation), item_adapter
+
+
+class StructuredStreamParser:
+    """
+    validated fields of a typed agent response while it streams. the events of IncrementalJSONParser are checked
+    against the field types of the response model, a value that does not validate is left out (the complete
+    response is validated again once the stream ends).
+    """
+
+    def __init__(self, response_format: Type[BaseModel]):
+        self.response_format = response_format
+        self._parser = IncrementalJSONParser()
+
+    @property
+    def text(self) -> str:
+        return self._parser.text
+
+    def feed(self, chunk: str) -> Iterator[Dict[str, Any]]:
+        """the { type, field, index, value } events completed by the chunk, in the order of the response"""
+        for kind, field_name, index, value in self._parser.feed(chunk):
+            if field_name not in self.response_format.model_fields:
+                continue
+            field_adapter, item_adapter = _field_adapters(self.response_format, field_name)
+            adapter = item_adapter if kind == "item" else field_adapter
+            if adapter is None:
+                continue
+            try:
+                validated = adapter.dump_python(adapter.validate_python(value), mode="json")
+            except ValidationError:
+                logger.warning("[structured_stream | feed] :: %s of %s does not validate, skipped", field_name, self.response_format.__name__)
+                continue
+            event = {"type": kind, "field": field_name, "value": validated}
+            if kind == "item":
+                event["index"] = index
+            yield event
+
+    def result(self) -> Optional[BaseModel]:
+        """the complete response validated in one pass, None when it does not match the response model"""
+        return response_schema_registry.parse(self.response_format, self._parser.text)
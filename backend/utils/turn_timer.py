@@ -0,0 +1,113 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+from services.turn_timing_service import TurnTimingService
+
+# the timer of the turn being streamed, set by the chat completions generators so the tools can report into it
+current_turn_timer: ContextVar[Optional["TurnTimer"]] = ContextVar("current_turn_timer", default=None)
+
+
+class TurnTimer:
+    """
+    times the phases of one live interview turn :: bootstrap (call state), prompt (instruction and history),
+    ttft (gemini request to first token, tool round trips included), tools (tool execution), stream (first token
+    to end of stream) and persist (exchange buffering and credits write back).
+
+    the phases known before the response starts go out as a Server-Timing header, the full breakdown is stored
+    per session and turn by finish() once the response and its background tasks are done.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.session_id = None
+        self.turn = None
+        self.agent_version = None
+        self.phases_ms: Dict[str, float] = {}
+        self.tool_calls = 0
+        self.tools_called = []
+        self._started = time.perf_counter()
+        self._phase_started: Dict[str, float] = {}
+        self._model_started = None
+        self._first_token_at = None
+        self._response_done_at = None
+
+    def add(self, phase: str, duration_ms: float):
+        self.phases_ms[phase] = self.phases_ms.get(phase, 0.0) + duration_ms
+
+    def start(self, phase: str):
+        self._phase_started[phase] = time.perf_counter()
+
+    def stop(self, phase: str):
+        started = self._phase_started.pop(phase, None)
+        if started is not None:
+            self.add(phase, (time.perf_counter() - started) * 1000)
+
+    @contextmanager
+    def phase(self, phase: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, (time.perf_counter() - started) * 1000)
+
+    def timed(self, phase: str, func: Callable, *args, **kwargs) -> Any:
+        """runs func inside the given phase, used to time background tasks"""
+        with self.phase(phase):
+            return func(*args, **kwargs)
+
+    def model_started(self):
+        self._model_started = time.perf_counter()
+
+    def first_token(self):
+        """marks the first token of the response, only the first call counts"""
+        if self._first_token_at is None and self._model_started is not None:
+            self._first_token_at = time.perf_counter()
+            self.add("ttft", (self._first_token_at - self._model_started) * 1000)
+
+    def response_done(self):
+        self._response_done_at = time.perf_counter()
+        if self._first_token_at is not None:
+            self.add("stream", (self._response_done_at - self._first_token_at) * 1000)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value with the phases so far and the time spent in the app before responding"""
+        metrics = [f"{phase};dur={duration_ms:.1f}" for phase, duration_ms in self.phases_ms.items()]
+        metrics.append(f"app;dur={(time.perf_counter() - self._started) * 1000:.1f}")
+        return ", ".join(metrics)
+
+    def as_record(self) -> Dict[str, Any]:
+        response_done_at = self._response_done_at or time.perf_counter()
+        return {
+            "session_id": self.session_id,
+            "turn": self.turn,
+            "endpoint": self.endpoint,
+            "agent_version": self.agent_version,
+            "bootstrap_ms": self.phases_ms.get("bootstrap"),
+            "prompt_ms": self.phases_ms.get("prompt"),
+            "ttft_ms": self.phases_ms.get("ttft"),
+            "tools_ms": self.phases_ms.get("tools", 0.0),
+            "tool_calls": self.tool_calls,
+            "stream_ms": self.phases_ms.get("stream"),
+            "persist_ms": self.phases_ms.get("persist"),
+            "total_ms": (response_done_at - self._started) * 1000,
+        }
+
+    def finish(self):
+        """stores the breakdown of the turn, runs as the last background task of the response"""
+        TurnTimingService.record(self.as_record())
+
+
+def timed_tool(func: Callable) -> Callable:
+    """reports the tool execution time (and name) into the timer of the current turn, the signature is kept for the sdk"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        turn_timer = current_turn_timer.get()
+        if turn_timer is None:
+            return func(*args, **kwargs)
+        turn_timer.tool_calls += 1
+        turn_timer.tools_called.append(func.__name__)
+        with turn_timer.phase("tools"):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,87 @@
+import logging
+import threading
+from typing import Any, Dict, List
+from models.base import get_db_session
+from models.turn_timings import TurnTiming
+from utils.datetime_helper import StandardDT
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class TurnTimingWriter:
+    """
+    write-behind buffer for the latency breakdown of live interview turns.
+
+    turns only append to an in-memory buffer, a background thread writes the buffered rows in one commit once the
+    batch size is reached or the flush interval passes, so timing a turn does not add a commit to it. the latency
+    report calls flush() first so it sees every turn. timings are diagnostics, a batch that fails to write is
+    logged and dropped instead of held back for the next flush. the buffer is per process, the backend runs as a
+    single uvicorn worker.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[Dict[str, Any]] = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread = None
+
+    def add(self, turn_timing: Dict[str, Any]):
+        """buffers the timing of one turn, created_at is taken now so it does not depend on flush time"""
+        with self._pending_lock:
+            self._pending.append({**turn_timing, "created_at": StandardDT.get_iso_dt()})
+            batch_full = len(self._pending) >= self.batch_size
+
+        self._ensure_started()
+        if batch_full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """writes every buffered turn timing in a single commit, returns the number of rows written"""
+        with self._flush_lock:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+
+            if not rows:
+                return 0
+
+            try:
+                with get_db_session() as db:
+                    db.add_all([TurnTiming(**row) for row in rows])
+                    db.commit()
+            except Exception:
+                logger.exception("[turn_timing_writer | flush] :: failed to write %s turn timings, dropped", len(rows))
+                return 0
+
+            logger.info("[turn_timing_writer | flush] :: wrote %s turn timings", len(rows))
+            return len(rows)
+
+    def stop(self):
+        """stops the background flusher and writes what is left in the buffer"""
+        self._stopped.set()
+        self._wakeup.set()
+        self.flush()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._pending_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopped.clear()
+                    self._thread = threading.Thread(target=self._run, name="turn-timing-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+turn_timing_writer = TurnTimingWriter(
+    batch_size=config.TURN_TIMING_WRITER_BATCH_SIZE,
+    flush_interval=config.TURN_TIMING_WRITER_FLUSH_INTERVAL_SECONDS,
+)